@@ -1,4 +1,11 @@
 # __init__.py
+"""
+Pacote da aplicação: extensões globais e a factory `create_app`.
+
+Importar o pacote não cria app nem conecta no banco. Blueprints, modelos e
+serviços são importados dentro de `create_app`; o schema é criado
+explicitamente com `flask schema create` (ver app/cli.py).
+"""
 import os
 import time
 import logging
@@ -12,6 +19,7 @@ from flask_limiter.util import get_remote_address
 from flask_login import LoginManager
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.middleware.proxy_fix import ProxyFix
+from sqlalchemy import text
 from sqlalchemy.exc import OperationalError
 from flask_wtf import CSRFProtect
 
@@ -62,11 +70,11 @@ def wait_for_db(app, retries=10, delay=2):
         for attempt in range(1, retries + 1):
             try:
                 # Consulta simples para verificar disponibilidade
-                db.session.execute('SELECT 1')
-                print("Banco disponível após %d tentativa(s)")
+                db.session.execute(text('SELECT 1'))
                 app.logger.info("Banco disponível após %d tentativa(s)", attempt)
                 return True
             except OperationalError as e:
+                db.session.remove()
                 app.logger.warning("Tentativa %d falhou ao conectar ao banco: %s", attempt, e)
                 time.sleep(delay)
         app.logger.error("Não conseguiu conectar ao banco após %d tentativas", retries)
@@ -78,14 +86,23 @@ def register_login_manager(app):
     login_manager.login_view = 'auth.login'
     login_manager.session_protection = "strong"
 
+    from app.services.session_users import get_session_user_cache, init_session_users
+    init_session_users()
+
     @login_manager.user_loader
     def load_user(user_id):
         from app.models.modelsdb import User
         try:
-            return User.query.get(int(user_id))
+            user_id = int(user_id)
         except (ValueError, TypeError):
             app.logger.warning("load_user: Invalid user_id %s", user_id)
             return None
+        try:
+            # Snapshot em cache (sem ida ao banco); o User completo só é
+            # carregado se a view precisar dele
+            if app.config.get('USER_LOADER_CACHE_ENABLED', True):
+                return get_session_user_cache().load(user_id)
+            return db.session.get(User, user_id)
         except Exception as e:
             app.logger.error("load_user: Unexpected error for user_id %s: %s", user_id, str(e))
             return None
@@ -95,10 +112,12 @@ def register_blueprints(app):
     from app.controllers.auth import auth_bp
     from app.controllers.books import books_bp
     from app.controllers.routes import core_bp
+    from app.controllers.metrics import metrics_bp
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(books_bp)
     app.register_blueprint(core_bp)
+    app.register_blueprint(metrics_bp)
 
 def register_template_filters(app):
     """
@@ -284,6 +303,18 @@ def create_app():
     cache.init_app(app)
     limiter.init_app(app)
 
+    # Modo estrito de carregamento: lazy loads viram erro (STRICT_LOADING)
+    from app.models.loading import init_strict_loading
+    init_strict_loading()
+
+    # Instrumentação de SQL por request (contagem, tempo, queries lentas)
+    from app.services.query_stats import init_query_stats
+    init_query_stats(app)
+
+    # Métricas Prometheus (/metrics)
+    from app.services.app_metrics import init_app_metrics
+    init_app_metrics(app)
+
     # Registrar blueprints
     register_blueprints(app)
 
@@ -298,26 +329,8 @@ def create_app():
     def health_check():
         return 'OK', 200
 
-    # Em ambiente de desenvolvimento, criar tabelas após banco disponível
-    if app.config.get('FLASK_ENV') == 'development':
-        print('asaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa')
-        app.logger.info("Ambiente de desenvolvimento: aguardando banco e criando tabelas se necessário.")
-        if wait_for_db(app):
-            with app.app_context():
-                try:
-                    db.create_all()
-                    app.logger.info("db.create_all() executado com sucesso.")
-                except Exception as e:
-                    app.logger.error("Erro ao executar db.create_all(): %s", e)
-        else:
-            app.logger.error("Não foi possível conectar ao banco para criar tabelas em dev.")
+    # Comandos CLI (flask schema create/check)
+    from app.cli import register_commands
+    register_commands(app)
 
     return app
-
-# Cria a app
-app = create_app()
-
-# Importação de modelos (apenas para registrar no ORM); mantida após create_app
-from app.models.modelsdb import User, Book, UserBooks, UserReadings, Loan, UserRead
-with app.app_context():
-    db.create_all()
\ No newline at end of file
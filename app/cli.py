@@ -0,0 +1,65 @@
+# app/cli.py
+"""
+Comandos `flask` da aplicação.
+
+O schema não é mais criado ao importar o pacote nem ao criar a app: roda uma
+vez, explicitamente, antes de subir o servidor:
+
+    flask schema create --wait     # espera o banco e cria as tabelas que faltam
+    flask schema check             # lista tabelas ausentes (exit 1 se houver)
+
+No PostgreSQL o create_all roda sob um advisory lock, então vários processos
+(ex.: réplicas subindo juntas) podem chamar `schema create` ao mesmo tempo
+sem o erro "relation already exists".
+"""
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import inspect, text
+
+from app import db, wait_for_db
+
+schema_cli = AppGroup('schema', help='Gerencia o schema do banco.')
+
+# Chave arbitrária e fixa do advisory lock do schema
+SCHEMA_LOCK_KEY = 7210485
+
+
+def _load_models():
+    # Registra todas as tabelas no metadata
+    import app.models.modelsdb  # noqa: F401
+
+
+@schema_cli.command('create')
+@click.option('--wait/--no-wait', default=False, help='Espera o banco aceitar conexões antes.')
+@click.option('--retries', default=10, show_default=True, help='Tentativas com --wait.')
+def create_schema(wait, retries):
+    """Cria as tabelas (e índices) que ainda não existem."""
+    _load_models()
+    if wait and not wait_for_db(current_app, retries=retries):
+        raise click.ClickException('Banco indisponível.')
+
+    with db.engine.begin() as connection:
+        if connection.dialect.name == 'postgresql':
+            connection.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': SCHEMA_LOCK_KEY})
+        existing = set(inspect(connection).get_table_names())
+        missing = [table.name for table in db.metadata.sorted_tables if table.name not in existing]
+        db.metadata.create_all(bind=connection)
+    click.echo(f"Schema ok; {len(missing)} tabela(s) criada(s){': ' + ', '.join(missing) if missing else ''}.")
+
+
+@schema_cli.command('check')
+def check_schema():
+    """Lista tabelas do modelo que não existem no banco."""
+    _load_models()
+    existing = set(inspect(db.engine).get_table_names())
+    missing = [table.name for table in db.metadata.sorted_tables if table.name not in existing]
+    if missing:
+        click.echo(f"Tabelas ausentes: {', '.join(missing)} (rode `flask schema create`)")
+        raise SystemExit(1)
+    click.echo('Schema ok.')
+
+
+def register_commands(app):
+    """Registra os comandos no `flask` CLI da app."""
+    app.cli.add_command(schema_cli)
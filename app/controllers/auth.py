@@ -5,12 +5,12 @@ from flask import Blueprint, render_template, flash, redirect, url_for, request,
 from flask_login import current_user
 from flask_login import login_user, logout_user
 from sqlalchemy import func
-from werkzeug.security import generate_password_hash
 
-from app import db, login_manager
+from app import db
 from app.models.forms import RegistrationForm, LoginForm
 from app.models.modelsdb import User
 from app.security.security import validate_password_complexity
+from app.services.password_hasher import PasswordHasherBusy, get_password_hasher
 
 auth_bp = Blueprint('auth', __name__, url_prefix='')
 
@@ -45,18 +45,12 @@ def register():
                 flash('This username is already taken. Please choose another one.', 'danger')
                 return redirect(url_for('auth.register'))
 
-            # Criar novo usuário com hash seguro
-            hashed_password = generate_password_hash(
-                form.password.data,
-                method='scrypt',
-                salt_length=16
-            )
-
+            # Criar novo usuário com hash seguro (pool de hashing, ver password_hasher)
             new_user = User(
                 username=form.username.data,
-                password_hash=hashed_password,
                 name=form.name.data
             )
+            new_user.set_password(form.password.data)
 
             db.session.add(new_user)
             db.session.commit()
@@ -67,6 +61,11 @@ def register():
             flash('Registration successful! Welcome to your library.', 'success')
             return redirect(url_for('core.index'))
 
+        except PasswordHasherBusy:
+            db.session.rollback()
+            current_app.logger.warning("Registration refused: password hashing queue is full")
+            flash('The server is busy. Please try again in a few seconds.', 'warning')
+            return render_template('auth/register.html', form=form), 503
         except Exception as e:
             db.session.rollback()
             flash('An error occurred during registration. Please try again.', 'danger')
@@ -106,9 +105,18 @@ def login():
         user = User.query.filter_by(username=form.username.data).first()
 
         # Prevenção de timing attack - verificar hash mesmo se usuário não existir
-        password_valid = False
-        if user:
-            password_valid = user.check_password(form.password.data)
+        try:
+            if user:
+                password_valid = user.check_password(form.password.data)
+            else:
+                hasher = get_password_hasher()
+                hasher.verify(hasher.dummy_hash, form.password.data)
+                password_valid = False
+        except PasswordHasherBusy:
+            # Muitos logins simultâneos: recusa rápido em vez de prender o worker
+            current_app.logger.warning(f"Login refused, password hashing busy - IP: {request.remote_addr}")
+            flash('Muitas tentativas de login no momento. Tente novamente em alguns segundos.', 'warning')
+            return render_template('auth/login.html', form=form, next=next_url), 503
 
         # Logging de tentativas de login (CORRIGIDO: usar current_app.logger)
         current_app.logger.info(
@@ -119,7 +127,7 @@ def login():
             # Login bem-sucedido
             login_user(user, remember=form.remember.data)
 
-            # Atualizar last_login timestamp
+            # Atualizar last_login timestamp (e o hash, se check_password o atualizou)
             try:
                 user.last_login = func.now()
                 db.session.commit()
@@ -159,16 +167,6 @@ def logout():
     return redirect(url_for('core.index'))  # CORRIGIDO: usar core.index
 
 
-@login_manager.user_loader
-def load_user(user_id):
-    from app.models.modelsdb import User
-    try:
-        return User.query.get(int(user_id))
-    except Exception:
-        current_app.logger.warning("load_user: ID inválido %s", user_id)
-        return None
-
-
 def get_logged_in_user():
     """Retorna o usuário autenticado ou None, com verificação de contexto."""
     if current_user.is_authenticated:
@@ -6,32 +6,44 @@ This ensures the app can start without errors.
 import json
 import os
 import time
-import io
-import csv
-import unicodedata
 
-from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app, jsonify, Response
+from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app, jsonify, Response, stream_with_context
 from flask_login import login_required, current_user
 from app import db, cache, limiter
 from app.models.modelsdb import Book, UserBooks
 from app.models.forms import BookForm
 from app.services.openlibrary_service import get_openlibrary_service
-from app.models.code_book import generate_book_code
+from app.services.autocomplete_index import AutocompleteIndex, get_autocomplete_index
+from app.services.collection_service import paginate_collection
+from app.services.collection_import import import_collection_csv
+from app.services.collection_export import EXPORT_FORMATS, stream_collection_export
+from app.utils.sanitize import normalize_search_text
+from app.utils.cache_keys import bump_user_cache_version, user_cache_key
+from app.utils.response_cache import user_cached
+from app.models.code_book import book_code_prefix, reserve_book_codes
+from app.models.loading import loading_options
 from datetime import datetime
 
 # Blueprint creation
 books_bp = Blueprint('books', __name__, url_prefix='')
 
-VALID_READ_STATUS = {'want_to_read', 'unread', 'reading', 'read'}
-VALID_BOOK_STATUS = {'available', 'borrowed', 'wishlist', 'ex-libris'}
-VALID_FORMATS = {'physical', 'hardcover', 'paperback', 'ebook', 'pdf', 'audiobook', 'comic'}
 
+def _search_local_books_db(query, limit=15):
+    """Fallback local search via SQL, used when the in-memory index is unavailable."""
+    # Search filters: starts-with for title/author to avoid noisy matches
+    search_filters = [
+        Book.title.ilike(f'{query}%'),
+        Book.author.ilike(f'{query}%'),
+    ]
+    # Add ISBN search if query looks like a number
+    if query.replace('-', '').replace(' ', '').isdigit():
+        search_filters.append(Book.isbn.ilike(f'%{query}%'))  # ← Contains (formatting variations)
 
-def _normalize_search_text(value):
-    value = (value or '').strip().lower()
-    value = unicodedata.normalize('NFKD', value)
-    value = ''.join(ch for ch in value if not unicodedata.combining(ch))
-    return ' '.join(value.split())
+    local_books = Book.query.join(UserBooks).filter(
+        UserBooks.user_id == current_user.id,
+        db.or_(*search_filters)
+    ).limit(limit).all()
+    return [AutocompleteIndex.entry_from_book(book) for book in local_books]
 
 
 @books_bp.route('/check_duplicates', methods=['POST'])
@@ -121,19 +133,14 @@ def register_new_book():
 
     if form.validate_on_submit():
         try:
-            # Generate shelf code from genre + author + title
+            # Reserve a shelf code from genre + author + title
+            # (genres not in the code_book dictionary use the fallback "000")
             genre_title = form.genre.data.strip().title() if form.genre.data else 'General'
-            code = generate_book_code(
+            code = reserve_book_codes(book_code_prefix(
                 genre_title,
                 form.author.data.strip(),
                 form.title.data.strip()
-            )
-
-            if code is None:
-                # Genre not in code_book dictionary — use fallback "000"
-                author_initial = form.author.data.strip().split()[-1][0].upper()
-                title_initial = form.title.data.strip()[0].lower()
-                code = f'{author_initial}000{title_initial}'
+            ))[0]
 
             # Create the Book record
             book = Book(
@@ -165,8 +172,9 @@ def register_new_book():
             db.session.add(user_book)
             db.session.commit()
 
-            # Invalidate collection cache so new book appears immediately
-            cache.clear()
+            # Invalidate only this user's cached views so the new book appears immediately
+            version = bump_user_cache_version(current_user.id)
+            get_autocomplete_index().add_books(current_user.id, [book], version=version)
 
             flash(f'"{book.title}" by {book.author} added to your collection! (Code: {book.code})', 'success')
             current_app.logger.info(
@@ -188,29 +196,29 @@ def register_new_book():
     return render_template('books/register_new_book.html', form=form)
 
 
+def _genres_cache_key():
+    return user_cache_key('genres', current_user.id)
+
+
 @books_bp.route('/your_collection', methods=['GET'])
 @login_required
-@cache.cached(timeout=300, query_string=True)
+@user_cached('collection', timeout=300, vary_on=('cursor',))
 def your_collection():
-    """Display user's book collection."""
+    """Display user's book collection (keyset-paginated by title)."""
     try:
-        page = request.args.get('page', 1, type=int)
         per_page = 20
 
-        books_query = db.session.query(UserBooks, Book).join(Book).filter(
-            UserBooks.user_id == current_user.id
-        ).order_by(Book.title.asc())
-
-        paginated_books = books_query.paginate(
-            page=page,
+        collection_page = paginate_collection(
+            current_user.id,
+            cursor=request.args.get('cursor'),
             per_page=per_page,
-            error_out=False
+            approximate_count=current_app.config.get('COLLECTION_APPROXIMATE_COUNT', False)
         )
 
         return render_template(
             'your_collection.html',
-            books=paginated_books.items,
-            pagination=paginated_books
+            books=collection_page.items,
+            pagination=collection_page
         )
 
     except Exception as e:
@@ -259,36 +267,10 @@ def autocomplete():
 
     try:
         # Step 1: Search user's local collection (always prioritized)
-        # Search filters: starts-with for title/author to avoid noisy matches
-        search_filters = [
-            Book.title.ilike(f'{query}%'),      # ← Starts with (better results)
-            Book.author.ilike(f'{query}%'),
-        ]
-        # Add ISBN search if query looks like a number
-        if query.replace('-', '').replace(' ', '').isdigit():
-            search_filters.append(Book.isbn.ilike(f'%{query}%'))  # ← Contains (formatting variations)
-
-        local_books = Book.query.join(UserBooks).filter(
-            UserBooks.user_id == current_user.id,
-            db.or_(*search_filters)
-        ).limit(15).all()
-
-        all_local = [
-            {
-                'title': book.title,
-                'author': book.author,
-                'cover_url': book.cover_url,
-                'genre': book.genre,
-                'year': book.publication_year,
-                'publisher': book.publisher,
-                'pages': book.pages,
-                'isbn': book.isbn,
-                'country_of_origin': book.country_of_origin,
-                'original_language': book.original_language,
-                'source': 'local'
-            }
-            for book in local_books
-        ]
+        # Answered from the in-memory per-user index; SQL only as fallback
+        all_local = get_autocomplete_index().search(current_user.id, query, limit=15)
+        if all_local is None:
+            all_local = _search_local_books_db(query, limit=15)
 
         # Step 2: Search OpenLibrary API for additional suggestions
         all_suggestions = []
@@ -296,14 +278,18 @@ def autocomplete():
 
         if remaining_for_api > 0:
             try:
-                ol_service = get_openlibrary_service()
-                api_results = ol_service.search_books(query, limit=remaining_for_api)
-
-                normalized_query = _normalize_search_text(query)
+                normalized_query = normalize_search_text(query)
                 is_numeric_query = query.replace('-', '').replace(' ', '').isdigit()
+
+                # Title queries are prefix-filtered below, so the service may
+                # answer them from a shorter query's cached results
+                ol_service = get_openlibrary_service()
+                api_results = ol_service.search_books(
+                    query, limit=remaining_for_api, prefix_match=not is_numeric_query
+                )
                 filtered_api_results = []
                 for item in api_results:
-                    title_norm = _normalize_search_text(item.get('title', ''))
+                    title_norm = normalize_search_text(item.get('title', ''))
                     if is_numeric_query:
                         filtered_api_results.append(item)
                     elif normalized_query and title_norm.startswith(normalized_query):
@@ -385,7 +371,7 @@ def autocomplete():
 
 @books_bp.route('/api/genres', methods=['GET'])
 @login_required
-@cache.cached(timeout=600)
+@cache.cached(timeout=600, make_cache_key=_genres_cache_key)
 def api_genres():
     """
     Return all available genres with their shelf codes (000–999),
@@ -441,7 +427,9 @@ def add_to_collection(book_id):
 def view_book(book_id):
     """Display a single book page for the current user's collection item."""
     try:
-        user_book = UserBooks.query.filter_by(user_id=current_user.id, book_id=book_id).first()
+        user_book = UserBooks.query.options(*loading_options('view_book')).filter_by(
+            user_id=current_user.id, book_id=book_id
+        ).first()
         if not user_book:
             flash('Book not found in your collection.', 'warning')
             return redirect(url_for('books.your_collection'))
@@ -456,43 +444,37 @@ def view_book(book_id):
 @books_bp.route('/your_collection/export', methods=['GET'])
 @login_required
 def export_collection():
-    """Export the current user's collection to CSV."""
-    rows = db.session.query(UserBooks, Book).join(Book).filter(
-        UserBooks.user_id == current_user.id
-    ).order_by(Book.title.asc()).all()
-
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow([
-        'title', 'author', 'publisher', 'publication_year', 'pages', 'genre', 'isbn',
-        'country_of_origin', 'original_language', 'status', 'read_status', 'format',
-        'cover_url', 'openlibrary_key'
-    ])
-
-    for user_book, book in rows:
-        writer.writerow([
-            book.title,
-            book.author,
-            book.publisher,
-            book.publication_year,
-            book.pages,
-            book.genre,
-            book.isbn or '',
-            book.country_of_origin or '',
-            book.original_language or '',
-            user_book.status,
-            user_book.read_status,
-            user_book.format,
-            book.cover_url or '',
-            ''
-        ])
-
-    csv_data = output.getvalue()
-    filename = f"collection_user_{current_user.id}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.csv"
+    """
+    Export the current user's collection as a streamed download.
+
+    Query params:
+        format: 'csv' (default) or 'ndjson' (JSON Lines)
+        gzip: '1' to gzip the stream (.gz download)
+    """
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in EXPORT_FORMATS:
+        fmt = 'csv'
+    compress = request.args.get('gzip') in ('1', 'true', 'yes')
+    spec = EXPORT_FORMATS[fmt]
+
+    filename = f"collection_user_{current_user.id}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{spec['extension']}"
+    mimetype = spec['mimetype']
+    if compress:
+        filename += '.gz'
+        mimetype = 'application/gzip'
+
+    stream = stream_collection_export(
+        current_user.id, fmt=fmt, compress=compress,
+        batch_size=current_app.config.get('EXPORT_BATCH_SIZE', 1000)
+    )
     return Response(
-        csv_data,
-        mimetype='text/csv',
-        headers={'Content-Disposition': f'attachment; filename={filename}'}
+        stream_with_context(stream),
+        mimetype=mimetype,
+        headers={
+            'Content-Disposition': f'attachment; filename={filename}',
+            # Keep proxies (nginx) from buffering the whole download
+            'X-Accel-Buffering': 'no',
+        }
     )
 
 
@@ -507,76 +489,20 @@ def import_collection():
 
     try:
         content = uploaded.read().decode('utf-8-sig')
-        reader = csv.DictReader(io.StringIO(content))
     except Exception:
         flash('Invalid file format. Please upload a UTF-8 CSV file.', 'danger')
         return redirect(url_for('books.your_collection'))
 
-    imported_count = 0
-    skipped_count = 0
-
-    for row in reader:
-        savepoint = None
-        try:
-            title = (row.get('title') or '').strip()
-            author = (row.get('author') or '').strip()
-            publisher = (row.get('publisher') or '').strip() or 'Unknown Publisher'
-            genre = (row.get('genre') or '').strip() or 'General'
-
-            if not title or not author:
-                skipped_count += 1
-                continue
-
-            publication_year = int((row.get('publication_year') or '').strip() or datetime.utcnow().year)
-            pages = int((row.get('pages') or '').strip() or 1)
-
-            code = generate_book_code(genre.title(), author, title)
-            if not code:
-                code = f"{author[:1].upper()}000{title[:1].lower()}"
-
-            savepoint = db.session.begin_nested()
-
-            book = Book(
-                code=code,
-                title=title,
-                author=author,
-                publisher=publisher,
-                publication_year=publication_year,
-                pages=max(1, pages),
-                genre=genre.title(),
-                isbn=(row.get('isbn') or '').strip() or None,
-                country_of_origin=(row.get('country_of_origin') or '').strip() or None,
-                original_language=(row.get('original_language') or '').strip() or None,
-                cover_url=(row.get('cover_url') or '').strip() or None,
-            )
-            db.session.add(book)
-            db.session.flush()
-
-            raw_status = (row.get('status') or 'available').strip().lower()
-            raw_read = (row.get('read_status') or 'unread').strip().lower()
-            raw_format = (row.get('format') or 'physical').strip().lower()
-
-            user_book = UserBooks(
-                user_id=current_user.id,
-                book_id=book.id,
-                status=raw_status if raw_status in VALID_BOOK_STATUS else 'available',
-                read_status=raw_read if raw_read in VALID_READ_STATUS else 'unread',
-                format=raw_format if raw_format in VALID_FORMATS else 'physical',
-                acquisition_date=datetime.utcnow()
-            )
-            db.session.add(user_book)
-            savepoint.commit()
-            imported_count += 1
-        except Exception:
-            if savepoint is not None:
-                savepoint.rollback()
-            skipped_count += 1
-            continue
-
     try:
+        result = import_collection_csv(current_user.id, content)
         db.session.commit()
-        cache.clear()
-        flash(f'Import completed: {imported_count} book(s) added, {skipped_count} skipped.', 'success')
+        version = bump_user_cache_version(current_user.id)
+        get_autocomplete_index().add_books(current_user.id, result.books, version=version)
+        flash(f'Import completed: {result.imported} book(s) added, {result.skipped} skipped.', 'success')
+        for line, message in result.errors[:5]:
+            flash(f'Row {line}: {message}', 'warning')
+        if result.skipped > 5:
+            flash(f'...and {result.skipped - 5} more row(s) with errors.', 'warning')
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Import error: {str(e)}")
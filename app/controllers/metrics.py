@@ -0,0 +1,59 @@
+# metrics.py
+"""
+Operational metrics endpoints (see app.security.middleware.require_metrics_access).
+"""
+from datetime import datetime, timedelta
+
+from flask import Blueprint, Response, jsonify, request
+
+from app import limiter
+from app.security.middleware import require_metrics_access
+from app.services.app_metrics import render_metrics
+from app.services.metrics_rollup import HOUR, MINUTE, get_metrics_rollup
+from app.services.query_stats import get_query_stats
+
+metrics_bp = Blueprint('metrics', __name__, url_prefix='/metrics')
+
+
+@metrics_bp.route('', methods=['GET'])
+@limiter.exempt
+@require_metrics_access
+def prometheus_metrics():
+    """Prometheus text exposition of app_metrics (merged across workers)."""
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
+
+
+@metrics_bp.route('/queries', methods=['GET'])
+@limiter.exempt
+@require_metrics_access
+def query_metrics():
+    """
+    Per-endpoint SQL statement counts/DB time and the slowest statements.
+
+    Per worker: the totals are those of the process that served the request
+    (`pid` in the response); merged counters are on /metrics.
+    """
+    slow_limit = max(1, min(request.args.get('limit', 50, type=int), 200))
+    return jsonify(get_query_stats().snapshot(slow_limit=slow_limit))
+
+
+@metrics_bp.route('/upstream', methods=['GET'])
+@limiter.exempt
+@require_metrics_access
+def upstream_metrics():
+    """
+    Upstream API analytics (count, error rate, cache hit ratio, p50/p95) from
+    the APIMetrics rollups; never scans raw rows.
+
+    Query args: `hours` (default 24, max 90 days); minute resolution up to 6
+    hours, hourly beyond. The last few minutes appear once rolled up.
+    """
+    hours = max(1, min(request.args.get('hours', 24, type=int), 24 * 90))
+    resolution = MINUTE if hours <= 6 else HOUR
+    since = datetime.utcnow() - timedelta(hours=hours)
+    return jsonify({
+        'hours': hours,
+        'resolution': resolution,
+        'endpoints': get_metrics_rollup().summarize(since, resolution),
+    })
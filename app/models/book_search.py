@@ -1,6 +1,6 @@
 def get_author_info(author_id):
     url = f"https://openlibrary.org{author_id}.json" #url = f"https://openlibrary.org/search.json?q={author_id}"
-    response = requests.get(url)
+    response = get_http_client().get(url, endpoint='openlibrary_author')
     if response.status_code == 200:
         author_data = response.json()
         author_name = author_data['name']
@@ -13,7 +13,7 @@ def get_author_info(author_id):
 def get_book_year(isbn):
     book_info = get_book_info(isbn)
     url = f"https://openlibrary.org/search.json?q={book_info}"
-    response = requests.get(url)
+    response = get_http_client().get(url, endpoint='openlibrary_search')
     book_data = response.json()
     if response.status_code == 200:
         return book_data['docs'][0]['first_publish_year']
@@ -39,8 +39,9 @@ def gret_book_cover_urls(isbn):
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.93 Safari/537.36"
         }
         try:
-            response = requests.get(amazonURL, headers=headers)
+            response = get_http_client().get(amazonURL, endpoint='amazon', headers=headers)
             if response.status_code == 200:
+                from bs4 import BeautifulSoup  # Importação tardia: só a raspagem da Amazon usa
                 soup = BeautifulSoup(response.text, 'html.parser')
                 image_tag = soup.find(id='landingImage')
                 if image_tag:
@@ -62,7 +63,8 @@ def gret_book_cover_urls(isbn):
 #isbn = '9798683678777'  # Replace with the desired ISBN
 
 import requests
-from bs4 import BeautifulSoup
+
+from app.services.http_client import get_http_client
 
 
 def search_book_by_title(title):
@@ -70,7 +72,7 @@ def search_book_by_title(title):
     Busca um livro pelo título e retorna o primeiro ISBN encontrado.
     """
     url = f"https://openlibrary.org/search.json?q={title}"
-    response = requests.get(url)
+    response = get_http_client().get(url, endpoint='openlibrary_search')
     if response.status_code == 200:
         book_data = response.json()
         try:
@@ -87,7 +89,7 @@ def get_book_info(isbn):
     Retorna informações detalhadas do livro a partir do ISBN.
     """
     url = f"https://openlibrary.org/search.json?q={isbn}"
-    response = requests.get(url)
+    response = get_http_client().get(url, endpoint='openlibrary_search')
     if response.status_code == 200:
         return response.json()
     else:
@@ -100,7 +102,7 @@ def get_author_name(author_key):
     Obtém o nome do autor a partir de sua chave.
     """
     url = f"https://openlibrary.org{author_key}.json"
-    response = requests.get(url)
+    response = get_http_client().get(url, endpoint='openlibrary_author')
     if response.status_code == 200:
         author_data = response.json()
         return author_data.get('name', 'Autor desconhecido')
@@ -133,8 +135,9 @@ def get_book_cover_url(isbn):
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.93 Safari/537.36"
         }
         try:
-            response = requests.get(amazon_url, headers=headers)
+            response = get_http_client().get(amazon_url, endpoint='amazon', headers=headers)
             if response.status_code == 200:
+                from bs4 import BeautifulSoup  # Importação tardia: só a raspagem da Amazon usa
                 soup = BeautifulSoup(response.text, 'html.parser')
                 image_tag = soup.find(id='landingImage')
                 if image_tag:
@@ -1,5 +1,8 @@
-from sqlalchemy import func
-from app.models.modelsdb import Book
+from sqlalchemy import insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models.modelsdb import Book, BookCodeCounter
 
 book_genres = {
     '000': 'General',
@@ -131,49 +134,147 @@ book_genres = {
     '990': '',
 }
 
+# Mapa reverso gênero -> código, para não varrer book_genres a cada livro.
+# Os códigos ainda sem nome ('') ficam de fora: gênero vazio usa o fallback
+GENRE_CODES = {genre: code for code, genre in book_genres.items() if genre}
+
+# Código usado para gêneros fora do dicionário
+FALLBACK_GENRE_CODE = '000'
+
 
 def generate_book_code(genre, author_fullname, title):
-    # Obtenha o último sobrenome do autor
-    author_lastname = author_fullname.split()[-1]
-
-    # Obtenha a primeira letra do último sobrenome do autor
-    author_lastname_initial = author_lastname[0]
-
-    title_initial = title[0]
-    
-    genre = genre.title()
-
-    # Verifique se o gênero está presente no dicionário de gêneros
-    if genre.title() in book_genres.values():
-        # Encontre a chave correspondente ao gênero no dicionário de gêneros
-        genre_code = next((key for key, value in book_genres.items() if value == genre), None)
-        if genre_code:
-            base_code = f'{author_lastname_initial.upper()}{genre_code}{title_initial.lower()}'
-            print(base_code)
-
-            last_code = Book.query.filter(Book.code.like(f'{base_code}%')).order_by(Book.code.desc()).first()
-
-            if last_code:
-                # Obtenha o sufixo do último código usado
-                last_suffix = last_code.code[len(base_code) + 1:]
-                # Verifique se o sufixo é um número
-                if last_suffix.isdigit():
-                    # Incremente o sufixo
-                    new_suffix = f'.{str(int(last_suffix) + 1).zfill(3)}'
-                    # Gere o novo código com o sufixo
-                    new_code = f'{base_code}{new_suffix}'
-                else:
-                    # O último sufixo não é um número, então adicione ".001" como sufixo
-                    new_code = f'{base_code}.001'
-            else:
-                # Não existem códigos com base_code, então use o código base
-                new_code = base_code
-
-            return new_code
-        else:
-            # Não encontrou o gênero no dicionário de gêneros
-            return None
-    else:
-        # O gênero não está presente no dicionário de gêneros
+    """
+    Reserva o próximo código de estante de um livro, ex.: 'A300d', 'A300d.001'.
+
+    O primeiro livro de um prefixo recebe o código base e os seguintes
+    '.001', '.002'... O sufixo vem de um contador por prefixo incrementado
+    atomicamente (reserve_book_codes), então registros concorrentes nunca
+    recebem o mesmo código.
+
+    Retorna None se o gênero não estiver no dicionário de gêneros.
+    """
+    if genre.title() not in GENRE_CODES:
         return None
+    return reserve_book_codes(book_code_prefix(genre, author_fullname, title))[0]
+
+
+def book_code_prefix(genre, author_fullname, title):
+    """
+    Retorna o código base (sem sufixo) de um livro, ex.: 'A300d'.
+
+    Gêneros fora do dicionário usam o código '000' (General).
+    """
+    genre_code = GENRE_CODES.get(genre.title(), FALLBACK_GENRE_CODE)
+    author_initial = author_fullname.split()[-1][0].upper()
+    return f'{author_initial}{genre_code}{title[0].lower()}'
+
+
+def format_book_code(base_code, suffix):
+    """Monta o código final ('A300d', 0 -> 'A300d'; 'A300d', 2 -> 'A300d.002')."""
+    return base_code if suffix == 0 else f'{base_code}.{str(suffix).zfill(3)}'
+
+
+def split_book_code(code):
+    """Separa um código em (código base, sufixo): 'A300d.002' -> ('A300d', 2)."""
+    base_code, sep, suffix = code.rpartition('.')
+    if sep and base_code and suffix.isdigit():
+        return base_code, int(suffix)
+    return code, 0
+
+
+def _scan_last_suffixes(base_codes, chunk_size=200):
+    """
+    Maior sufixo já usado por código base, lido da tabela de livros.
+
+    Só é usado para criar contadores que ainda não existem (uma vez por
+    prefixo); depois disso a alocação não consulta a tabela de livros.
+    """
+    prefixes = sorted(set(base_codes))
+    last_suffix = {}
+
+    for start in range(0, len(prefixes), chunk_size):
+        chunk = prefixes[start:start + chunk_size]
+        rows = db.session.execute(select(Book.code).where(
+            or_(*[Book.code.like(f'{base_code}%') for base_code in chunk])
+        )).all()
+        chunk_set = set(chunk)
+        for (code,) in rows:
+            base_code, suffix = split_book_code(code)
+            if base_code in chunk_set:
+                last_suffix[base_code] = max(last_suffix.get(base_code, -1), suffix)
+
+    return last_suffix
+
+
+def _seed_counters(base_codes):
+    """Cria os contadores ausentes a partir dos códigos já existentes."""
+    existing = set(db.session.execute(
+        select(BookCodeCounter.prefix).where(BookCodeCounter.prefix.in_(base_codes))
+    ).scalars())
+    missing = sorted(set(base_codes) - existing)
+    if not missing:
+        return
+
+    last_suffix = _scan_last_suffixes(missing)
+    for base_code in missing:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(BookCodeCounter).values(
+                    prefix=base_code, last_suffix=last_suffix.get(base_code, -1)
+                ))
+        except IntegrityError:
+            # Outro processo criou o contador primeiro; o UPDATE usa o dele
+            pass
+
+
+def _increment_counter(base_code, count):
+    """Soma `count` ao contador do prefixo; retorna o novo último sufixo (ou None)."""
+    return db.session.execute(
+        update(BookCodeCounter)
+        .where(BookCodeCounter.prefix == base_code)
+        .values(last_suffix=BookCodeCounter.last_suffix + count)
+        .returning(BookCodeCounter.last_suffix)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+
+
+def reserve_book_codes(base_code, count=1):
+    """
+    Reserva `count` códigos consecutivos para um código base.
+
+    Um único UPDATE ... RETURNING incrementa o contador do prefixo; a linha
+    fica bloqueada até o commit da transação de quem chamou, então duas
+    reservas concorrentes nunca devolvem o mesmo sufixo.
+
+    Returns:
+        list: Códigos reservados, em ordem
+    """
+    last = _increment_counter(base_code, count)
+    if last is None:
+        _seed_counters([base_code])
+        last = _increment_counter(base_code, count)
+    return [format_book_code(base_code, suffix) for suffix in range(last - count + 1, last + 1)]
+
+
+def allocate_book_codes(base_codes):
+    """
+    Reserva códigos únicos para uma lista de códigos base (importações).
+
+    Um UPDATE por prefixo distinto, não por livro. Os prefixos são
+    incrementados em ordem alfabética, para que importações concorrentes
+    bloqueiem os contadores na mesma ordem e não entrem em deadlock.
+
+    Returns:
+        list: Códigos na mesma ordem de `base_codes`
+    """
+    counts = {}
+    for base_code in base_codes:
+        counts[base_code] = counts.get(base_code, 0) + 1
+    if not counts:
+        return []
 
+    _seed_counters(list(counts))
+    reserved = {}
+    for base_code in sorted(counts):
+        reserved[base_code] = iter(reserve_book_codes(base_code, counts[base_code]))
+    return [next(reserved[base_code]) for base_code in base_codes]
@@ -0,0 +1,78 @@
+# app/models/loading.py
+"""
+Perfis de carregamento (eager loading) das páginas.
+
+Cada página declara aqui, por nome, como suas consultas carregam os
+relacionamentos que o template usa (`selectinload`/`joinedload`), e todo o
+resto fica com `raiseload`: um acesso não previsto vira erro em vez de uma
+consulta por linha (N+1). Assim o número de consultas de uma página não
+depende do tamanho da coleção.
+
+Modo estrito (STRICT_LOADING=True, usado nos testes): qualquer lazy load
+feito durante um request levanta LazyLoadError, inclusive em objetos que não
+passaram por um perfil (ex.: current_user).
+"""
+from flask import current_app, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.orm import Session, joinedload, load_only, raiseload
+
+from app.models.modelsdb import Book, UserBooks
+
+# Colunas usadas pelos cards de your_collection.html (Book.description nunca é carregada)
+CARD_BOOK_COLUMNS = (
+    Book.title, Book.author, Book.code, Book.publication_year, Book.pages,
+    Book.genre, Book.publisher, Book.country_of_origin, Book.original_language,
+)
+CARD_USER_BOOK_COLUMNS = (
+    UserBooks.book_id, UserBooks.status, UserBooks.read_status, UserBooks.format,
+)
+
+LOADING_PROFILES = {
+    # Linhas (UserBooks, Book) já vêm do JOIN de collection_query
+    'collection': lambda: (
+        load_only(*CARD_USER_BOOK_COLUMNS),
+        load_only(*CARD_BOOK_COLUMNS),
+        raiseload('*'),
+    ),
+    # UserBooks com o Book da página em uma consulta
+    'view_book': lambda: (
+        joinedload(UserBooks.book),
+        raiseload('*'),
+    ),
+}
+
+
+class LazyLoadError(InvalidRequestError):
+    """Lazy load durante um request com STRICT_LOADING ligado."""
+
+
+def loading_options(profile):
+    """
+    Opções de carregamento do perfil `profile` (ver LOADING_PROFILES).
+
+    Uso:
+        UserBooks.query.options(*loading_options('view_book'))
+    """
+    return LOADING_PROFILES[profile]()
+
+
+def _forbid_lazy_loads(orm_execute_state):
+    if not orm_execute_state.is_select or orm_execute_state.lazy_loaded_from is None:
+        return
+    if not has_request_context():
+        return
+    if not current_app.config.get('STRICT_LOADING'):
+        return
+    instance = orm_execute_state.lazy_loaded_from
+    attribute = orm_execute_state.loader_strategy_path[-1]
+    raise LazyLoadError(
+        f"Lazy load of {instance.class_.__name__}.{attribute.key} during "
+        f"{request.endpoint}; add it to a loading profile in app/models/loading.py"
+    )
+
+
+def init_strict_loading():
+    """Registra a verificação de lazy loads (só age com STRICT_LOADING ligado)."""
+    if not event.contains(Session, 'do_orm_execute', _forbid_lazy_loads):
+        event.listen(Session, 'do_orm_execute', _forbid_lazy_loads)
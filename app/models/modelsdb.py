@@ -2,14 +2,106 @@
 from datetime import datetime
 from functools import cached_property
 
-from sqlalchemy import CheckConstraint, func, event
+from sqlalchemy import CheckConstraint, event, inspect
 from sqlalchemy.orm import validates
-from werkzeug.security import generate_password_hash, check_password_hash
 
 from app import db
+from app.services.password_hasher import PasswordHasherBusy, get_password_hasher
 
 
-class User(db.Model):
+def normalize_isbn(isbn):
+    """
+    Valida e normaliza um ISBN para ISBN-13 sem hífens.
+
+    Retorna None para valores vazios e levanta ValueError para ISBNs inválidos.
+    Usado pelo validador de Book e por inserções em lote, que não passam pelo ORM.
+    """
+    if not isbn:
+        return None
+
+    # 1. Limpeza básica
+    s = isbn.replace('-', '').replace(' ', '').upper()
+
+    # 2. ISBN-10?
+    if len(s) == 10:
+        if not all(c.isdigit() or (i == 9 and c == 'X') for i, c in enumerate(s)):
+            raise ValueError("ISBN-10 deve ter 9 dígitos e um dígito verificador (0–9 ou X).")
+        # checksum ISBN-10
+        total = sum((10 - i) * (10 if c == 'X' else int(c)) for i, c in enumerate(s))
+        if total % 11 != 0:
+            raise ValueError("Checksum inválido para ISBN-10.")
+        # converte para ISBN-13 (prefixo 978)
+        core = '978' + s[:-1]
+        # calcula novo dígito verificador ISBN-13
+        check = 0
+        for i, ch in enumerate(core):
+            n = int(ch)
+            check += n if i % 2 == 0 else 3 * n
+        cd = (10 - (check % 10)) % 10
+        return core + str(cd)
+
+    # 3. ISBN-13?
+    if len(s) == 13 and s.isdigit():
+        # checksum ISBN-13
+        total = sum((1 if i % 2 == 0 else 3) * int(ch) for i, ch in enumerate(s[:-1]))
+        cd = (10 - (total % 10)) % 10
+        if cd != int(s[-1]):
+            raise ValueError("Checksum inválido para ISBN-13.")
+        return s
+
+    # 4. Qualquer outro formato
+    raise ValueError("ISBN deve ser ISBN-10 (10 chars, último pode ser X) ou ISBN-13 (13 dígitos).")
+
+
+class CollectionStatsMixin:
+    """
+    Estatísticas da coleção para quem tem um `id` de usuário: o User do ORM
+    e o snapshot de sessão (app.services.session_users), que não precisa
+    carregar o User para exibi-las.
+    """
+
+    @cached_property
+    def stats(self):
+        """
+        Estatísticas da coleção (app.services.user_stats), lidas do store
+        persistente em O(1). Calculadas uma vez por request; os listeners do
+        fim deste arquivo descartam o valor quando a coleção muda.
+        """
+        from app.services.user_stats import get_user_stats
+
+        return get_user_stats(self.id)
+
+    @property
+    def book_count(self):
+        """Quantidade de livros na coleção."""
+        return self.stats.book_count
+
+    @property
+    def total_pages(self):
+        """Soma das páginas dos livros da coleção."""
+        return self.stats.total_pages
+
+    @property
+    def favorite_genre(self):
+        """
+        Gênero favorito do usuário (o com mais livros; empate pelo nome).
+        Retorna tupla (genre_name, count) ou None se não houver livros.
+        """
+        return self.stats.favorite_genre
+
+    @property
+    def last_book_added(self):
+        """
+        Última adição à biblioteca do usuário.
+        Útil para exibir "Última adição: Há X dias" na interface.
+
+        Returns:
+            Objeto com `id` (do UserBooks) e `acquisition_date`, ou None
+        """
+        return self.stats.last_book_added
+
+
+class User(CollectionStatsMixin, db.Model):
     __tablename__ = 'users'
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(50), unique=True, nullable=False, index=True)
@@ -45,14 +137,22 @@ class User(db.Model):
     def set_password(self, password):
         if len(password) < 8:
             raise ValueError("Password must be at least 8 characters")
-        self.password_hash = generate_password_hash(
-            password,
-            method='scrypt',
-            salt_length=16
-        )
+        self.password_hash = get_password_hasher().hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        """
+        Verifica a senha; se o hash foi feito com parâmetros antigos, troca por
+        um hash com os atuais (o chamador faz o commit, como no login).
+        """
+        hasher = get_password_hasher()
+        if not hasher.verify(self.password_hash, password):
+            return False
+        if hasher.needs_rehash(self.password_hash):
+            try:
+                self.password_hash = hasher.hash(password)
+            except PasswordHasherBusy:
+                pass  # Fica para o próximo login
+        return True
 
     @validates('username')
     def validate_username(self, key, username):
@@ -66,51 +166,13 @@ class User(db.Model):
         """
         Retorna lista de objetos Book associados ao usuário.
         Mantém compatibilidade com templates existentes que usam current_user.books
-        """
-        return [ub.book for ub in self.user_books]
-
-    @cached_property
-    def favorite_genre(self):
-        """
-        Calcula o gênero favorito do usuário baseado na quantidade de livros.
-        Retorna tupla (genre_name, count) ou None se não houver livros.
-        Cache é invalidado automaticamente via SQLAlchemy events.
 
-        TODO: Phase 2 - Migrate to Redis cache when user base > 1000
+        Uma única consulta com JOIN; percorrer user_books e acessar ub.book
+        fazia uma consulta por livro. Para só contar, use `book_count`.
         """
-        from app.models.modelsdb import Book, UserBooks
-
-        result = db.session.query(
-            Book.genre,
-            func.count(Book.id).label('count')
-        ).join(
-            UserBooks, Book.id == UserBooks.book_id
-        ).filter(
+        return Book.query.join(UserBooks, UserBooks.book_id == Book.id).filter(
             UserBooks.user_id == self.id
-        ).group_by(
-            Book.genre
-        ).order_by(
-            func.count(Book.id).desc()
-        ).first()
-
-        return result if result else None
-
-    @cached_property
-    def last_book_added(self):
-        """
-        Retorna o último livro adicionado à biblioteca do usuário.
-        Útil para exibir "Última adição: Há X dias" na interface.
-
-        Returns:
-            UserBooks instance ou None
-        """
-        from app.models.modelsdb import UserBooks
-
-        return UserBooks.query.filter_by(
-            user_id=self.id
-        ).order_by(
-            UserBooks.acquisition_date.desc()
-        ).first()
+        ).all()
 
 
 class Book(db.Model):
@@ -135,49 +197,21 @@ class Book(db.Model):
     readings = db.relationship('UserReadings', back_populates='book', cascade='all, delete-orphan')
 
     # Validations
+    # EXTRACT(... FROM NOW()) só existe no PostgreSQL; os demais bancos
+    # (SQLite de testes e benchmarks) recebem só o limite inferior
     __table_args__ = (
         CheckConstraint('publication_year BETWEEN 1800 AND EXTRACT(YEAR FROM NOW())',
-                        name='valid_publication_year'),
+                        name='valid_publication_year').ddl_if(dialect='postgresql'),
+        CheckConstraint('publication_year >= 1800',
+                        name='valid_publication_year_min').ddl_if(
+            callable_=lambda ddl, target, bind, dialect=None, **kw: dialect.name != 'postgresql'
+        ),
         db.Index('idx_book_search', 'title', 'author'),
     )
 
     @validates('isbn')
     def validate_isbn(self, key, isbn):
-        if not isbn:
-            return None
-
-        # 1. Limpeza básica
-        s = isbn.replace('-', '').replace(' ', '').upper()
-
-        # 2. ISBN-10?
-        if len(s) == 10:
-            if not all(c.isdigit() or (i == 9 and c == 'X') for i, c in enumerate(s)):
-                raise ValueError("ISBN-10 deve ter 9 dígitos e um dígito verificador (0–9 ou X).")
-            # checksum ISBN-10
-            total = sum((10 - i) * (10 if c == 'X' else int(c)) for i, c in enumerate(s))
-            if total % 11 != 0:
-                raise ValueError("Checksum inválido para ISBN-10.")
-            # converte para ISBN-13 (prefixo 978)
-            core = '978' + s[:-1]
-            # calcula novo dígito verificador ISBN-13
-            check = 0
-            for i, ch in enumerate(core):
-                n = int(ch)
-                check += n if i % 2 == 0 else 3 * n
-            cd = (10 - (check % 10)) % 10
-            return core + str(cd)
-
-        # 3. ISBN-13?
-        if len(s) == 13 and s.isdigit():
-            # checksum ISBN-13
-            total = sum((1 if i % 2 == 0 else 3) * int(ch) for i, ch in enumerate(s[:-1]))
-            cd = (10 - (total % 10)) % 10
-            if cd != int(s[-1]):
-                raise ValueError("Checksum inválido para ISBN-13.")
-            return s
-
-        # 4. Qualquer outro formato
-        raise ValueError("ISBN deve ser ISBN-10 (10 chars, último pode ser X) ou ISBN-13 (13 dígitos).")
+        return normalize_isbn(isbn)
 
 
 class UserBooks(db.Model):
@@ -202,6 +236,8 @@ class UserBooks(db.Model):
     # Constraints
     __table_args__ = (
         CheckConstraint('quantity >= 1', name='valid_quantity'),
+        db.Index('idx_user_books_user', 'user_id', 'book_id'),
+        db.Index('idx_user_books_acquired', 'user_id', 'acquisition_date'),
     )
     
     @validates('quantity')
@@ -325,30 +361,162 @@ class APIMetrics(db.Model):
         return f'<APIMetrics endpoint={self.endpoint} time={self.response_time_ms}ms>'
 
 
-# ============================================================================
-# SQLAlchemy Event Listeners - Cache Invalidation
-# ============================================================================
+class APIMetricsRollup(db.Model):
+    """
+    APIMetrics samples aggregated per endpoint and minute or hour.
 
-@event.listens_for(UserBooks, 'after_insert')
-def invalidate_user_cache_on_insert(mapper, connection, target):
+    Written by app.services.metrics_rollup, which then prunes the raw rows.
+    `histogram` holds response-time counts per log-linear bucket as JSON, so
+    hourly rollups and percentiles over any range come from rollups alone.
+    """
+    __tablename__ = 'api_metrics_rollups'
+    id = db.Column(db.Integer, primary_key=True)
+    endpoint = db.Column(db.String(100), nullable=False)
+    resolution = db.Column(db.String(10), nullable=False)  # 'minute' ou 'hour'
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    count = db.Column(db.Integer, default=0, nullable=False)
+    error_count = db.Column(db.Integer, default=0, nullable=False)
+    cache_hit_count = db.Column(db.Integer, default=0, nullable=False)
+    total_ms = db.Column(db.Float, default=0.0, nullable=False)
+    max_ms = db.Column(db.Float, default=0.0, nullable=False)
+    p50_ms = db.Column(db.Float, nullable=True)
+    p95_ms = db.Column(db.Float, nullable=True)
+    histogram = db.Column(db.Text, nullable=False, default='{}')
+
+    __table_args__ = (
+        db.UniqueConstraint('resolution', 'endpoint', 'bucket_start', name='uq_metrics_rollup_bucket'),
+        db.Index('idx_metrics_rollup_time', 'resolution', 'bucket_start'),
+    )
+
+    def __repr__(self):
+        return f'<APIMetricsRollup {self.resolution} {self.endpoint} {self.bucket_start}>'
+
+
+class BookCodeCounter(db.Model):
     """
-    Invalida cached_property do User quando um novo livro é adicionado.
-    Garante que favorite_genre e last_book_added sejam recalculados.
+    Last shelf-code suffix used per code prefix (e.g. 'A300d').
+
+    Incremented atomically by app.models.code_book.reserve_book_codes;
+    last_suffix is -1 when no code was issued and 0 when only the base
+    code ('A300d') was.
     """
-    if hasattr(target.user, 'favorite_genre'):
-        del target.user.__dict__['favorite_genre']
-    if hasattr(target.user, 'last_book_added'):
-        del target.user.__dict__['last_book_added']
+    __tablename__ = 'book_code_counters'
+    prefix = db.Column(db.String(20), primary_key=True)
+    last_suffix = db.Column(db.Integer, default=-1, nullable=False)
 
+    def __repr__(self):
+        return f'<BookCodeCounter {self.prefix}={self.last_suffix}>'
 
-@event.listens_for(UserBooks, 'after_delete')
-def invalidate_user_cache_on_delete(mapper, connection, target):
+
+class UserStats(db.Model):
     """
-    Invalida cached_property do User quando um livro é removido.
-    Evita dados desatualizados na interface.
+    Collection statistics of one user, maintained incrementally.
+
+    Written only by app.services.user_stats (from the listeners below and
+    bulk imports); the genre histogram lives in UserGenreCount.
     """
-    if hasattr(target.user, 'favorite_genre'):
-        del target.user.__dict__['favorite_genre']
-    if hasattr(target.user, 'last_book_added'):
-        del target.user.__dict__['last_book_added']
+    __tablename__ = 'user_stats'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    book_count = db.Column(db.Integer, default=0, nullable=False)
+    total_pages = db.Column(db.Integer, default=0, nullable=False)
+    last_user_book_id = db.Column(db.Integer, nullable=True)
+    last_acquisition_date = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<UserStats user_id={self.user_id} books={self.book_count}>'
 
+
+class UserGenreCount(db.Model):
+    """Books per genre in a user's collection (rows with count 0 are deleted)."""
+    __tablename__ = 'user_genre_counts'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    genre = db.Column(db.String(50), primary_key=True)
+    count = db.Column(db.Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        db.Index('idx_user_genre_counts_top', 'user_id', 'count'),
+    )
+
+    def __repr__(self):
+        return f'<UserGenreCount user_id={self.user_id} {self.genre}={self.count}>'
+
+
+# ============================================================================
+# SQLAlchemy Event Listeners - User Stats
+# ============================================================================
+# Os listeners usam a `connection` do flush (mesma transação) e nunca fazem
+# lazy load: só descartam `stats` de um User que já esteja carregado.
+
+def _discard_user_stats(user_book):
+    user = user_book.__dict__.get('user')
+    if user is not None:
+        user.__dict__.pop('stats', None)
+
+
+@event.listens_for(User, 'after_insert')
+def create_user_stats(mapper, connection, target):
+    """Todo usuário novo nasce com seu registro de estatísticas (zerado)."""
+    connection.execute(db.insert(UserStats).values(
+        user_id=target.id, book_count=0, total_pages=0, updated_at=datetime.utcnow()
+    ))
+
+
+@event.listens_for(User, 'before_delete')
+def delete_user_stats(mapper, connection, target):
+    connection.execute(db.delete(UserGenreCount).where(UserGenreCount.user_id == target.id))
+    connection.execute(db.delete(UserStats).where(UserStats.user_id == target.id))
+
+
+@event.listens_for(UserBooks, 'after_insert')
+def update_user_stats_on_insert(mapper, connection, target):
+    """Soma o livro adicionado às estatísticas do usuário."""
+    from app.services.user_stats import on_user_book_added
+
+    on_user_book_added(connection, target)
+    _discard_user_stats(target)
+
+
+@event.listens_for(UserBooks, 'after_delete')
+def update_user_stats_on_delete(mapper, connection, target):
+    """Desconta o livro removido das estatísticas do usuário."""
+    from app.services.user_stats import on_user_book_removed
+
+    on_user_book_removed(connection, target)
+    _discard_user_stats(target)
+
+
+@event.listens_for(UserBooks, 'after_update')
+def update_user_stats_on_update(mapper, connection, target):
+    """Reflete troca de usuário/livro ou de data de aquisição."""
+    from app.services.user_stats import on_user_book_changed
+
+    state = inspect(target)
+    user_id = state.attrs.user_id.history
+    book_id = state.attrs.book_id.history
+    if not (user_id.has_changes() or book_id.has_changes()
+            or state.attrs.acquisition_date.history.has_changes()):
+        return
+    old_user_id = user_id.deleted[0] if user_id.deleted else target.user_id
+    old_book_id = book_id.deleted[0] if book_id.deleted else target.book_id
+    on_user_book_changed(connection, target, old_user_id, old_book_id)
+    _discard_user_stats(target)
+
+
+@event.listens_for(Book, 'after_update')
+def update_user_stats_on_book_update(mapper, connection, target):
+    """Gênero ou páginas de um livro mudaram: ajusta os usuários que o têm."""
+    from app.services.user_stats import on_book_changed
+
+    state = inspect(target)
+    genre = state.attrs.genre.history
+    pages = state.attrs.pages.history
+    if not (genre.has_changes() or pages.has_changes()):
+        return
+    on_book_changed(
+        connection, target,
+        genre.deleted[0] if genre.deleted else target.genre,
+        pages.deleted[0] if pages.deleted else target.pages,
+    )
+    for user_book in target.__dict__.get('user_books', ()):
+        _discard_user_stats(user_book)
@@ -1,3 +1,4 @@
+import hmac
 from functools import wraps
 from typing import Callable, Optional
 
@@ -24,6 +25,26 @@ def require_https(f):
     return decorated_function
 
 
+def require_metrics_access(f):
+    """
+    Protege endpoints de métricas.
+
+    Com METRICS_TOKEN configurado exige `Authorization: Bearer <token>`;
+    sem token, só responde em modo debug (404 em produção).
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        token = current_app.config.get('METRICS_TOKEN')
+        if token:
+            supplied = request.headers.get('Authorization', '')
+            if not hmac.compare_digest(supplied.encode(), f'Bearer {token}'.encode()):
+                return Response('Unauthorized', 401, {'WWW-Authenticate': 'Bearer'})
+        elif not current_app.debug:
+            return Response('Not Found', 404)
+        return f(*args, **kwargs)
+    return decorated_function
+
+
 def seo_meta(
     title: Optional[Callable] = None,
     description: Optional[Callable] = None,
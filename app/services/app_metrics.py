@@ -0,0 +1,153 @@
+# app_metrics.py
+"""
+Prometheus metrics for the application (prometheus_client).
+
+Exported on /metrics in the text exposition format:
+- http_request_duration_seconds: latency histogram per endpoint, method and
+  status class, with log-linear (HDR-style) buckets
+- http_request_db_statements: SQL statements per request (see query_stats)
+- db_slow_statements_total: statements at or above SLOW_QUERY_MS, per
+  endpoint (the normalized SQL is only on /metrics/queries, per worker)
+- cache_requests_total: OpenLibrary search cache hits/stale hits/prefix
+  hits/misses
+- upstream_requests_total / upstream_request_duration_seconds: outbound
+  calls per endpoint and outcome (status class, 'error', 'circuit_open')
+- rate_limit_rejections_total: requests refused by Flask-Limiter (429)
+- db_pool_connections: SQLAlchemy pool connections by state
+
+Multiprocess mode: when PROMETHEUS_MULTIPROC_DIR is set before the app is
+imported (gunicorn.conf.py does it), every worker writes its samples to
+mmap files in that directory and /metrics merges all workers' files, so a
+scrape hitting any worker sees the totals. The directory must be emptied on
+server start and dead workers marked (both done in gunicorn.conf.py).
+"""
+import os
+import time
+from typing import List, Tuple
+
+from flask import g, request
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter,
+                               Gauge, Histogram, generate_latest)
+from sqlalchemy import event
+
+
+def log_linear_buckets(low: float = 0.001, high: float = 30.0, per_decade: int = 10) -> Tuple[float, ...]:
+    """
+    Histogram bounds spaced evenly on a log scale, like HdrHistogram's.
+
+    With 10 buckets per decade consecutive bounds differ by ~26%, so a
+    quantile estimated by interpolation is within ~13% of the true value at
+    any latency, instead of the coarse tail of the default buckets.
+    """
+    buckets: List[float] = []
+    exponent = 0
+    while True:
+        bound = float('%.3g' % (low * 10 ** (exponent / per_decade)))
+        if bound > high:
+            break
+        buckets.append(bound)
+        exponent += 1
+    return tuple(buckets)
+
+
+LATENCY_BUCKETS = log_linear_buckets()
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, 233, 500, 1000, 5000)
+
+HTTP_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Request latency',
+    ['endpoint', 'method', 'status'], buckets=LATENCY_BUCKETS
+)
+HTTP_DB_STATEMENTS = Histogram(
+    'http_request_db_statements', 'SQL statements per request',
+    ['endpoint'], buckets=STATEMENT_BUCKETS
+)
+DB_SLOW_STATEMENTS = Counter(
+    'db_slow_statements', 'SQL statements at or above SLOW_QUERY_MS', ['endpoint']
+)
+CACHE_REQUESTS = Counter(
+    'cache_requests_total', 'Cache lookups by result', ['cache', 'result']
+)
+UPSTREAM_REQUESTS = Counter(
+    'upstream_requests_total', 'Outbound API calls by outcome', ['endpoint', 'outcome']
+)
+UPSTREAM_LATENCY = Histogram(
+    'upstream_request_duration_seconds', 'Outbound API call latency (until headers)',
+    ['endpoint'], buckets=LATENCY_BUCKETS
+)
+RATE_LIMIT_REJECTIONS = Counter(
+    'rate_limit_rejections_total', 'Requests rejected by the rate limiter', ['endpoint']
+)
+DB_POOL_CONNECTIONS = Gauge(
+    'db_pool_connections', 'SQLAlchemy pool connections by state',
+    ['state'], multiprocess_mode='livesum'
+)
+
+
+def record_cache(cache_name: str, result: str):
+    """Count one cache lookup ('hit', 'stale', 'prefix_hit', 'miss')."""
+    CACHE_REQUESTS.labels(cache_name, result).inc()
+
+
+def record_upstream(endpoint: str, outcome: str, seconds: float = None):
+    """Count one outbound call; `outcome` is a status class ('2xx'), 'error' or 'circuit_open'."""
+    UPSTREAM_REQUESTS.labels(endpoint, outcome).inc()
+    if seconds is not None:
+        UPSTREAM_LATENCY.labels(endpoint).observe(seconds)
+
+
+def _update_pool_gauges(pool, returning: int = 0):
+    # Only QueuePool (production) tracks these; SQLite test pools don't.
+    # The checkin event fires before the connection is back in the queue,
+    # hence `returning`.
+    if not hasattr(pool, 'checkedout'):
+        return
+    DB_POOL_CONNECTIONS.labels('checked_out').set(pool.checkedout() - returning)
+    DB_POOL_CONNECTIONS.labels('idle').set(pool.checkedin() + returning)
+    DB_POOL_CONNECTIONS.labels('overflow').set(max(pool.overflow(), 0))
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Return the exposition body and its content type, merging workers in multiprocess mode."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def init_app_metrics(app):
+    """Register request timing hooks and DB pool listeners; no-op when METRICS_ENABLED is False."""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    from app import db
+    with app.app_context():
+        pool = db.engine.pool
+    event.listen(pool, 'checkout', lambda *args: _update_pool_gauges(pool))
+    event.listen(pool, 'checkin', lambda *args: _update_pool_gauges(pool, returning=1))
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        endpoint = request.endpoint or 'unmatched'
+        if response.status_code == 429:
+            # The limiter rejects from its own before_request, before the timer starts
+            RATE_LIMIT_REJECTIONS.labels(endpoint).inc()
+
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            status = f'{response.status_code // 100}xx'
+            HTTP_LATENCY.labels(endpoint, request.method, status).observe(
+                time.perf_counter() - started
+            )
+        stats = g.get('query_stats')
+        if stats is not None:
+            HTTP_DB_STATEMENTS.labels(endpoint).observe(stats.count)
+            if stats.slow:
+                DB_SLOW_STATEMENTS.labels(endpoint).inc(len(stats.slow))
+        return response
@@ -0,0 +1,330 @@
+# autocomplete_index.py
+"""
+In-process trigram/prefix index for the local half of autocomplete.
+
+Keeps one small index per user, built from that user's Book rows and
+normalized with `normalize_search_text`, so `/autocomplete` can answer
+"books already in my collection" without a database round trip per keystroke.
+
+Provides:
+- Lazy build on first query, incremental updates on register/import
+- Accent- and case-insensitive prefix matching on title and author
+- Substring matching on ISBN digits
+- Global entry cap with LRU eviction and idle-user eviction
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+from app import db
+from app.models.modelsdb import Book, UserBooks
+from app.utils.cache_keys import get_user_cache_version
+from app.utils.sanitize import normalize_search_text
+
+logger = logging.getLogger(__name__)
+
+# Marks the start of a field so trigrams like "^ma" only match prefixes
+ANCHOR = '^'
+
+
+def _trigrams(text: str) -> Set[str]:
+    """Return the set of 3-character grams of `text`."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _isbn_digits(value: Optional[str]) -> str:
+    return (value or '').replace('-', '').replace(' ', '')
+
+
+class UserCollectionIndex:
+    """
+    Trigram/prefix index over a single user's collection.
+
+    Title and author are indexed with anchored trigrams ("^" + text), so a
+    query's trigrams narrow the candidates to books whose title or author
+    starts with the query. ISBN digits are indexed with plain trigrams for
+    substring search. Candidates are always re-checked against the
+    normalized text before being returned.
+    """
+
+    def __init__(self):
+        self.entries: Dict[int, Dict] = {}
+        self._keys: Dict[int, tuple] = {}
+        self._grams: Dict[str, Set[int]] = defaultdict(set)
+        self._isbn_grams: Dict[str, Set[int]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, book_id: int, entry: Dict):
+        """Add or replace a book entry."""
+        if book_id in self.entries:
+            self.remove(book_id)
+
+        title_norm = normalize_search_text(entry.get('title'))
+        author_norm = normalize_search_text(entry.get('author'))
+        isbn = _isbn_digits(entry.get('isbn'))
+
+        self.entries[book_id] = entry
+        self._keys[book_id] = (title_norm, author_norm, isbn)
+
+        for gram in _trigrams(ANCHOR + title_norm) | _trigrams(ANCHOR + author_norm):
+            self._grams[gram].add(book_id)
+        for gram in _trigrams(isbn):
+            self._isbn_grams[gram].add(book_id)
+
+    def remove(self, book_id: int):
+        """Remove a book entry if present."""
+        keys = self._keys.pop(book_id, None)
+        self.entries.pop(book_id, None)
+        if keys is None:
+            return
+
+        title_norm, author_norm, isbn = keys
+        for gram in _trigrams(ANCHOR + title_norm) | _trigrams(ANCHOR + author_norm):
+            self._discard(self._grams, gram, book_id)
+        for gram in _trigrams(isbn):
+            self._discard(self._isbn_grams, gram, book_id)
+
+    @staticmethod
+    def _discard(postings: Dict[str, Set[int]], gram: str, book_id: int):
+        ids = postings.get(gram)
+        if ids is not None:
+            ids.discard(book_id)
+            if not ids:
+                del postings[gram]
+
+    @staticmethod
+    def _intersect(postings: Dict[str, Set[int]], grams: Iterable[str]) -> Set[int]:
+        sets = [postings.get(gram, set()) for gram in grams]
+        if not sets:
+            return set()
+        sets.sort(key=len)
+        result = set(sets[0])
+        for other in sets[1:]:
+            result &= other
+            if not result:
+                break
+        return result
+
+    def search(self, query: str, limit: int = 15) -> List[Dict]:
+        """
+        Find books whose title or author starts with `query`.
+
+        Numeric queries (ISBN-like) also match books whose ISBN contains
+        the query digits.
+
+        Args:
+            query: Raw search string typed by the user
+            limit: Maximum number of results
+
+        Returns:
+            List of entry dicts sorted by title
+        """
+        query_norm = normalize_search_text(query)
+        if len(query_norm) < 2:
+            return []
+
+        candidates = self._intersect(self._grams, _trigrams(ANCHOR + query_norm))
+        matches = {
+            book_id for book_id in candidates
+            if self._keys[book_id][0].startswith(query_norm)
+            or self._keys[book_id][1].startswith(query_norm)
+        }
+
+        digits = _isbn_digits(query)
+        if digits.isdigit():
+            if len(digits) >= 3:
+                isbn_candidates = self._intersect(self._isbn_grams, _trigrams(digits))
+            else:
+                isbn_candidates = self._keys.keys()
+            matches.update(
+                book_id for book_id in isbn_candidates
+                if digits in self._keys[book_id][2]
+            )
+
+        ordered = sorted(matches, key=lambda book_id: (self._keys[book_id][0], book_id))
+        return [self.entries[book_id] for book_id in ordered[:limit]]
+
+
+class AutocompleteIndex:
+    """
+    Registry of per-user collection indexes with a memory cap.
+
+    Indexes are built lazily from the database on a user's first query and
+    kept in LRU order. When the total number of indexed books exceeds
+    `max_entries`, least recently used users are evicted; users idle for
+    longer than `idle_seconds` are evicted on the next sweep. Indexes older
+    than `max_age_seconds` are rebuilt so changes made in other worker
+    processes eventually become visible.
+
+    Each index also remembers the user's cache version (see
+    app.utils.cache_keys) it was built at; when another worker bumps the
+    version after a write, the index is rebuilt on the next query.
+    """
+
+    def __init__(self, max_entries: int = 50000, idle_seconds: int = 1800,
+                 max_age_seconds: int = 300):
+        self.max_entries = max_entries
+        self.idle_seconds = idle_seconds
+        self.max_age_seconds = max_age_seconds
+        self._indexes: 'OrderedDict[int, dict]' = OrderedDict()
+        self._total_entries = 0
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def entry_from_book(book) -> Dict:
+        """Build the autocomplete payload for a Book row or column tuple."""
+        return {
+            'title': book.title,
+            'author': book.author,
+            'cover_url': book.cover_url,
+            'genre': book.genre,
+            'year': book.publication_year,
+            'publisher': book.publisher,
+            'pages': book.pages,
+            'isbn': book.isbn,
+            'country_of_origin': book.country_of_origin,
+            'original_language': book.original_language,
+            'source': 'local'
+        }
+
+    def _load_rows(self, user_id: int):
+        return db.session.query(
+            Book.id, Book.title, Book.author, Book.cover_url, Book.genre,
+            Book.publication_year, Book.publisher, Book.pages, Book.isbn,
+            Book.country_of_origin, Book.original_language
+        ).join(
+            UserBooks, Book.id == UserBooks.book_id
+        ).filter(
+            UserBooks.user_id == user_id
+        ).all()
+
+    def _build(self, user_id: int) -> Optional[UserCollectionIndex]:
+        rows = self._load_rows(user_id)
+        if len(rows) > self.max_entries:
+            logger.info(
+                f"Autocomplete index skipped for user {user_id}: "
+                f"{len(rows)} books exceeds cap of {self.max_entries}"
+            )
+            return None
+
+        index = UserCollectionIndex()
+        for row in rows:
+            index.add(row.id, self.entry_from_book(row))
+        return index
+
+    def _get(self, user_id: int) -> Optional[UserCollectionIndex]:
+        now = time.monotonic()
+        version = get_user_cache_version(user_id)
+        with self._lock:
+            slot = self._indexes.get(user_id)
+            if (slot and slot['version'] == version
+                    and now - slot['built_at'] <= self.max_age_seconds):
+                slot['last_access'] = now
+                self._indexes.move_to_end(user_id)
+                return slot['index']
+
+        index = self._build(user_id)
+        if index is None:
+            return None
+
+        with self._lock:
+            self._drop(user_id)
+            self._indexes[user_id] = {
+                'index': index, 'version': version, 'built_at': now, 'last_access': now
+            }
+            self._total_entries += len(index)
+            self._evict(now)
+        return index
+
+    def _drop(self, user_id: int):
+        slot = self._indexes.pop(user_id, None)
+        if slot:
+            self._total_entries -= len(slot['index'])
+
+    def _evict(self, now: float):
+        """Evict idle users, then least recently used ones until under the cap."""
+        idle = [
+            user_id for user_id, slot in self._indexes.items()
+            if now - slot['last_access'] > self.idle_seconds
+        ]
+        for user_id in idle:
+            self._drop(user_id)
+
+        while self._total_entries > self.max_entries and len(self._indexes) > 1:
+            user_id = next(iter(self._indexes))
+            self._drop(user_id)
+
+    def search(self, user_id: int, query: str, limit: int = 15) -> Optional[List[Dict]]:
+        """
+        Search a user's collection from memory.
+
+        Returns:
+            List of matching entries, or None if the user's collection is
+            too large to index (caller should fall back to the database)
+        """
+        index = self._get(user_id)
+        if index is None:
+            return None
+        return index.search(query, limit)
+
+    def add_books(self, user_id: int, books: Iterable, version: Optional[int] = None):
+        """
+        Add newly registered/imported books to the user's index, if built.
+
+        Args:
+            user_id: Owner of the books
+            books: Book instances (already flushed, so they have ids)
+            version: User cache version returned by the bump that followed
+                this write; adopted only if no other write happened since
+                the index was built, otherwise the next query rebuilds it
+        """
+        with self._lock:
+            slot = self._indexes.get(user_id)
+            if not slot:
+                return  # Built on demand with the new books included
+            index = slot['index']
+            before = len(index)
+            for book in books:
+                index.add(book.id, self.entry_from_book(book))
+            self._total_entries += len(index) - before
+            if version is not None and version == slot['version'] + 1:
+                slot['version'] = version
+            self._evict(time.monotonic())
+
+    def add_book(self, user_id: int, book, version: Optional[int] = None):
+        """Add a single book to the user's index, if built."""
+        self.add_books(user_id, [book], version=version)
+
+    def invalidate(self, user_id: int):
+        """Drop a user's index so the next query rebuilds it."""
+        with self._lock:
+            self._drop(user_id)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'users': len(self._indexes),
+                'entries': self._total_entries,
+                'max_entries': self.max_entries,
+            }
+
+
+# Singleton instance
+_index_instance = None
+
+
+def get_autocomplete_index() -> AutocompleteIndex:
+    """Get or create singleton instance of AutocompleteIndex."""
+    global _index_instance
+    if _index_instance is None:
+        from flask import current_app
+        _index_instance = AutocompleteIndex(
+            max_entries=current_app.config.get('AUTOCOMPLETE_INDEX_MAX_ENTRIES', 50000),
+            idle_seconds=current_app.config.get('AUTOCOMPLETE_INDEX_IDLE_SECONDS', 1800),
+            max_age_seconds=current_app.config.get('AUTOCOMPLETE_INDEX_MAX_AGE', 300),
+        )
+    return _index_instance
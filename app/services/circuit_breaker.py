@@ -0,0 +1,92 @@
+# circuit_breaker.py
+"""
+Minimal circuit breaker for upstream APIs.
+
+Stops calling a service that keeps failing, so requests fail fast (or serve
+stale data) instead of each waiting for a timeout.
+
+States:
+- closed: calls go through; consecutive failures are counted
+- open: calls are skipped until `reset_timeout` seconds have passed
+- half_open: one probe call is let through; success closes the circuit,
+  failure opens it again
+"""
+import logging
+import threading
+import time
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """Per-process circuit breaker; thread-safe."""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Args:
+            name: Service name used in log messages
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds to wait before probing an open circuit
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started = 0.0
+        self._skipped = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def allow(self) -> bool:
+        """Return True if a call may be made now."""
+        now = time.monotonic()
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and now - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                self._probe_started = now
+                return True
+            if self._state == self.HALF_OPEN and now - self._probe_started >= self.reset_timeout:
+                # The previous probe never reported back; let another one through
+                self._probe_started = now
+                return True
+            self._skipped += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"Circuit for {self.name} closed")
+            self._state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(
+                        f"Circuit for {self.name} opened after {self._failures} failure(s)"
+                    )
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'state': self._state,
+                'consecutive_failures': self._failures,
+                'skipped_calls': self._skipped,
+            }
@@ -0,0 +1,190 @@
+# collection_service.py
+"""
+Query helpers for a user's collection listing.
+
+Provides:
+- Keyset (seek) pagination ordered by (title, id) with opaque cursors, so
+  deep pages cost the same as page 1 (no OFFSET scan, no COUNT per page)
+- Slim projections that load only the columns the collection cards render
+  (loading profile 'collection', app/models/loading.py)
+- Exact or approximate collection counts, cached per user cache version
+"""
+import base64
+import json
+import logging
+from typing import List, Optional
+
+from sqlalchemy import text
+
+from app import db, cache
+from app.models.loading import loading_options
+from app.models.modelsdb import Book, UserBooks
+from app.utils.cache_keys import user_cache_key
+
+logger = logging.getLogger(__name__)
+
+
+def encode_cursor(title: str, book_id: int, direction: str, page: int) -> str:
+    """Encode a position in the (title, id) ordering as an opaque token."""
+    payload = json.dumps([title, book_id, direction, page], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: Optional[str]):
+    """
+    Decode a cursor token.
+
+    Returns:
+        (title, book_id, direction, page) or None if missing/invalid
+    """
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        title, book_id, direction, page = json.loads(base64.urlsafe_b64decode(padded))
+        if direction not in ('next', 'prev'):
+            return None
+        return str(title), int(book_id), direction, max(1, int(page))
+    except Exception:
+        return None
+
+
+class CollectionPage:
+    """
+    One page of a keyset-paginated collection.
+
+    Exposes the attributes the template's pagination block reads
+    (page, pages, has_prev, has_next) plus the cursors for the links.
+    """
+
+    def __init__(self, items: List, page: int, per_page: int, total: Optional[int],
+                 approximate: bool, next_cursor: Optional[str], prev_cursor: Optional[str]):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+        self.approximate = approximate
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self) -> bool:
+        return self.prev_cursor is not None
+
+    @property
+    def pages(self) -> int:
+        if self.total is None:
+            return self.page + (1 if self.has_next else 0)
+        # Never claim fewer pages than we can prove exist
+        counted = max(1, -(-self.total // self.per_page))
+        return max(counted, self.page + (1 if self.has_next else 0))
+
+
+def collection_query(user_id: int):
+    """(UserBooks, Book) rows for a user, loading only the card columns (profile 'collection')."""
+    return db.session.query(UserBooks, Book).join(
+        Book, Book.id == UserBooks.book_id
+    ).filter(
+        UserBooks.user_id == user_id
+    ).options(*loading_options('collection'))
+
+
+def paginate_collection(user_id: int, cursor: Optional[str] = None, per_page: int = 20,
+                        approximate_count: bool = False) -> CollectionPage:
+    """
+    Fetch one page of a user's collection ordered by (title, id).
+
+    Runs a single LIMIT per_page + 1 query seeking from the cursor position;
+    the extra row tells whether another page exists in that direction.
+
+    Args:
+        user_id: Collection owner
+        cursor: Token from a previous page's next_cursor/prev_cursor
+        per_page: Page size
+        approximate_count: Allow a planner estimate for large collections
+
+    Returns:
+        CollectionPage
+    """
+    position = decode_cursor(cursor)
+    query = collection_query(user_id)
+    page = 1
+    backwards = False
+
+    if position:
+        title, book_id, direction, page = position
+        key = db.tuple_(Book.title, Book.id)
+        if direction == 'next':
+            query = query.filter(key > db.tuple_(title, book_id))
+        else:
+            query = query.filter(key < db.tuple_(title, book_id))
+            backwards = True
+
+    if backwards:
+        query = query.order_by(Book.title.desc(), Book.id.desc())
+    else:
+        query = query.order_by(Book.title.asc(), Book.id.asc())
+
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    next_cursor = prev_cursor = None
+    if rows:
+        first_book, last_book = rows[0][1], rows[-1][1]
+        if (has_more and not backwards) or (backwards and position):
+            next_cursor = encode_cursor(last_book.title, last_book.id, 'next', page + 1)
+        if (has_more and backwards) or (position and not backwards):
+            prev_cursor = encode_cursor(first_book.title, first_book.id, 'prev', max(1, page - 1))
+        if backwards and not has_more:
+            # Walked back to the first page
+            page = 1
+            prev_cursor = None
+
+    total, approximate = count_collection(user_id, approximate=approximate_count)
+    return CollectionPage(rows, page, per_page, total, approximate, next_cursor, prev_cursor)
+
+
+def count_collection(user_id: int, approximate: bool = False, threshold: int = 10000):
+    """
+    Count a user's books, cached until the user's next write.
+
+    With `approximate=True` on PostgreSQL, the planner's row estimate is used
+    instead of COUNT(*) whenever it is above `threshold`.
+
+    Returns:
+        (count, is_approximate)
+    """
+    key = user_cache_key('collection_count', user_id, int(approximate))
+    cached = cache.get(key)
+    if cached is not None:
+        return tuple(cached)
+
+    result = None
+    if approximate and db.engine.dialect.name == 'postgresql':
+        try:
+            plan = db.session.execute(
+                text("EXPLAIN (FORMAT JSON) SELECT 1 FROM user_books WHERE user_id = :uid"),
+                {'uid': user_id}
+            ).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            estimate = int(plan[0]['Plan']['Plan Rows'])
+            if estimate > threshold:
+                result = (estimate, True)
+        except Exception as e:
+            logger.warning(f"Approximate count failed for user {user_id}: {e}")
+
+    if result is None:
+        result = (db.session.query(db.func.count(UserBooks.id)).filter(
+            UserBooks.user_id == user_id
+        ).scalar() or 0, False)
+
+    cache.set(key, list(result), timeout=3600)
+    return result
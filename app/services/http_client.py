@@ -0,0 +1,300 @@
+# http_client.py
+"""
+Shared HTTP client for outbound API calls (OpenLibrary, cover lookups, etc.).
+
+Replaces ad-hoc module-level `requests.get` calls, each of which opened a new
+TCP+TLS connection, with one pooled `requests.Session`:
+- Keep-alive connection pooling with a per-host connection limit
+- Retry with exponential backoff for idempotent requests (GET/HEAD), with a
+  retry policy per endpoint: interactive endpoints (search-as-you-type,
+  author lookups) only retry failed connects, never a slow read or a 5xx,
+  and Retry-After waits are capped
+- Timeouts tuned per endpoint, overridable via app config
+- Pool hit/miss counters for observability
+- Per-endpoint outcome counters and latency (app_metrics.record_upstream)
+"""
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+from app import __version__
+from app.services.app_metrics import record_upstream
+
+logger = logging.getLogger(__name__)
+
+# (connect, read) timeouts in seconds, per logical endpoint
+DEFAULT_TIMEOUTS: Dict[str, Tuple[float, float]] = {
+    'default': (3.05, 10),
+    'openlibrary_search': (3.05, 5),
+    'openlibrary_isbn': (3.05, 10),
+    'openlibrary_work': (3.05, 10),
+    'openlibrary_author': (3.05, 5),
+    'amazon': (3.05, 10),
+}
+
+# Retry policy per logical endpoint; endpoints not listed use 'default'.
+# - default: connect/read errors and RETRY_STATUSES, Retry-After honoured
+#   up to HTTP_RETRY_AFTER_MAX seconds
+# - interactive: connect errors only, so one slow keystroke costs at most
+#   one read timeout
+DEFAULT_RETRY_POLICIES: Dict[str, str] = {
+    'openlibrary_search': 'interactive',
+    'openlibrary_author': 'interactive',
+}
+
+
+class CappedRetry(Retry):
+    """Retry that sleeps at most `max_retry_after` seconds for a Retry-After header."""
+
+    def __init__(self, *args, max_retry_after: float = 2.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_retry_after = max_retry_after
+
+    def new(self, **kw):
+        retry = super().new(**kw)
+        retry.max_retry_after = self.max_retry_after
+        return retry
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, self.max_retry_after)
+
+
+class PoolStats:
+    """Thread-safe counters for connection pool reuse."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.new_connections = 0
+
+    def record_checkout(self):
+        with self._lock:
+            self.checkouts += 1
+
+    def record_new_connection(self):
+        with self._lock:
+            self.new_connections += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'pool_hits': self.checkouts - self.new_connections,
+                'pool_misses': self.new_connections,
+                'requests': self.checkouts,
+            }
+
+
+class _CountingPoolMixin:
+    """Counts connection checkouts and new connections on a urllib3 pool."""
+    stats: PoolStats = None
+
+    def _get_conn(self, timeout=None):
+        self.stats.record_checkout()
+        return super()._get_conn(timeout=timeout)
+
+    def _new_conn(self):
+        self.stats.record_new_connection()
+        return super()._new_conn()
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools report hits/misses to a PoolStats."""
+
+    def __init__(self, stats: PoolStats, **kwargs):
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': type('CountingHTTPConnectionPool',
+                         (_CountingPoolMixin, HTTPConnectionPool), {'stats': self.stats}),
+            'https': type('CountingHTTPSConnectionPool',
+                          (_CountingPoolMixin, HTTPSConnectionPool), {'stats': self.stats}),
+        }
+
+
+class HTTPClient:
+    """
+    Pooled, retrying HTTP client shared by all outbound API integrations.
+
+    Args:
+        pool_connections: Number of per-host pools kept alive
+        pool_maxsize: Maximum simultaneous connections per host
+        pool_block: Wait for a free connection instead of exceeding pool_maxsize
+        max_retries: Retries for idempotent requests on connection errors and
+            429/5xx responses ('default' policy)
+        interactive_retries: Connect retries for 'interactive' endpoints
+        max_retry_after: Longest Retry-After wait honoured (seconds)
+        backoff_factor: Exponential backoff base between retries (seconds)
+        timeouts: Per-endpoint (connect, read) timeout overrides
+        retry_policies: Per-endpoint retry policy overrides
+    """
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 10,
+                 pool_block: bool = True, max_retries: int = 2,
+                 interactive_retries: int = 1, max_retry_after: float = 2.0,
+                 backoff_factor: float = 0.3,
+                 timeouts: Optional[Dict[str, Tuple[float, float]]] = None,
+                 retry_policies: Optional[Dict[str, str]] = None):
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        self.timeouts.update(timeouts or {})
+        self.retry_policies = dict(DEFAULT_RETRY_POLICIES)
+        self.retry_policies.update(retry_policies or {})
+        self.pool_stats = PoolStats()
+
+        methods = frozenset({'GET', 'HEAD'})
+        self.retries = {
+            'default': CappedRetry(
+                total=max_retries,
+                backoff_factor=backoff_factor,
+                status_forcelist=self.RETRY_STATUSES,
+                allowed_methods=methods,
+                respect_retry_after_header=True,
+                max_retry_after=max_retry_after,
+                raise_on_status=False,
+            ),
+            'interactive': CappedRetry(
+                total=interactive_retries,
+                connect=interactive_retries,
+                read=0,
+                other=0,
+                backoff_factor=backoff_factor,
+                allowed_methods=methods,
+                respect_retry_after_header=False,
+                max_retry_after=0,
+                raise_on_status=False,
+            ),
+        }
+        # Retries are set per adapter, so each policy gets its own session;
+        # all of them report to the same pool counters
+        self.sessions = {
+            policy: self._build_session(retry, pool_connections, pool_maxsize, pool_block)
+            for policy, retry in self.retries.items()
+        }
+        self.session = self.sessions['default']
+
+    def _build_session(self, retry: Retry, pool_connections: int, pool_maxsize: int,
+                       pool_block: bool) -> requests.Session:
+        adapter = PooledHTTPAdapter(
+            self.pool_stats,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.headers['User-Agent'] = f'biblioteca-web/{__version__}'
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def timeout_for(self, endpoint: str) -> Tuple[float, float]:
+        """Return the (connect, read) timeout configured for an endpoint."""
+        return self.timeouts.get(endpoint, self.timeouts['default'])
+
+    def retry_for(self, endpoint: str) -> CappedRetry:
+        """Return the retry policy used for an endpoint."""
+        return self.retries[self.retry_policies.get(endpoint, 'default')]
+
+    def max_duration(self, endpoint: str) -> float:
+        """
+        Upper bound (seconds) on one get() to `endpoint`, up to the response headers.
+
+        Assumes every attempt times out and every retry sleeps its longest
+        backoff or Retry-After. Streamed bodies are read after this, under
+        the caller's own deadline.
+        """
+        connect, read = self.timeout_for(endpoint)
+        retry = self.retry_for(endpoint)
+        retry_after = retry.max_retry_after if retry.respect_retry_after_header else 0
+        duration = connect + read
+        for attempt in range(1, retry.total + 1):
+            backoff = 0 if attempt == 1 else min(retry.backoff_factor * 2 ** (attempt - 1),
+                                                 retry.backoff_max)
+            # With read=0 a retry can only follow a failed connect
+            duration += max(backoff, retry_after) + (connect if retry.read == 0 else connect + read)
+        return duration
+
+    def get(self, url: str, endpoint: str = 'default', params: Optional[Dict] = None,
+            headers: Optional[Dict] = None, timeout=None, **kwargs) -> requests.Response:
+        """
+        Perform a pooled GET request.
+
+        Args:
+            url: Absolute URL
+            endpoint: Logical endpoint name used to pick the timeout and
+                the retry policy
+            params: Query string parameters
+            headers: Extra request headers
+            timeout: Explicit timeout, overrides the endpoint default
+
+        Returns:
+            requests.Response (raises requests.RequestException on failure)
+        """
+        session = self.sessions[self.retry_policies.get(endpoint, 'default')]
+        start = time.perf_counter()
+        try:
+            response = session.get(
+                url,
+                params=params,
+                headers=headers,
+                timeout=timeout if timeout is not None else self.timeout_for(endpoint),
+                **kwargs
+            )
+        except requests.RequestException:
+            record_upstream(endpoint, 'error', time.perf_counter() - start)
+            raise
+        record_upstream(endpoint, f'{response.status_code // 100}xx', time.perf_counter() - start)
+        return response
+
+    def stats(self) -> Dict[str, int]:
+        """Return connection pool hit/miss counters."""
+        return self.pool_stats.snapshot()
+
+    def close(self):
+        for session in self.sessions.values():
+            session.close()
+
+
+# Singleton instance
+_client_instance = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> HTTPClient:
+    """
+    Get or create the shared HTTPClient.
+
+    Reads HTTP_* settings from the app config when called inside an app
+    context; defaults are used otherwise (e.g. from worker threads).
+    """
+    global _client_instance
+    if _client_instance is None:
+        with _client_lock:
+            if _client_instance is None:
+                from flask import current_app, has_app_context
+                config = current_app.config if has_app_context() else {}
+                _client_instance = HTTPClient(
+                    pool_connections=config.get('HTTP_POOL_CONNECTIONS', 10),
+                    pool_maxsize=config.get('HTTP_POOL_MAXSIZE', 10),
+                    pool_block=config.get('HTTP_POOL_BLOCK', True),
+                    max_retries=config.get('HTTP_MAX_RETRIES', 2),
+                    interactive_retries=config.get('HTTP_INTERACTIVE_RETRIES', 1),
+                    max_retry_after=config.get('HTTP_RETRY_AFTER_MAX', 2.0),
+                    backoff_factor=config.get('HTTP_BACKOFF_FACTOR', 0.3),
+                    timeouts=config.get('HTTP_TIMEOUTS'),
+                    retry_policies=config.get('HTTP_RETRY_POLICIES'),
+                )
+    return _client_instance
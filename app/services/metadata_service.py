@@ -10,10 +10,16 @@ Architecture inspired by Tellico's multi-source metadata fetching approach.
 """
 
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 import requests
-from flask import current_app
+from flask import current_app, has_app_context
+
+from app import cache
+from app.services.http_client import get_http_client
 
 
 class MetadataService:
@@ -31,11 +37,41 @@ class MetadataService:
     # Rate limiting configuration
     REQUESTS_PER_MINUTE = 100
     CACHE_TTL = 86400  # 24 hours in seconds
+
+    # Parallel fan-out configuration (seconds each source may take in
+    # search_all_sources before its results are dropped)
+    SOURCE_DEADLINES = {
+        'openlibrary': 8.0,
+        'google_books': 5.0,
+        'worldcat': 5.0,
+        'isbndb': 5.0,
+    }
+    MAX_WORKERS = 8
+
+    # Author names almost never change; keep them for a long time
+    AUTHOR_CACHE_TTL = 30 * 86400  # 30 days in seconds
+    AUTHOR_CACHE_MAX = 5000  # entries kept in the in-process map
+    # Large enough that a work's missing authors go out in a single wave
+    # (ISBN lookup = edition + work + authors, three round trips)
+    AUTHOR_FETCH_WORKERS = 16
     
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self._request_count = 0
         self._last_reset = datetime.now()
+        self._rate_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.MAX_WORKERS,
+            thread_name_prefix='metadata-source'
+        )
+        # Separate pool so author lookups never wait behind the source
+        # fan-out that may itself be resolving authors
+        self._author_executor = ThreadPoolExecutor(
+            max_workers=self.AUTHOR_FETCH_WORKERS,
+            thread_name_prefix='metadata-author'
+        )
+        self._author_names: Dict[str, str] = {}
+        self._author_lock = threading.Lock()
     
     def _check_rate_limit(self) -> bool:
         """
@@ -44,17 +80,18 @@ class MetadataService:
         Returns:
             bool: True if request is allowed, False if rate limited
         """
-        now = datetime.now()
-        if (now - self._last_reset).seconds >= 60:
-            self._request_count = 0
-            self._last_reset = now
-        
-        if self._request_count >= self.REQUESTS_PER_MINUTE:
-            self.logger.warning("Rate limit exceeded for metadata API")
-            return False
-        
-        self._request_count += 1
-        return True
+        with self._rate_lock:
+            now = datetime.now()
+            if (now - self._last_reset).seconds >= 60:
+                self._request_count = 0
+                self._last_reset = now
+
+            if self._request_count >= self.REQUESTS_PER_MINUTE:
+                self.logger.warning("Rate limit exceeded for metadata API")
+                return False
+
+            self._request_count += 1
+            return True
     
     def search_openlibrary(self, query: str, limit: int = 10) -> List[Dict]:
         """
@@ -84,7 +121,7 @@ class MetadataService:
                 'fields': 'key,title,author_name,first_publish_year,isbn,cover_i,publisher,subject,number_of_pages_median'
             }
             
-            response = requests.get(url, params=params, timeout=10)
+            response = get_http_client().get(url, endpoint='openlibrary_search', params=params)
             response.raise_for_status()
             
             data = response.json()
@@ -178,7 +215,7 @@ class MetadataService:
             clean_isbn = isbn.replace('-', '').replace(' ', '')
             
             url = f"{self.OPENLIBRARY_BASE_URL}/isbn/{clean_isbn}.json"
-            response = requests.get(url, timeout=10)
+            response = get_http_client().get(url, endpoint='openlibrary_isbn')
             
             if response.status_code == 404:
                 self.logger.info(f"Book not found for ISBN: {isbn}")
@@ -221,7 +258,7 @@ class MetadataService:
         """
         try:
             url = f"{self.OPENLIBRARY_BASE_URL}{work_key}.json"
-            response = requests.get(url, timeout=10)
+            response = get_http_client().get(url, endpoint='openlibrary_work')
             response.raise_for_status()
             
             data = response.json()
@@ -243,9 +280,9 @@ class MetadataService:
             if covers and covers[0]:
                 cover_url = f"{self.OPENLIBRARY_COVERS_URL}/id/{covers[0]}-L.jpg"
             
-            # Get authors
+            # Get authors (deduplicated, cached, missing ones fetched concurrently)
             author_keys = [a.get('author', {}).get('key') for a in data.get('authors', [])]
-            author_names = [self._get_author_name(key) for key in author_keys if key]
+            author_names = self._resolve_author_names(author_keys)
             
             return {
                 'author': ', '.join(filter(None, author_names)) or 'Unknown Author',
@@ -258,6 +295,65 @@ class MetadataService:
             self.logger.warning(f"Failed to fetch work details for {work_key}: {str(e)}")
             return {}
     
+    def _resolve_author_names(self, author_keys: List[Optional[str]]) -> List[Optional[str]]:
+        """
+        Resolve OpenLibrary author keys to names in at most one round trip.
+        
+        Keys are deduplicated and looked up in the in-process map, then in
+        the shared cache; whatever is still missing is fetched concurrently
+        and written back to both.
+        
+        Args:
+            author_keys: Author identifiers (None entries are ignored)
+            
+        Returns:
+            Author names in the order of the unique keys (None if unresolved)
+        """
+        unique_keys = list(dict.fromkeys(key for key in author_keys if key))
+        names = {}
+        
+        with self._author_lock:
+            for key in unique_keys:
+                if key in self._author_names:
+                    names[key] = self._author_names[key]
+        
+        missing = [key for key in unique_keys if key not in names]
+        if missing and has_app_context():
+            try:
+                cached = cache.get_many(*[f'openlibrary_author:{key}' for key in missing])
+                for key, name in zip(missing, cached):
+                    if name:
+                        names[key] = name
+                        self._remember_author(key, name)
+            except Exception as e:
+                self.logger.warning(f"Author cache lookup failed: {str(e)}")
+            missing = [key for key in missing if key not in names]
+        
+        if missing:
+            fetched = {}
+            for key, name in zip(missing, self._author_executor.map(self._get_author_name, missing)):
+                if name:
+                    names[key] = fetched[key] = name
+                    self._remember_author(key, name)
+            if fetched and has_app_context():
+                try:
+                    cache.set_many(
+                        {f'openlibrary_author:{key}': name for key, name in fetched.items()},
+                        timeout=self.AUTHOR_CACHE_TTL
+                    )
+                except Exception as e:
+                    self.logger.warning(f"Author cache write failed: {str(e)}")
+        
+        return [names.get(key) for key in unique_keys]
+    
+    def _remember_author(self, author_key: str, name: str):
+        """Store an author name in the bounded in-process map."""
+        with self._author_lock:
+            if len(self._author_names) >= self.AUTHOR_CACHE_MAX:
+                # Drop the oldest entry (dicts keep insertion order)
+                self._author_names.pop(next(iter(self._author_names)))
+            self._author_names[author_key] = name
+    
     def _get_author_name(self, author_key: str) -> Optional[str]:
         """
         Fetch author name from OpenLibrary.
@@ -270,7 +366,7 @@ class MetadataService:
         """
         try:
             url = f"{self.OPENLIBRARY_BASE_URL}{author_key}.json"
-            response = requests.get(url, timeout=5)
+            response = get_http_client().get(url, endpoint='openlibrary_author')
             response.raise_for_status()
             data = response.json()
             return data.get('name')
@@ -305,7 +401,13 @@ class MetadataService:
     
     def search_all_sources(self, query: str, limit: int = 10) -> Dict[str, List[Dict]]:
         """
-        Search all available metadata sources.
+        Search all available metadata sources in parallel.
+        
+        Every source is submitted to a bounded thread pool at once and given
+        its own deadline from SOURCE_DEADLINES, so total latency is that of
+        the slowest source still within its deadline rather than the sum of
+        all sources. Sources that fail or miss their deadline contribute an
+        empty list (partial results).
         
         Args:
             query: Search term
@@ -317,16 +419,100 @@ class MetadataService:
         TODO: Implement Google Books API integration
         TODO: Implement WorldCat API integration
         TODO: Implement ISBN DB integration
-        TODO: Add parallel request processing for better performance
         """
-        results = {
-            'openlibrary': self.search_openlibrary(query, limit),
-            # TODO: Uncomment when implemented
-            # 'google_books': self.search_google_books(query, limit),
-            # 'worldcat': self.search_worldcat(query, limit),
+        sources = {
+            'openlibrary': lambda: self.search_openlibrary(query, limit),
+            'google_books': lambda: self.search_google_books(query, limit),
+            'worldcat': lambda: self.search_worldcat(query, limit),
         }
+        if self._looks_like_isbn(query):
+            sources['isbndb'] = lambda: [
+                book for book in [self.search_isbndb(query)] if book
+            ]
+        
+        start = time.monotonic()
+        futures = {name: self._executor.submit(fn) for name, fn in sources.items()}
+        
+        results = {}
+        timed_out = []
+        # Wait on the shortest deadlines first; slower sources keep running
+        # in the meantime, so waits overlap instead of adding up
+        for name in sorted(futures, key=lambda n: self.SOURCE_DEADLINES.get(n, 5.0)):
+            deadline = start + self.SOURCE_DEADLINES.get(name, 5.0)
+            try:
+                results[name] = futures[name].result(
+                    timeout=max(0.0, deadline - time.monotonic())
+                ) or []
+            except FutureTimeoutError:
+                futures[name].cancel()
+                timed_out.append(name)
+                results[name] = []
+            except Exception as e:
+                self.logger.error(f"Metadata source '{name}' failed: {str(e)}")
+                results[name] = []
+        
+        if timed_out:
+            self.logger.warning(
+                f"Metadata sources timed out for '{query}': {', '.join(timed_out)}"
+            )
+        self.logger.info(
+            f"search_all_sources for '{query}' took "
+            f"{(time.monotonic() - start) * 1000:.2f}ms"
+        )
+        return {name: results[name] for name in sources}
+    
+    def search_merged(self, query: str, limit: int = 10) -> List[Dict]:
+        """
+        Search all sources in parallel and merge results deduplicated by ISBN.
         
-        return results
+        Args:
+            query: Search term
+            limit: Maximum results per source
+            
+        Returns:
+            Merged list of book dictionaries
+        """
+        return self.merge_results(self.search_all_sources(query, limit))
+    
+    @staticmethod
+    def merge_results(results_by_source: Dict[str, List[Dict]]) -> List[Dict]:
+        """
+        Merge per-source results, deduplicating books by ISBN.
+        
+        Sources are merged in the order given; the first source to return an
+        ISBN wins, and later duplicates only fill in fields it left empty.
+        Books without an ISBN are kept as-is.
+        
+        Args:
+            results_by_source: Output of search_all_sources
+            
+        Returns:
+            Merged list of book dictionaries
+        """
+        merged = []
+        by_isbn = {}
+        for books in results_by_source.values():
+            for book in books:
+                isbn = (book.get('isbn') or '').replace('-', '').replace(' ', '')
+                if not isbn:
+                    merged.append(dict(book))
+                    continue
+                existing = by_isbn.get(isbn)
+                if existing is None:
+                    by_isbn[isbn] = dict(book)
+                    merged.append(by_isbn[isbn])
+                    continue
+                for key, value in book.items():
+                    if value and not existing.get(key):
+                        existing[key] = value
+        return merged
+    
+    @staticmethod
+    def _looks_like_isbn(query: str) -> bool:
+        digits = query.replace('-', '').replace(' ', '').upper()
+        return len(digits) in (10, 13) and digits[:-1].isdigit() and (
+            digits[-1].isdigit() or digits[-1] == 'X'
+        )
     
     # =======================================================================
     # TODO: Future API Integrations
@@ -0,0 +1,170 @@
+# metrics_recorder.py
+"""
+Write-behind recorder for APIMetrics samples.
+
+Recording a metric used to add an APIMetrics row and commit the request's
+session, adding a synchronous DB round trip to every upstream call (and
+committing anything else pending in that session). Samples are now buffered
+in memory and written in bulk (executemany) by a background thread:
+- Flushes when the buffer reaches `flush_size` or every `flush_interval` s
+- Uses its own engine connection, never the request's session
+- Flushes on interpreter shutdown
+- Bounded buffer; samples arriving while it is full are dropped and counted
+"""
+import atexit
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app import db
+from app.models.modelsdb import APIMetrics
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsRecorder:
+    """
+    Buffers APIMetrics samples and flushes them in batches.
+
+    Args:
+        flush_size: Buffer length that triggers an immediate flush
+        flush_interval: Maximum seconds a sample waits before being flushed
+        max_buffer: Samples kept in memory before new ones are dropped
+    """
+
+    def __init__(self, flush_size: int = 100, flush_interval: float = 5.0,
+                 max_buffer: int = 10000):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+
+        self._buffer: List[Dict] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid = None
+        self._engine = None
+
+        self.dropped = 0
+        self.flushed = 0
+        self.failed_flushes = 0
+
+    def record(self, endpoint: str, response_time_ms: float, query: Optional[str] = None,
+               results_count: int = 0, cache_hit: bool = False,
+               error_occurred: bool = False, error_message: Optional[str] = None):
+        """
+        Queue one APIMetrics sample. Never blocks on the database.
+
+        Must be called inside an app context the first time so the recorder
+        can bind to the application's engine.
+        """
+        if self._engine is None:
+            self._engine = db.engine
+        self._ensure_thread()
+
+        sample = {
+            'endpoint': endpoint,
+            'query': query[:200] if query else query,
+            'response_time_ms': response_time_ms,
+            'results_count': results_count,
+            'cache_hit': cache_hit,
+            'error_occurred': error_occurred,
+            'error_message': error_message,
+            'timestamp': datetime.utcnow(),
+        }
+        with self._lock:
+            if len(self._buffer) >= self.max_buffer:
+                self.dropped += 1
+                return
+            self._buffer.append(sample)
+            should_flush = len(self._buffer) >= self.flush_size
+
+        if should_flush:
+            self._wakeup.set()
+
+    def _ensure_thread(self):
+        # After a fork the parent's thread does not exist in the child:
+        # start a fresh one and forget samples inherited from the parent
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == pid and self._thread.is_alive():
+                return
+            if self._pid is not None and self._pid != pid:
+                self._buffer = []
+            self._pid = pid
+            self._stopped.clear()
+            self._thread = threading.Thread(
+                target=self._run, name='metrics-recorder', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Write all buffered samples in one batch.
+
+        Returns:
+            Number of samples written
+        """
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if not batch or self._engine is None:
+            return 0
+
+        try:
+            with self._engine.begin() as connection:
+                connection.execute(APIMetrics.__table__.insert(), batch)
+            self.flushed += len(batch)
+            return len(batch)
+        except Exception as e:
+            # Metrics are not critical: drop the batch rather than retry forever
+            self.failed_flushes += 1
+            self.dropped += len(batch)
+            logger.warning(f"Failed to flush {len(batch)} API metrics: {e}")
+            return 0
+
+    def stop(self):
+        """Stop the background thread and flush what is left."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            pending = len(self._buffer)
+        return {
+            'pending': pending,
+            'flushed': self.flushed,
+            'dropped': self.dropped,
+            'failed_flushes': self.failed_flushes,
+        }
+
+
+# Singleton instance
+_recorder_instance = None
+
+
+def get_metrics_recorder() -> MetricsRecorder:
+    """Get or create singleton instance of MetricsRecorder."""
+    global _recorder_instance
+    if _recorder_instance is None:
+        from flask import current_app
+        _recorder_instance = MetricsRecorder(
+            flush_size=current_app.config.get('METRICS_FLUSH_SIZE', 100),
+            flush_interval=current_app.config.get('METRICS_FLUSH_INTERVAL', 5.0),
+            max_buffer=current_app.config.get('METRICS_BUFFER_MAX', 10000),
+        )
+        atexit.register(_recorder_instance.stop)
+    return _recorder_instance
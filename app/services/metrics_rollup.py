@@ -0,0 +1,313 @@
+# metrics_rollup.py
+"""
+Rollups and retention for APIMetrics.
+
+APIMetrics gets one row per upstream call. This pipeline (run periodically
+by scripts/rollup_metrics.py) keeps the table bounded:
+- Aggregates raw samples into per-minute APIMetricsRollup rows (count,
+  errors, cache hits, total/max time, p50/p95 and a log-linear histogram)
+- Merges complete hours of minute rollups into per-hour rollups
+- Deletes raw rows past the retention window, in batches, and never before
+  they are rolled up; old minute/hour rollups expire the same way
+
+Only complete minutes older than `settle_seconds` are rolled up, so samples
+still in the metrics recorder's buffer are not missed. Each resolution
+resumes from its latest bucket, so runs are incremental and idempotent.
+"""
+import bisect
+import json
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from app import db
+from app.models.modelsdb import APIMetrics, APIMetricsRollup
+from app.services.app_metrics import LATENCY_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+# Histogram upper bounds in ms; index len(HISTOGRAM_BOUNDS_MS) counts slower samples
+HISTOGRAM_BOUNDS_MS = [bound * 1000 for bound in LATENCY_BUCKETS]
+
+MINUTE = 'minute'
+HOUR = 'hour'
+
+
+def _floor(value: datetime, resolution: str) -> datetime:
+    if resolution == HOUR:
+        return value.replace(minute=0, second=0, microsecond=0)
+    return value.replace(second=0, microsecond=0)
+
+
+class _Bucket:
+    """Running aggregate of one (endpoint, bucket_start)."""
+
+    __slots__ = ('count', 'error_count', 'cache_hit_count', 'total_ms', 'max_ms', 'histogram')
+
+    def __init__(self):
+        self.count = 0
+        self.error_count = 0
+        self.cache_hit_count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.histogram: Dict[int, int] = defaultdict(int)
+
+    def add_sample(self, response_time_ms: float, error: bool, cache_hit: bool):
+        self.count += 1
+        self.error_count += bool(error)
+        self.cache_hit_count += bool(cache_hit)
+        self.total_ms += response_time_ms
+        self.max_ms = max(self.max_ms, response_time_ms)
+        self.histogram[bisect.bisect_left(HISTOGRAM_BOUNDS_MS, response_time_ms)] += 1
+
+    def add_rollup(self, rollup):
+        self.count += rollup.count
+        self.error_count += rollup.error_count
+        self.cache_hit_count += rollup.cache_hit_count
+        self.total_ms += rollup.total_ms
+        self.max_ms = max(self.max_ms, rollup.max_ms)
+        for index, count in json.loads(rollup.histogram).items():
+            self.histogram[int(index)] += count
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Estimate a percentile by interpolating inside its histogram bucket."""
+        if not self.count:
+            return None
+        rank = self.count * pct / 100
+        seen = 0
+        for index in sorted(self.histogram):
+            count = self.histogram[index]
+            if seen + count >= rank:
+                if index >= len(HISTOGRAM_BOUNDS_MS):
+                    return round(self.max_ms, 3)
+                lower = HISTOGRAM_BOUNDS_MS[index - 1] if index else 0.0
+                upper = HISTOGRAM_BOUNDS_MS[index]
+                estimate = lower + (upper - lower) * (rank - seen) / count
+                return round(min(estimate, self.max_ms), 3)
+            seen += count
+        return round(self.max_ms, 3)
+
+    def to_row(self, endpoint: str, resolution: str, bucket_start: datetime) -> Dict:
+        return {
+            'endpoint': endpoint,
+            'resolution': resolution,
+            'bucket_start': bucket_start,
+            'count': self.count,
+            'error_count': self.error_count,
+            'cache_hit_count': self.cache_hit_count,
+            'total_ms': self.total_ms,
+            'max_ms': self.max_ms,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'histogram': json.dumps(dict(sorted(self.histogram.items()))),
+        }
+
+    def summary(self) -> Dict:
+        return {
+            'count': self.count,
+            'error_rate': round(self.error_count / self.count, 4) if self.count else 0.0,
+            'cache_hit_ratio': round(self.cache_hit_count / self.count, 4) if self.count else 0.0,
+            'avg_ms': round(self.total_ms / self.count, 3) if self.count else None,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'max_ms': round(self.max_ms, 3),
+        }
+
+
+class MetricsRollup:
+    """
+    Incremental APIMetrics rollup and pruning.
+
+    Args:
+        raw_retention_days: Raw APIMetrics rows kept (once rolled up)
+        minute_retention_days: Minute rollups kept (once merged into hours)
+        hour_retention_days: Hour rollups kept
+        settle_seconds: Age a minute must reach before it is rolled up
+        window: Raw time range aggregated per transaction
+        delete_batch: Rows deleted per DELETE statement
+    """
+
+    def __init__(self, raw_retention_days: int = 7, minute_retention_days: int = 30,
+                 hour_retention_days: int = 365, settle_seconds: int = 120,
+                 window: timedelta = timedelta(hours=6), delete_batch: int = 5000):
+        self.raw_retention = timedelta(days=raw_retention_days)
+        self.minute_retention = timedelta(days=minute_retention_days)
+        self.hour_retention = timedelta(days=hour_retention_days)
+        self.settle = timedelta(seconds=settle_seconds)
+        self.window = window
+        self.delete_batch = delete_batch
+
+    def run(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Roll up minutes, then hours, then prune. Returns row counts."""
+        now = now or datetime.utcnow()
+        through = _floor(now - self.settle, MINUTE)
+        result = {
+            'minute_rollups': self.rollup_minutes(through),
+            'hour_rollups': self.rollup_hours(_floor(through, HOUR)),
+        }
+        result.update(self.prune(now, through))
+        logger.info(f"Metrics rollup: {result}")
+        return result
+
+    def _watermark(self, resolution: str) -> Optional[datetime]:
+        """Start of the first bucket not rolled up yet at this resolution."""
+        latest = db.session.query(db.func.max(APIMetricsRollup.bucket_start)).filter(
+            APIMetricsRollup.resolution == resolution
+        ).scalar()
+        if latest is None:
+            return None
+        return latest + (timedelta(hours=1) if resolution == HOUR else timedelta(minutes=1))
+
+    def _store(self, buckets: Dict, resolution: str) -> int:
+        rows = [
+            bucket.to_row(endpoint, resolution, bucket_start)
+            for (endpoint, bucket_start), bucket in sorted(buckets.items())
+        ]
+        if rows:
+            db.session.execute(db.insert(APIMetricsRollup), rows)
+        db.session.commit()
+        return len(rows)
+
+    def rollup_minutes(self, end: datetime) -> int:
+        """Aggregate raw samples of the minutes before `end`."""
+        start = self._watermark(MINUTE)
+        if start is None:
+            first = db.session.query(db.func.min(APIMetrics.timestamp)).scalar()
+            if first is None:
+                return 0
+            start = _floor(first, MINUTE)
+
+        written = 0
+        while start < end:
+            stop = min(start + self.window, end)
+            samples = db.session.execute(
+                db.select(
+                    APIMetrics.endpoint, APIMetrics.timestamp, APIMetrics.response_time_ms,
+                    APIMetrics.error_occurred, APIMetrics.cache_hit
+                ).where(
+                    APIMetrics.timestamp >= start, APIMetrics.timestamp < stop
+                ).execution_options(yield_per=5000)
+            )
+            buckets = defaultdict(_Bucket)
+            for endpoint, timestamp, response_time_ms, error, cache_hit in samples:
+                buckets[(endpoint, _floor(timestamp, MINUTE))].add_sample(
+                    response_time_ms, error, cache_hit
+                )
+            written += self._store(buckets, MINUTE)
+            start = stop
+        return written
+
+    def rollup_hours(self, end: datetime) -> int:
+        """Merge the minute rollups of the hours before `end` (all minutes rolled up)."""
+        start = self._watermark(HOUR)
+        if start is None:
+            first = db.session.query(db.func.min(APIMetricsRollup.bucket_start)).filter(
+                APIMetricsRollup.resolution == MINUTE
+            ).scalar()
+            if first is None:
+                return 0
+            start = _floor(first, HOUR)
+
+        written = 0
+        while start < end:
+            stop = min(start + self.window, end)
+            minutes = db.session.execute(
+                db.select(APIMetricsRollup).where(
+                    APIMetricsRollup.resolution == MINUTE,
+                    APIMetricsRollup.bucket_start >= start,
+                    APIMetricsRollup.bucket_start < stop,
+                ).execution_options(yield_per=5000)
+            ).scalars()
+            buckets = defaultdict(_Bucket)
+            for rollup in minutes:
+                buckets[(rollup.endpoint, _floor(rollup.bucket_start, HOUR))].add_rollup(rollup)
+            written += self._store(buckets, HOUR)
+            start = stop
+        return written
+
+    def _delete_before(self, model, timestamp_column, cutoff: datetime, *criteria) -> int:
+        """Delete rows older than `cutoff` in batches of `delete_batch`."""
+        deleted = 0
+        while True:
+            ids = db.session.execute(
+                db.select(model.id).where(timestamp_column < cutoff, *criteria)
+                .limit(self.delete_batch)
+            ).scalars().all()
+            if not ids:
+                break
+            db.session.execute(db.delete(model).where(model.id.in_(ids)))
+            db.session.commit()
+            deleted += len(ids)
+            if len(ids) < self.delete_batch:
+                break
+        return deleted
+
+    def prune(self, now: datetime, through: datetime) -> Dict[str, int]:
+        """
+        Delete expired rows; `through` is where rollups are complete, and
+        nothing at or after it (or its hour, for minute rollups) is deleted.
+        """
+        return {
+            'raw_deleted': self._delete_before(
+                APIMetrics, APIMetrics.timestamp, min(now - self.raw_retention, through)
+            ),
+            'minute_deleted': self._delete_before(
+                APIMetricsRollup, APIMetricsRollup.bucket_start,
+                min(now - self.minute_retention, _floor(through, HOUR)),
+                APIMetricsRollup.resolution == MINUTE
+            ),
+            'hour_deleted': self._delete_before(
+                APIMetricsRollup, APIMetricsRollup.bucket_start, now - self.hour_retention,
+                APIMetricsRollup.resolution == HOUR
+            ),
+        }
+
+    def summarize(self, since: datetime, resolution: str = HOUR) -> Dict[str, Dict]:
+        """
+        Per-endpoint totals and time series since `since`, from rollups only.
+
+        Returns:
+            {endpoint: {'summary': {...}, 'series': [{bucket_start, count, ...}]}}
+        """
+        rollups = db.session.execute(
+            db.select(APIMetricsRollup).where(
+                APIMetricsRollup.resolution == resolution,
+                APIMetricsRollup.bucket_start >= _floor(since, resolution),
+            ).order_by(APIMetricsRollup.endpoint, APIMetricsRollup.bucket_start)
+        ).scalars()
+
+        totals: Dict[str, _Bucket] = defaultdict(_Bucket)
+        series: Dict[str, List[Dict]] = defaultdict(list)
+        for rollup in rollups:
+            totals[rollup.endpoint].add_rollup(rollup)
+            series[rollup.endpoint].append({
+                'bucket_start': rollup.bucket_start.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'count': rollup.count,
+                'error_count': rollup.error_count,
+                'cache_hit_count': rollup.cache_hit_count,
+                'p50_ms': rollup.p50_ms,
+                'p95_ms': rollup.p95_ms,
+            })
+        return {
+            endpoint: {'summary': totals[endpoint].summary(), 'series': series[endpoint]}
+            for endpoint in totals
+        }
+
+
+# Singleton instance
+_rollup_instance = None
+
+
+def get_metrics_rollup() -> MetricsRollup:
+    """Get or create singleton instance of MetricsRollup."""
+    global _rollup_instance
+    if _rollup_instance is None:
+        from flask import current_app
+        _rollup_instance = MetricsRollup(
+            raw_retention_days=current_app.config.get('METRICS_RAW_RETENTION_DAYS', 7),
+            minute_retention_days=current_app.config.get('METRICS_MINUTE_RETENTION_DAYS', 30),
+            hour_retention_days=current_app.config.get('METRICS_HOUR_RETENTION_DAYS', 365),
+            settle_seconds=current_app.config.get('METRICS_ROLLUP_SETTLE_SECONDS', 120),
+        )
+    return _rollup_instance
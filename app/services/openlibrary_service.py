@@ -3,7 +3,14 @@
 OpenLibrary API integration service with caching, rate limiting, and translation.
 
 Provides robust book search functionality with:
-- 1-hour cache to reduce API calls
+- 1-hour cache to reduce API calls, then stale-while-revalidate for a day
+- Short negative caching of empty and failed searches
+- Circuit breaker that skips upstream calls while OpenLibrary is failing
+- Total deadline per search fetch (request, retries and streamed body), so
+  a slow or trickling upstream costs a keystroke at most SEARCH_DEADLINE
+- Single-flight coalescing of concurrent misses for the same query
+- `fields=` projection and incremental parsing of search responses
+- Prefix-result reuse while typing ("mac" answers "mach" when enough matches)
 - Rate limiting (100 requests/minute)
 - EN→PT genre translation
 - Performance metrics tracking
@@ -12,43 +19,100 @@ Provides robust book search functionality with:
 """
 import json
 import os
+import threading
 import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from functools import lru_cache
 from typing import List, Dict, Optional
 
 import requests
 from flask import current_app
 
-from app import db, cache
-from app.models.modelsdb import APIMetrics
+from app import cache
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.http_client import get_http_client
+from app.services.app_metrics import record_cache, record_upstream
+from app.services.metrics_recorder import get_metrics_recorder
+from app.services.single_flight import get_single_flight
+from app.utils.json_stream import iter_json_array
+from app.utils.sanitize import normalize_search_text
 
 # Logger that works with or without app context
 logger = logging.getLogger(__name__)
 
 
+class SearchDeadlineExceeded(requests.Timeout):
+    """A search fetch (retries and body included) outlived SEARCH_DEADLINE."""
+
+
 class OpenLibraryService:
     """Service for interacting with OpenLibrary API."""
     
     BASE_URL = "https://openlibrary.org/search.json"
     COVER_URL_TEMPLATE = "https://covers.openlibrary.org/b/id/{cover_id}-{size}.jpg"
-    TIMEOUT = 5  # seconds
+
+    # Only the doc fields _fetch_search reads; full docs carry hundreds of
+    # alternative names, ISBNs and subjects (~3 KB each in search.json)
+    SEARCH_FIELDS = 'key,title,author_name,first_publish_year,isbn,cover_i,publisher,subject,number_of_pages_median'
+
+    # Parse `docs` incrementally while the body streams in, stopping after
+    # the requested number of docs (app.utils.json_stream)
+    STREAM_PARSE = True
+    STREAM_CHUNK_SIZE = 16384
+    # After the last needed doc, read at most this much of the remaining
+    # body so the pooled connection can be reused; close it otherwise
+    DRAIN_LIMIT = 65536
+
+    # Prefix-result cache: while typing "mac" -> "mach" -> "macha", a longer
+    # query is answered by filtering a shorter query's cached superset
+    PREFIX_CACHE_KEY = 'openlibrary_prefix:{query}'
+    PREFIX_MIN_LENGTH = 3
+    PREFIX_SUPERSET_LIMIT = 40
+
+    # Tiered search cache policy (seconds). Entries are served fresh for
+    # their TTL, then served stale for STALE_TTL while a background refresh
+    # runs. Empty results and errors are cached briefly so a hot query does
+    # not hit a failing upstream on every keystroke.
+    SEARCH_TTL = 3600
+    STALE_TTL = 86400
+    EMPTY_TTL = 300
+    ERROR_TTL = 30
+    REFRESH_LOCK_TTL = 30
+    REFRESH_WORKERS = 2
+
+    # Consecutive upstream failures before search calls are skipped, and how
+    # long to wait before probing again
+    BREAKER_THRESHOLD = 5
+    BREAKER_RESET_TIMEOUT = 30
+
+    # Seconds one search fetch may take end to end. The HTTP timeouts bound
+    # each attempt and each body chunk, not their sum; the request thread
+    # stops waiting at this deadline and the fetch thread stops reading
+    SEARCH_DEADLINE = 4.0
+    FETCH_WORKERS = 8
     
     def __init__(self):
         """Initialize service and load genre translations."""
         self._load_translations()
+        self.breaker = CircuitBreaker(
+            'openlibrary_search',
+            failure_threshold=self.BREAKER_THRESHOLD,
+            reset_timeout=self.BREAKER_RESET_TIMEOUT
+        )
+        self._refresh_executor = ThreadPoolExecutor(
+            max_workers=self.REFRESH_WORKERS, thread_name_prefix='openlibrary-refresh'
+        )
+        self._fetch_executor = ThreadPoolExecutor(
+            max_workers=self.FETCH_WORKERS, thread_name_prefix='openlibrary-fetch'
+        )
+        self._refreshing = set()
+        self._refreshing_lock = threading.Lock()
     
     def _load_translations(self):
         """Load genre translation dictionary from JSON file."""
-        try:
-            translations_path = os.path.join(
-                os.path.dirname(__file__),
-                '../translations/genres_en_pt.json'
-            )
-            with open(translations_path, 'r', encoding='utf-8') as f:
-                self.genre_translations = json.load(f)
-        except Exception as e:
-            logger.warning(f"Could not load genre translations: {e}")
-            self.genre_translations = {}
+        self.genre_translations = load_genre_translations()
     
     def _translate_genre(self, genre_en: str) -> str:
         """
@@ -113,8 +177,10 @@ class OpenLibraryService:
                      results_count: int, cache_hit: bool = False,
                      error_occurred: bool = False, error_message: str = None):
         """
-        Save API call metrics to database for analytics.
+        Queue API call metrics for analytics.
         
+        Samples are buffered and written in bulk by the metrics recorder's
+        background thread, so this never touches the request's session.
         Safe to call with or without app context.
         """
         try:
@@ -123,7 +189,7 @@ class OpenLibraryService:
             if not has_app_context():
                 return  # Silently skip when no app context
 
-            metric = APIMetrics(
+            get_metrics_recorder().record(
                 endpoint=endpoint,
                 query=query,
                 response_time_ms=response_time_ms,
@@ -132,13 +198,12 @@ class OpenLibraryService:
                 error_occurred=error_occurred,
                 error_message=error_message
             )
-            db.session.add(metric)
-            db.session.commit()
         except Exception:
             # Silently fail - metrics are not critical
             pass
 
-    def search_books(self, query: str, limit: int = 10, lang: str = 'pt') -> List[Dict]:
+    def search_books(self, query: str, limit: int = 10, lang: str = 'pt',
+                     prefix_match: bool = False) -> List[Dict]:
         """
         Search for books in OpenLibrary API with caching and translation.
         
@@ -146,34 +211,257 @@ class OpenLibraryService:
             query: Search query string
             limit: Maximum number of results (default 10)
             lang: Target language for translations (default 'pt')
+            prefix_match: Caller only keeps results whose title starts with
+                the query (autocomplete). Allows answering from a shorter
+                query's cached superset, in which case only title-prefix
+                matches are returned.
             
         Returns:
             List of book dictionaries with translated metadata
         """
         # Check cache manually (cache.memoize doesn't work with class methods)
         cache_key = f'openlibrary_search:{query}:{limit}'
-        cached_result = cache.get(cache_key)
-        if cached_result is not None:
+        superset_limit = max(limit, self.PREFIX_SUPERSET_LIMIT) if prefix_match else None
+
+        entry = self._read_entry(cache_key)
+        if entry is not None:
+            if entry['fresh_until'] <= time.time():
+                # Stale: answer now, refresh in the background
+                self._schedule_refresh(query, limit, cache_key, superset_limit)
+                record_cache('openlibrary_search', 'stale')
+            else:
+                record_cache('openlibrary_search', 'hit')
             logger.info(f"Cache hit for query: {query}")
-            return cached_result
+            return entry['results']
+
+        if prefix_match:
+            narrowed = self._search_cached_prefixes(query, limit)
+            if narrowed is not None:
+                record_cache('openlibrary_search', 'prefix_hit')
+                logger.info(f"Prefix cache hit for query: {query}")
+                return narrowed
+
+        record_cache('openlibrary_search', 'miss')
+        if not self.breaker.allow():
+            record_upstream('openlibrary_search', 'circuit_open')
+            logger.info(f"OpenLibrary circuit open, skipping search for: {query}")
+            return []
+
+        # Concurrent misses for the same key share one upstream call. Followers
+        # wait as long as the leader can take; if that still runs out they get
+        # no results rather than a second call past the breaker check above
+        return get_single_flight().do(
+            cache_key,
+            lambda: self._fetch_search(query, limit, cache_key, superset_limit),
+            lookup=lambda: self._cached_results(cache_key),
+            timeout=self._search_wait_timeout(),
+            fallback=list
+        )
+
+    def _search_wait_timeout(self) -> float:
+        """Longest a search fetch can take (its deadline or the HTTP worst case), plus slack."""
+        return min(self.SEARCH_DEADLINE,
+                   get_http_client().max_duration('openlibrary_search')) + 1.0
+
+    def _read_entry(self, cache_key: str) -> Optional[Dict]:
+        """
+        Read a search cache entry.
+
+        Returns:
+            {'results': [...], 'fresh_until': epoch seconds} or None
+        """
+        try:
+            entry = cache.get(cache_key)
+        except Exception as e:
+            logger.warning(f"Search cache read failed: {e}")
+            return None
+        if isinstance(entry, list):
+            # Plain list written before entries carried a freshness deadline
+            return {'results': entry, 'fresh_until': float('inf')}
+        return entry
+
+    def _cached_results(self, cache_key: str) -> Optional[List[Dict]]:
+        entry = self._read_entry(cache_key)
+        return entry['results'] if entry is not None else None
+
+    def _write_entry(self, cache_key: str, results: List[Dict], ttl: int, stale_ttl: int = 0):
+        """Cache results as fresh for `ttl` seconds, then stale for `stale_ttl` more."""
+        try:
+            cache.set(
+                cache_key,
+                {'results': results, 'fresh_until': time.time() + ttl},
+                timeout=ttl + stale_ttl
+            )
+        except Exception as e:
+            logger.warning(f"Search cache write failed: {e}")
+
+    def _write_prefix_superset(self, query: str, results: List[Dict]):
+        """Cache results as the query's prefix superset (see _search_cached_prefixes)."""
+        try:
+            cache.set(
+                self.PREFIX_CACHE_KEY.format(query=normalize_search_text(query)),
+                [(normalize_search_text(item['title']), item) for item in results],
+                timeout=self.SEARCH_TTL
+            )
+        except Exception as e:
+            logger.warning(f"Prefix cache write failed: {e}")
+
+    def _schedule_refresh(self, query: str, limit: int, cache_key: str,
+                          superset_limit: Optional[int]):
+        """
+        Refresh a stale entry in the background, once across all workers.
+
+        Skipped while the circuit is open; the stale entry keeps being served.
+        """
+        with self._refreshing_lock:
+            if cache_key in self._refreshing:
+                return
+            self._refreshing.add(cache_key)
+
+        try:
+            if not cache.add(f'openlibrary_refresh:{cache_key}', 1, timeout=self.REFRESH_LOCK_TTL):
+                self._refresh_done(cache_key)
+                return  # Another worker is refreshing it
+        except Exception:
+            pass
+
+        app = current_app._get_current_object()
+
+        def refresh():
+            try:
+                if self.breaker.allow():
+                    with app.app_context():
+                        self._fetch_search(query, limit, cache_key, superset_limit, refresh=True)
+            finally:
+                self._refresh_done(cache_key)
 
+        try:
+            self._refresh_executor.submit(refresh)
+        except RuntimeError:
+            self._refresh_done(cache_key)  # Executor shut down (interpreter exit)
+
+    def _refresh_done(self, cache_key: str):
+        with self._refreshing_lock:
+            self._refreshing.discard(cache_key)
+
+    def _search_cached_prefixes(self, query: str, limit: int) -> Optional[List[Dict]]:
+        """
+        Answer a query from the cached superset of the query or one of its prefixes.
+
+        Supersets are tried longest prefix first (one `get_many` round trip)
+        and filtered to titles starting with the query. A superset is only
+        used when it still holds at least `limit` matches; otherwise the
+        caller goes upstream.
+
+        Returns:
+            Up to `limit` matching results, or None if no superset is enough
+        """
+        query_norm = normalize_search_text(query)
+        if len(query_norm) < self.PREFIX_MIN_LENGTH:
+            return None
+
+        prefixes = [query_norm[:n] for n in range(len(query_norm), self.PREFIX_MIN_LENGTH - 1, -1)]
+        try:
+            supersets = cache.get_many(*[self.PREFIX_CACHE_KEY.format(query=p) for p in prefixes])
+        except Exception as e:
+            logger.warning(f"Prefix cache lookup failed: {e}")
+            return None
+
+        for superset in supersets:
+            if not superset:
+                continue
+            narrowed = [item for title_norm, item in superset if title_norm.startswith(query_norm)]
+            if len(narrowed) >= limit:
+                return narrowed[:limit]
+        return None
+
+    def _parse_docs(self, response, limit: int, deadline: Optional[float] = None) -> List[Dict]:
+        """
+        Extract up to `limit` docs from a search response.
+
+        With STREAM_PARSE, docs are decoded one by one as chunks arrive and
+        parsing stops after `limit`; otherwise the whole body is parsed.
+        Reading stops with SearchDeadlineExceeded once `deadline`
+        (time.monotonic()) has passed.
+        """
+        if not self.STREAM_PARSE:
+            return response.json().get('docs', [])[:limit]
+
+        chunks = response.iter_content(chunk_size=self.STREAM_CHUNK_SIZE)
+        if deadline is not None:
+            chunks = self._until(chunks, deadline)
+        docs = list(iter_json_array(chunks, 'docs', limit=limit))
+
+        drained = 0
+        for chunk in chunks:
+            drained += len(chunk)
+            if drained > self.DRAIN_LIMIT:
+                break  # Not worth reading; response.close() drops the connection
+        return docs
+
+    @staticmethod
+    def _until(chunks, deadline: float):
+        for chunk in chunks:
+            if time.monotonic() > deadline:
+                raise SearchDeadlineExceeded('OpenLibrary search body still streaming at deadline')
+            yield chunk
+
+    def _request_docs(self, params: Dict, limit: int, deadline: float) -> List[Dict]:
+        """Run the search request and parse its docs (in a fetch thread)."""
+        response = get_http_client().get(
+            self.BASE_URL,
+            endpoint='openlibrary_search',
+            params=params,
+            stream=self.STREAM_PARSE
+        )
+        try:
+            response.raise_for_status()
+            return self._parse_docs(response, limit, deadline)
+        finally:
+            response.close()
+
+    def _fetch_search(self, query: str, limit: int, cache_key: str,
+                      superset_limit: Optional[int] = None, refresh: bool = False) -> List[Dict]:
+        """
+        Call the OpenLibrary search API and cache the parsed results.
+
+        Outcomes are reported to the circuit breaker. Errors are cached for
+        ERROR_TTL, except during a background refresh, where the stale entry
+        is kept instead.
+
+        Args:
+            query: Search query string
+            limit: Maximum number of results
+            cache_key: Key the results are cached under
+            superset_limit: If set, fetch this many docs and also cache them
+                as the query's prefix superset (see _search_cached_prefixes)
+            refresh: Called to refresh a stale entry
+
+        Returns:
+            List of book dictionaries (empty on error)
+        """
         start_time = time.time()
+        fetch_limit = superset_limit or limit
         endpoint = 'openlibrary_search'
         
         try:
             # Make API request
-            params = {'q': query, 'limit': limit}
-            response = requests.get(
-                self.BASE_URL,
-                params=params,
-                timeout=self.TIMEOUT
-            )
-            response.raise_for_status()
-            
-            data = response.json()
+            params = {'q': query, 'limit': fetch_limit, 'fields': self.SEARCH_FIELDS}
+            deadline = time.monotonic() + self.SEARCH_DEADLINE
+            future = self._fetch_executor.submit(self._request_docs, params, fetch_limit, deadline)
+            try:
+                docs = future.result(timeout=self.SEARCH_DEADLINE)
+            except FutureTimeoutError:
+                # The fetch thread gives up on its own at the next body chunk
+                # or HTTP timeout; this request does not wait for it
+                future.cancel()
+                raise SearchDeadlineExceeded(
+                    f'OpenLibrary search took longer than {self.SEARCH_DEADLINE}s'
+                ) from None
+
             results = []
             
-            for doc in data.get('docs', [])[:limit]:
+            for doc in docs:
                 # Extract and process book data
                 title = doc.get('title', 'Título Desconhecido')
                 author = ', '.join(doc.get('author_name', [])[:3]) or 'Autor Desconhecido'
@@ -202,6 +490,10 @@ class OpenLibraryService:
                     'pages': doc.get('number_of_pages_median', 0)
                 })
             
+            if superset_limit:
+                self._write_prefix_superset(query, results)
+                results = results[:limit]
+
             # Save metrics
             response_time_ms = (time.time() - start_time) * 1000
             self._save_metrics(
@@ -217,9 +509,12 @@ class OpenLibraryService:
                 f"time={response_time_ms:.2f}ms"
             )
             
-            # Cache the results for 1 hour
-            cache_key = f'openlibrary_search:{query}:{limit}'
-            cache.set(cache_key, results, timeout=3600)
+            # Cache the results for 1 hour (then stale), empty results briefly
+            self.breaker.record_success()
+            if results:
+                self._write_entry(cache_key, results, self.SEARCH_TTL, self.STALE_TTL)
+            else:
+                self._write_entry(cache_key, results, self.EMPTY_TTL)
 
             return results
             
@@ -227,6 +522,14 @@ class OpenLibraryService:
             # Network or API error
             response_time_ms = (time.time() - start_time) * 1000
             error_msg = str(e)
+
+            status = getattr(getattr(e, 'response', None), 'status_code', None)
+            if status is not None and status < 500 and status != 429:
+                self.breaker.record_success()  # Upstream is up; the request was bad
+            else:
+                self.breaker.record_failure()
+            if not refresh:
+                self._write_entry(cache_key, [], self.ERROR_TTL)
             
             self._save_metrics(
                 endpoint=endpoint,
@@ -257,6 +560,11 @@ class OpenLibraryService:
                 error_message=error_msg
             )
             
+            # e.g. an HTML error page instead of JSON
+            self.breaker.record_failure()
+            if not refresh:
+                self._write_entry(cache_key, [], self.ERROR_TTL)
+
             try:
                 logger.error(f"Unexpected error in search_books: {error_msg}")
             except Exception:
@@ -264,9 +572,30 @@ class OpenLibraryService:
             return []
 
 
+@lru_cache(maxsize=None)
+def load_genre_translations() -> Dict[str, str]:
+    """
+    Genre translations (English -> Portuguese), read once per process.
+
+    Read-only and shared: loaded in the gunicorn master (app.serving), it is
+    inherited copy-on-write by every worker.
+    """
+    try:
+        translations_path = os.path.join(
+            os.path.dirname(__file__),
+            '../translations/genres_en_pt.json'
+        )
+        with open(translations_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        logger.warning(f"Could not load genre translations: {e}")
+        return {}
+
+
 # Singleton instance
 _service_instance = None
 
+
 def get_openlibrary_service() -> OpenLibraryService:
     """Get or create singleton instance of OpenLibraryService."""
     global _service_instance
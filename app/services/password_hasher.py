@@ -0,0 +1,127 @@
+# password_hasher.py
+"""
+Password hashing and verification off the request threads.
+
+scrypt is deliberately expensive (tens of ms of CPU and 32 MB per hash at
+the default cost), so a burst of logins used to pin every worker and starve
+page traffic. This service:
+- Runs hashing and verification in a small process pool
+  (PASSWORD_HASH_WORKERS processes; 0 runs them inline)
+- Bounds the work waiting for it: beyond PASSWORD_HASH_MAX_QUEUE queued
+  calls, new ones fail fast with PasswordHasherBusy instead of piling up
+- Hashes with configurable scrypt parameters (PASSWORD_SCRYPT_N/R/P;
+  scripts/calibrate_password_hash.py measures candidates on the host)
+- Reports stored hashes made with other parameters (`needs_rehash`), so
+  logins upgrade them transparently
+
+Pool processes are spawned, not forked: they never inherit the app's DB
+connections or threads, and only import werkzeug.
+"""
+import logging
+import multiprocessing
+import threading
+from functools import cached_property
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Too many hashing calls queued (or one timed out); retry later."""
+
+
+class PasswordHasher:
+    """
+    Bounded, process-pooled scrypt hashing; thread-safe.
+
+    Args:
+        n, r, p: scrypt cost parameters for new hashes
+        salt_length: Salt characters for new hashes
+        workers: Pool processes (0 = hash in the calling thread)
+        max_queue: Calls allowed to wait for a free process
+        timeout: Seconds a call waits for its result
+    """
+
+    def __init__(self, n: int = 2 ** 15, r: int = 8, p: int = 1, salt_length: int = 16,
+                 workers: int = 2, max_queue: int = 16, timeout: float = 5.0):
+        self.method = f'scrypt:{n}:{r}:{p}'
+        self.salt_length = salt_length
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + max_queue) if workers else None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+            return self._pool
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy('Password hashing queue is full')
+        try:
+            future = self._get_pool().submit(fn, *args)
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise PasswordHasherBusy('Password hashing timed out') from None
+        except BrokenProcessPool:
+            # A pool process died (e.g. OOM-killed); start a new pool next time
+            logger.error("Password hashing pool broke; recreating it")
+            self.shutdown()
+            return fn(*args)
+        finally:
+            self._slots.release()
+
+    def hash(self, password: str) -> str:
+        """Hash `password` with the current parameters."""
+        return self._run(generate_password_hash, password, self.method, self.salt_length)
+
+    def verify(self, password_hash: str, password: str) -> bool:
+        """Check `password` against a stored hash (any werkzeug method)."""
+        return self._run(check_password_hash, password_hash, password)
+
+    @cached_property
+    def dummy_hash(self) -> str:
+        """Hash to verify against when the user does not exist (same cost as a real login)."""
+        return generate_password_hash('not-a-password', self.method, self.salt_length)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """True if the stored hash was made with other parameters (or another method)."""
+        return password_hash.split('$', 1)[0] != self.method
+
+    def shutdown(self):
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def get_password_hasher() -> PasswordHasher:
+    """The current app's PasswordHasher (created on first use, after any fork)."""
+    hasher = current_app.extensions.get('password_hasher')
+    if hasher is None:
+        config = current_app.config
+        # A racing thread may build one too; its pool is never started
+        hasher = current_app.extensions.setdefault('password_hasher', PasswordHasher(
+            n=config.get('PASSWORD_SCRYPT_N', 2 ** 15),
+            r=config.get('PASSWORD_SCRYPT_R', 8),
+            p=config.get('PASSWORD_SCRYPT_P', 1),
+            workers=config.get('PASSWORD_HASH_WORKERS', 2),
+            max_queue=config.get('PASSWORD_HASH_MAX_QUEUE', 16),
+            timeout=config.get('PASSWORD_HASH_TIMEOUT', 5.0),
+        ))
+    return hasher
@@ -0,0 +1,236 @@
+# query_stats.py
+"""
+Per-request SQL instrumentation.
+
+Hooks SQLAlchemy's before/after_cursor_execute events on the app's engine
+and, for statements issued while serving a request, records:
+- Statement count and total DB time per request (exposed as a
+  `Server-Timing` header when QUERY_STATS_HEADER is on, default in debug)
+- Slow statements (>= SLOW_QUERY_MS) with their normalized SQL, logged and
+  aggregated per process
+- Per-endpoint totals, served by /metrics/queries
+
+The aggregates live in process memory, so under gunicorn /metrics/queries
+shows only the worker that served the scrape (its `pid` is in the
+response). Cluster-wide totals are on /metrics: http_request_db_statements
+and db_slow_statements_total (app_metrics), merged across workers.
+
+Statements run outside a request (metrics recorder thread, background
+refreshes) are not counted.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+_STRING_LITERALS = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERALS = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PARAMS = re.compile(r'\?|%\(\w+\)s|%s|(?<!:):\w+')
+_PARAM_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_ROW_LISTS = re.compile(r'\(\?\)(?:\s*,\s*\(\?\))+')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(statement: str, max_length: int = 500) -> str:
+    """
+    Reduce a SQL statement to its shape, so repeated statements group together.
+
+    Literals and bind parameters (any DB-API style) become `?`, IN lists and
+    multi-row VALUES collapse to a single `(?)`, and whitespace is squeezed.
+
+    Example:
+        "SELECT * FROM books WHERE id IN (%(id_1)s, %(id_2)s) AND title = 'x'"
+        -> "SELECT * FROM books WHERE id IN (?) AND title = ?"
+    """
+    sql = _STRING_LITERALS.sub('?', statement)
+    sql = _NUMBER_LITERALS.sub('?', sql)
+    sql = _PARAMS.sub('?', sql)
+    sql = _PARAM_LISTS.sub('(?)', sql)
+    sql = _ROW_LISTS.sub('(?)', sql)
+    sql = _WHITESPACE.sub(' ', sql).strip()
+    return sql[:max_length]
+
+
+class RequestQueryStats:
+    """SQL statements issued while serving one request."""
+
+    __slots__ = ('count', 'total_ms', 'slow', 'started')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.slow: List[Dict] = []
+        self.started = time.perf_counter()
+
+    def server_timing(self) -> str:
+        elapsed_ms = (time.perf_counter() - self.started) * 1000
+        return (
+            f'db;dur={self.total_ms:.1f};desc="{self.count} queries", '
+            f'app;dur={elapsed_ms:.1f}'
+        )
+
+
+class QueryStats:
+    """
+    Process-wide aggregation of per-request SQL statistics; thread-safe.
+
+    Each gunicorn worker has its own instance and totals.
+
+    Args:
+        slow_query_ms: Statements at or above this duration are recorded as slow
+        max_slow_statements: Distinct slow statements kept; new ones are
+            counted as dropped once the table is full
+    """
+
+    def __init__(self, slow_query_ms: float = 100.0, max_slow_statements: int = 200):
+        self.slow_query_ms = slow_query_ms
+        self.max_slow_statements = max_slow_statements
+        self._endpoints: Dict[str, Dict] = {}
+        self._slow: Dict[str, Dict] = {}
+        self._dropped_slow = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app, engine):
+        """Attach the cursor hooks to `engine` and the request hooks to `app`."""
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+        @app.before_request
+        def start_query_stats():
+            g.query_stats = RequestQueryStats()
+
+        @app.after_request
+        def add_server_timing(response):
+            stats = g.get('query_stats')
+            if stats is not None and current_app.config.get('QUERY_STATS_HEADER', current_app.debug):
+                response.headers.add('Server-Timing', stats.server_timing())
+            return response
+
+        @app.teardown_request
+        def record_query_stats(exc=None):
+            if not has_app_context():
+                return  # Preserved test-client context torn down after its app context
+            stats = g.pop('query_stats', None)
+            if stats is not None:
+                self.record_request(request.endpoint or 'unknown', stats)
+
+    # SQLAlchemy event hooks
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context():
+            conn.info.setdefault('query_stats_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('query_stats_start')
+        if not starts or not has_request_context():
+            return
+        elapsed_ms = (time.perf_counter() - starts.pop()) * 1000
+
+        stats = g.get('query_stats')
+        if stats is None:
+            # Statement issued before before_request ran (e.g. by another hook)
+            stats = g.query_stats = RequestQueryStats()
+        stats.count += 1
+        stats.total_ms += elapsed_ms
+
+        if elapsed_ms >= self.slow_query_ms:
+            sql = normalize_sql(statement)
+            stats.slow.append({'sql': sql, 'ms': round(elapsed_ms, 2)})
+            logger.warning(f"Slow query ({elapsed_ms:.1f}ms) in {request.endpoint}: {sql}")
+
+    # Aggregation
+
+    def record_request(self, endpoint: str, stats: RequestQueryStats):
+        """Fold one request's statistics into the per-process totals."""
+        with self._lock:
+            totals = self._endpoints.get(endpoint)
+            if totals is None:
+                totals = self._endpoints[endpoint] = {
+                    'requests': 0, 'queries': 0, 'db_ms': 0.0, 'max_queries': 0,
+                }
+            totals['requests'] += 1
+            totals['queries'] += stats.count
+            totals['db_ms'] += stats.total_ms
+            totals['max_queries'] = max(totals['max_queries'], stats.count)
+
+            for slow in stats.slow:
+                entry = self._slow.get(slow['sql'])
+                if entry is None:
+                    if len(self._slow) >= self.max_slow_statements:
+                        self._dropped_slow += 1
+                        continue
+                    entry = self._slow[slow['sql']] = {
+                        'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'endpoints': set(),
+                    }
+                entry['count'] += 1
+                entry['total_ms'] += slow['ms']
+                entry['max_ms'] = max(entry['max_ms'], slow['ms'])
+                entry['endpoints'].add(endpoint)
+
+    def snapshot(self, slow_limit: int = 50) -> Dict:
+        """Per-endpoint totals and the slowest statements by total time, for this process."""
+        with self._lock:
+            endpoints = {
+                name: {
+                    'requests': totals['requests'],
+                    'queries_per_request': round(totals['queries'] / totals['requests'], 2),
+                    'db_ms_per_request': round(totals['db_ms'] / totals['requests'], 2),
+                    'max_queries': totals['max_queries'],
+                }
+                for name, totals in sorted(self._endpoints.items())
+            }
+            slow = sorted(self._slow.items(), key=lambda item: item[1]['total_ms'], reverse=True)
+            slow_statements = [
+                {
+                    'sql': sql,
+                    'count': entry['count'],
+                    'total_ms': round(entry['total_ms'], 2),
+                    'max_ms': round(entry['max_ms'], 2),
+                    'endpoints': sorted(entry['endpoints']),
+                }
+                for sql, entry in slow[:slow_limit]
+            ]
+            return {
+                'pid': os.getpid(),
+                'slow_query_ms': self.slow_query_ms,
+                'endpoints': endpoints,
+                'slow_statements': slow_statements,
+                'dropped_slow_statements': self._dropped_slow,
+            }
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+            self._slow.clear()
+            self._dropped_slow = 0
+
+
+# Singleton instance
+_query_stats_instance: Optional[QueryStats] = None
+
+
+def get_query_stats() -> QueryStats:
+    """Get or create singleton instance of QueryStats."""
+    global _query_stats_instance
+    if _query_stats_instance is None:
+        _query_stats_instance = QueryStats(
+            slow_query_ms=current_app.config.get('SLOW_QUERY_MS', 100.0),
+            max_slow_statements=current_app.config.get('SLOW_QUERY_MAX_STATEMENTS', 200),
+        )
+    return _query_stats_instance
+
+
+def init_query_stats(app):
+    """Instrument the app's engine; no-op when QUERY_STATS_ENABLED is False."""
+    if not app.config.get('QUERY_STATS_ENABLED', True):
+        return
+    from app import db
+    with app.app_context():
+        get_query_stats().init_app(app, db.engine)
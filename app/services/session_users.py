@@ -0,0 +1,169 @@
+# session_users.py
+"""
+Session identity cache behind Flask-Login's user_loader.
+
+Loading the full User row on every authenticated request costs a DB round
+trip before the view even runs, although most pages only show the user's
+id, username and collection stats. Instead:
+- The loader returns a SessionUser built from a lightweight snapshot
+  (id, username, name, sum_pages) kept in a process-local LRU for
+  USER_LOADER_CACHE_TTL seconds
+- Each snapshot is stored with the user's identity version (see
+  app.utils.cache_keys); a snapshot whose version no longer matches is
+  reloaded, so with a shared cache (Redis) a rename in one worker is seen
+  by all of them on their next request. With NullCache the version is
+  always 0 and other workers catch up when the TTL expires
+- Versions are bumped after the commit of any change to a User row
+- Any other attribute (relationships, columns not in the snapshot) loads
+  the full ORM User on first access, once per request
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+
+from app import db
+from app.models.modelsdb import CollectionStatsMixin, User
+from app.utils.cache_keys import bump_user_identity_version, get_user_identity_version
+
+SNAPSHOT_COLUMNS = (User.id, User.username, User.name, User.sum_pages)
+
+
+class SessionUser(CollectionStatsMixin):
+    """
+    current_user for one request, backed by a cached snapshot.
+
+    Collection stats come from the stats store by id; anything else is read
+    from `model`, the full User, loaded on first use.
+    """
+
+    is_authenticated = True
+    is_active = True
+    is_anonymous = False
+
+    def __init__(self, id, username, name, sum_pages):
+        self.id = id
+        self.username = username
+        self.name = name
+        self.sum_pages = sum_pages
+
+    def get_id(self):
+        return str(self.id)
+
+    @property
+    def model(self) -> User:
+        """The full ORM User (one primary-key lookup per request)."""
+        user = self.__dict__.get('_model')
+        if user is None:
+            user = self.__dict__['_model'] = db.session.get(User, self.id)
+        return user
+
+    def __getattr__(self, name):
+        # Only called for attributes the snapshot lacks
+        if name.startswith('__') or name == '_model':
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+    def __eq__(self, other):
+        return isinstance(other, (SessionUser, User)) and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f'<SessionUser {self.id} {self.username!r}>'
+
+
+class SessionUserCache:
+    """
+    Process-local LRU of user snapshots; thread-safe.
+
+    Args:
+        ttl: Seconds a snapshot is served without reloading it
+        max_entries: Snapshots kept (least recently used are evicted)
+    """
+
+    def __init__(self, ttl: float = 30.0, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[int, Tuple[float, int, Dict]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, user_id: int) -> Optional[SessionUser]:
+        """SessionUser for `user_id`, or None if the user no longer exists."""
+        # Read before the row: a bump racing with the load leaves a stale
+        # version behind, never a stale snapshot under the new version
+        version = get_user_identity_version(user_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now and entry[1] == version:
+                self._entries.move_to_end(user_id)
+                return SessionUser(**entry[2])
+
+        row = db.session.execute(
+            select(*SNAPSHOT_COLUMNS).where(User.id == user_id)
+        ).first()
+        if row is None:
+            self.invalidate(user_id)
+            return None
+        snapshot = row._asdict()
+        with self._lock:
+            self._entries[user_id] = (now + self.ttl, version, snapshot)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return SessionUser(**snapshot)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def get_session_user_cache() -> SessionUserCache:
+    """The current app's SessionUserCache (one per app: snapshots belong to its database)."""
+    cache = current_app.extensions.get('session_users')
+    if cache is None:
+        cache = current_app.extensions['session_users'] = SessionUserCache(
+            ttl=current_app.config.get('USER_LOADER_CACHE_TTL', 30.0),
+            max_entries=current_app.config.get('USER_LOADER_CACHE_SIZE', 10000),
+        )
+    return cache
+
+
+# Version bumps, after commit (a bump before it would let another request
+# cache the old row under the new version). Ids marked in a transaction that
+# is rolled back are bumped on the session's next commit: a spurious reload,
+# never a stale snapshot.
+
+def _mark_user_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('changed_user_ids', set()).add(target.id)
+
+
+def _bump_changed_users(session):
+    for user_id in session.info.pop('changed_user_ids', ()):
+        bump_user_identity_version(user_id)
+        if has_app_context():
+            get_session_user_cache().invalidate(user_id)
+
+
+def init_session_users():
+    """Register the listeners that bump identity versions on User changes."""
+    listeners = [
+        (User, 'after_update', _mark_user_changed),
+        (User, 'after_delete', _mark_user_changed),
+        (Session, 'after_commit', _bump_changed_users),
+    ]
+    for target, name, listener in listeners:
+        if not event.contains(target, name, listener):
+            event.listen(target, name, listener)
@@ -0,0 +1,191 @@
+# single_flight.py
+"""
+Request coalescing ("single-flight") for expensive cache fills.
+
+When many requests miss the same cache key at once, only one of them should
+call the upstream API; the others wait for its result instead of piling
+more calls onto a slow service.
+
+Provides:
+- In-process coalescing: threads of one worker share a single call per key
+- Cross-worker coalescing: a short-lived lock in the shared cache
+  (`cache.add`), with the other workers polling the result key
+- Waits sized per call: callers pass the worst case of their producer
+  (`timeout`), so followers outlast a slow leader instead of giving up and
+  piling their own calls onto the slow service
+- Bounded waits: a follower that still times out (stuck leader, cache
+  backend without shared state) answers with `fallback`, which defaults to
+  making the call itself
+"""
+import logging
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+from app import cache
+
+logger = logging.getLogger(__name__)
+
+LOCK_KEY = 'singleflight:{key}'
+
+
+class _Call:
+    """An in-flight call that followers in the same process can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls that would fill the same cache key.
+
+    `do(key, fn, lookup)` runs `fn` at most once per key at a time within the
+    process. The in-process leader also takes a lock in the shared cache; if
+    another worker holds it, the leader polls `lookup` (normally a
+    `cache.get` of the result key) until the other worker's result shows up.
+    `fn` is expected to store its result where `lookup` finds it.
+    """
+
+    def __init__(self, lock_timeout: float = 10.0, wait_timeout: float = 6.0,
+                 poll_interval: float = 0.05):
+        """
+        Args:
+            lock_timeout: Lifetime of the shared lock, in seconds; bounds how
+                long a crashed worker can hold other workers back
+            wait_timeout: Longest a follower waits when the caller does not
+                pass its own `timeout`
+            poll_interval: Delay between `lookup` polls while another worker
+                holds the lock
+        """
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self._stats = {'leaders': 0, 'local_waits': 0, 'remote_waits': 0, 'timeouts': 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def do(self, key: str, fn: Callable[[], Any],
+           lookup: Optional[Callable[[], Any]] = None, timeout: Optional[float] = None,
+           fallback: Optional[Callable[[], Any]] = None) -> Any:
+        """
+        Run `fn` once for all concurrent callers with the same `key`.
+
+        Args:
+            key: Cache key being filled
+            fn: Producer; called by the leader only
+            lookup: Returns the cached value or None; used by the leader after
+                taking the shared lock and while waiting for another worker
+            timeout: Longest `fn` can take; followers wait that long and the
+                shared lock lives at least that long (default: wait_timeout)
+            fallback: Answer for a follower whose wait ran out (or whose
+                leader in another worker finished without a result) and whose
+                `lookup` finds nothing (default: call `fn` itself)
+
+        Returns:
+            The value produced by `fn` (or found by `lookup`, or `fallback`'s)
+        """
+        wait_timeout = timeout if timeout is not None else self.wait_timeout
+        fallback = fallback or fn
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            self._count('local_waits')
+            if call.done.wait(wait_timeout):
+                if call.error is not None:
+                    raise call.error
+                return call.result
+            self._count('timeouts')
+            value = lookup() if lookup else None
+            return value if value is not None else fallback()
+
+        try:
+            call.result = self._run_shared(key, fn, lookup, wait_timeout, fallback)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def _run_shared(self, key: str, fn: Callable[[], Any], lookup: Optional[Callable[[], Any]],
+                    wait_timeout: float, fallback: Callable[[], Any]) -> Any:
+        """Run `fn` under the shared-cache lock, or wait for the worker holding it."""
+        lock_key = LOCK_KEY.format(key=key)
+        token = uuid.uuid4().hex
+        # The lock must not expire while a slow holder is still running
+        lock_timeout = max(self.lock_timeout, wait_timeout + 1)
+        try:
+            acquired = cache.add(lock_key, token, timeout=max(1, int(lock_timeout + 0.5)))
+        except Exception as e:
+            logger.warning(f"Single-flight lock unavailable for {key}: {e}")
+            acquired = True
+
+        if acquired:
+            self._count('leaders')
+            try:
+                # Another worker may have filled the key just before we locked
+                value = lookup() if lookup else None
+                return value if value is not None else fn()
+            finally:
+                self._release(lock_key, token)
+
+        self._count('remote_waits')
+        deadline = time.monotonic() + wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            value = lookup() if lookup else None
+            if value is not None:
+                return value
+            try:
+                if cache.get(lock_key) is None:
+                    # Holder finished without storing a result (e.g. error)
+                    return fallback()
+            except Exception:
+                return fn()
+        self._count('timeouts')
+        return fallback()
+
+    @staticmethod
+    def _release(lock_key: str, token: str):
+        # Only delete our own lock: it may have expired and been re-taken
+        try:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+        except Exception:
+            pass
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self._stats, in_flight=len(self._calls))
+
+
+# Singleton instance
+_single_flight_instance = None
+
+
+def get_single_flight() -> SingleFlight:
+    """Get or create singleton instance of SingleFlight."""
+    global _single_flight_instance
+    if _single_flight_instance is None:
+        from flask import current_app
+        _single_flight_instance = SingleFlight(
+            lock_timeout=current_app.config.get('SINGLE_FLIGHT_LOCK_TIMEOUT', 10),
+            wait_timeout=current_app.config.get('SINGLE_FLIGHT_WAIT_TIMEOUT', 6),
+            poll_interval=current_app.config.get('SINGLE_FLIGHT_POLL_INTERVAL', 0.05),
+        )
+    return _single_flight_instance
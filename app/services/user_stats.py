@@ -0,0 +1,304 @@
+# user_stats.py
+"""
+Persistent per-user collection statistics.
+
+UserStats (book count, total pages, last addition) and UserGenreCount (genre
+histogram) are kept up to date incrementally, so profile pages read them
+with a primary-key lookup instead of aggregating the whole collection:
+- UserBooks insert/delete/update and Book genre/pages changes apply deltas
+  from mapper events (see the listeners at the end of modelsdb.py), on the
+  flush's connection, inside the writer's transaction
+- Bulk inserts that bypass the ORM (collection_import) call `apply_additions`
+- A user without a row is seeded from user_books on first write;
+  scripts/rebuild_user_stats.py backfills (and repairs) every user. Reads
+  never write: until then they aggregate user_books without storing it
+
+Every delta starts with an UPDATE of the user's UserStats row, which locks it
+until commit, so concurrent writers for the same user are serialized and the
+genre rows behind it never race.
+"""
+from collections import Counter
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import case, delete, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models.modelsdb import Book, UserBooks, UserGenreCount, UserStats
+
+
+class UserStatsSnapshot(SimpleNamespace):
+    """
+    Read-only view of one user's statistics.
+
+    Attributes:
+        book_count, total_pages
+        favorite_genre: (genre, count) or None
+        last_book_added: object with `id` and `acquisition_date`, or None
+    """
+
+
+def _collection_totals(connection, user_id: int):
+    """Aggregate the user's collection from user_books (seeding, and reads of users without a row)."""
+    book_count, total_pages = connection.execute(
+        select(func.count(UserBooks.id), func.coalesce(func.sum(Book.pages), 0))
+        .join(Book, Book.id == UserBooks.book_id)
+        .where(UserBooks.user_id == user_id)
+    ).one()
+    genres = connection.execute(
+        select(Book.genre, func.count(UserBooks.id))
+        .join(Book, Book.id == UserBooks.book_id)
+        .where(UserBooks.user_id == user_id)
+        .group_by(Book.genre)
+    ).all()
+    last = _latest_addition(connection, user_id)
+    return book_count, total_pages, genres, last
+
+
+def _latest_addition(connection, user_id: int):
+    """(user_book_id, acquisition_date) of the newest addition; uses idx_user_books_acquired."""
+    return connection.execute(
+        select(UserBooks.id, UserBooks.acquisition_date)
+        .where(UserBooks.user_id == user_id)
+        .order_by(UserBooks.acquisition_date.desc(), UserBooks.id.desc())
+        .limit(1)
+    ).first()
+
+
+def seed_user_stats(connection, user_id: int, replace: bool = False) -> bool:
+    """
+    Create the user's rows from the current user_books (including changes not
+    yet committed in this transaction).
+
+    Args:
+        replace: Delete existing rows first (rebuild after drift)
+
+    Returns:
+        False if another transaction created the row first
+    """
+    if replace:
+        connection.execute(delete(UserGenreCount).where(UserGenreCount.user_id == user_id))
+        connection.execute(delete(UserStats).where(UserStats.user_id == user_id))
+
+    book_count, total_pages, genres, last = _collection_totals(connection, user_id)
+    try:
+        with connection.begin_nested():
+            connection.execute(insert(UserStats).values(
+                user_id=user_id,
+                book_count=book_count,
+                total_pages=total_pages,
+                last_user_book_id=last[0] if last else None,
+                last_acquisition_date=last[1] if last else None,
+                updated_at=datetime.utcnow(),
+            ))
+            if genres:
+                connection.execute(insert(UserGenreCount), [
+                    {'user_id': user_id, 'genre': genre, 'count': count}
+                    for genre, count in genres
+                ])
+    except IntegrityError:
+        # Seeded concurrently; that transaction's counts are the ones kept
+        return False
+    return True
+
+
+def _apply_delta(connection, user_id: int, books: int, pages: int,
+                 genres: Dict[str, int], added: Optional[Tuple[int, datetime]] = None) -> bool:
+    """
+    Add a delta to the user's row; False when the user has no row yet.
+
+    `added` is the (user_book_id, acquisition_date) of the newest inserted
+    link, which replaces the last addition when it is at least as recent.
+    """
+    values = {
+        'book_count': UserStats.book_count + books,
+        'total_pages': UserStats.total_pages + pages,
+        'updated_at': datetime.utcnow(),
+    }
+    if added is not None and added[1] is not None:
+        newer = or_(
+            UserStats.last_acquisition_date.is_(None),
+            UserStats.last_acquisition_date <= added[1],
+        )
+        values['last_user_book_id'] = case((newer, added[0]), else_=UserStats.last_user_book_id)
+        values['last_acquisition_date'] = case((newer, added[1]), else_=UserStats.last_acquisition_date)
+
+    updated = connection.execute(
+        update(UserStats).where(UserStats.user_id == user_id).values(values)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not updated:
+        return False
+
+    for genre, count in sorted(genres.items()):
+        if not count:
+            continue
+        updated = connection.execute(
+            update(UserGenreCount)
+            .where(UserGenreCount.user_id == user_id, UserGenreCount.genre == genre)
+            .values(count=UserGenreCount.count + count)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not updated and count > 0:
+            connection.execute(insert(UserGenreCount).values(user_id=user_id, genre=genre, count=count))
+    if any(count < 0 for count in genres.values()):
+        connection.execute(delete(UserGenreCount).where(
+            UserGenreCount.user_id == user_id, UserGenreCount.count <= 0
+        ))
+    return True
+
+
+def _apply_or_seed(connection, user_id: int, books: int, pages: int,
+                   genres: Dict[str, int], added: Optional[Tuple[int, datetime]] = None):
+    """Apply a delta; a user without a row is seeded instead (the seed already reflects it)."""
+    if _apply_delta(connection, user_id, books, pages, genres, added):
+        return
+    if not seed_user_stats(connection, user_id):
+        # Seeded concurrently, from a snapshot without this transaction's change
+        _apply_delta(connection, user_id, books, pages, genres, added)
+
+
+def _refresh_last_addition(connection, user_id: int, only_if: Optional[int] = None):
+    """Recompute the last addition (only when it is `only_if`, if given)."""
+    if only_if is not None:
+        current = connection.execute(
+            select(UserStats.last_user_book_id).where(UserStats.user_id == user_id)
+        ).scalar()
+        if current != only_if:
+            return
+    last = _latest_addition(connection, user_id)
+    connection.execute(
+        update(UserStats).where(UserStats.user_id == user_id).values(
+            last_user_book_id=last[0] if last else None,
+            last_acquisition_date=last[1] if last else None,
+        ).execution_options(synchronize_session=False)
+    )
+
+
+def _book_values(connection, book_id: int, book=None) -> Tuple[str, int]:
+    """(genre, pages) of a book, from the instance when it is loaded."""
+    if book is not None and book.id == book_id:
+        return book.genre, book.pages or 0
+    genre, pages = connection.execute(
+        select(Book.genre, Book.pages).where(Book.id == book_id)
+    ).one()
+    return genre, pages or 0
+
+
+# Incremental updates (called from mapper events)
+
+def on_user_book_added(connection, user_book):
+    genre, pages = _book_values(connection, user_book.book_id, user_book.__dict__.get('book'))
+    added = (user_book.id, user_book.acquisition_date)
+    _apply_or_seed(connection, user_book.user_id, 1, pages, {genre: 1}, added)
+
+
+def on_user_book_removed(connection, user_book):
+    genre, pages = _book_values(connection, user_book.book_id, user_book.__dict__.get('book'))
+    _apply_or_seed(connection, user_book.user_id, -1, -pages, {genre: -1})
+    _refresh_last_addition(connection, user_book.user_id, only_if=user_book.id)
+
+
+def on_user_book_changed(connection, user_book, old_user_id: int, old_book_id: int):
+    """A link moved to another user or book, or its acquisition date changed."""
+    user_id, book_id = user_book.user_id, user_book.book_id
+    if book_id != old_book_id or user_id != old_user_id:
+        old_genre, old_pages = _book_values(connection, old_book_id)
+        genre, pages = _book_values(connection, book_id, user_book.__dict__.get('book'))
+        if user_id == old_user_id:
+            genres = {old_genre: -1}
+            genres[genre] = genres.get(genre, 0) + 1
+            _apply_or_seed(connection, user_id, 0, pages - old_pages, genres)
+        else:
+            _apply_or_seed(connection, old_user_id, -1, -old_pages, {old_genre: -1})
+            _apply_or_seed(connection, user_id, 1, pages, {genre: 1})
+            _refresh_last_addition(connection, old_user_id, only_if=user_book.id)
+    _refresh_last_addition(connection, user_id)
+
+
+def on_book_changed(connection, book, old_genre: str, old_pages: int):
+    """Genre or page count of a book changed: move it for every owner."""
+    owners = connection.execute(
+        select(UserBooks.user_id, func.count(UserBooks.id))
+        .where(UserBooks.book_id == book.id)
+        .group_by(UserBooks.user_id)
+    ).all()
+    for user_id, links in owners:
+        genres = {old_genre: -links}
+        genres[book.genre] = genres.get(book.genre, 0) + links
+        pages = ((book.pages or 0) - (old_pages or 0)) * links
+        _apply_or_seed(connection, user_id, 0, pages, genres)
+
+
+# Bulk paths
+
+def apply_additions(user_id: int, rows: Iterable[Tuple[int, datetime, str, int]]):
+    """
+    Account for links inserted without the ORM, in the caller's transaction.
+
+    Args:
+        rows: (user_book_id, acquisition_date, genre, pages) per new link
+    """
+    rows = list(rows)
+    if not rows:
+        return
+    genres = Counter(genre for _, _, genre, _ in rows)
+    pages = sum(pages or 0 for _, _, _, pages in rows)
+    newest = max(rows, key=lambda row: (row[1] or datetime.min, row[0]))
+    _apply_or_seed(db.session.connection(), user_id, len(rows), pages, dict(genres), newest[:2])
+
+
+# Reads
+
+def get_user_stats(user_id: int) -> UserStatsSnapshot:
+    """
+    Statistics of one user: two indexed lookups, independent of collection size.
+
+    A user without a row (created before the store existed and not
+    backfilled) gets the totals aggregated from user_books, without storing
+    them; the next write or the rebuild script seeds the row.
+    """
+    # Columns rather than the entity: deltas are applied with Core UPDATEs,
+    # which would leave an identity-mapped UserStats stale
+    row = db.session.execute(
+        select(
+            UserStats.book_count, UserStats.total_pages,
+            UserStats.last_user_book_id, UserStats.last_acquisition_date,
+        ).where(UserStats.user_id == user_id)
+    ).first()
+    if row is None:
+        return _unseeded_user_stats(user_id)
+
+    favorite = db.session.execute(
+        select(UserGenreCount.genre, UserGenreCount.count)
+        .where(UserGenreCount.user_id == user_id)
+        .order_by(UserGenreCount.count.desc(), UserGenreCount.genre)
+        .limit(1)
+    ).first()
+
+    last_book_added = None
+    if row.last_user_book_id is not None:
+        last_book_added = SimpleNamespace(
+            id=row.last_user_book_id, acquisition_date=row.last_acquisition_date
+        )
+    return UserStatsSnapshot(
+        book_count=row.book_count,
+        total_pages=row.total_pages,
+        favorite_genre=tuple(favorite) if favorite else None,
+        last_book_added=last_book_added,
+    )
+
+
+def _unseeded_user_stats(user_id: int) -> UserStatsSnapshot:
+    """Statistics of a user without a row, aggregated from user_books."""
+    book_count, total_pages, genres, last = _collection_totals(db.session.connection(), user_id)
+    # Same order as the UserGenreCount lookup: most books, then genre name
+    favorite = min(genres, key=lambda item: (-item[1], item[0]), default=None)
+    return UserStatsSnapshot(
+        book_count=book_count,
+        total_pages=total_pages,
+        favorite_genre=tuple(favorite) if favorite else None,
+        last_book_added=SimpleNamespace(id=last[0], acquisition_date=last[1]) if last else None,
+    )
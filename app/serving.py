@@ -0,0 +1,62 @@
+# serving.py
+"""
+Preparação da app para servir com gunicorn em modo preload (gunicorn.conf.py).
+
+Com `preload_app` a app é criada uma vez no master e os workers nascem por
+fork, compartilhando copy-on-write tudo o que já estava carregado. Para isso
+valer a pena e ser seguro:
+
+- `warm_app` carrega no master as estruturas somente-leitura (mappers do
+  SQLAlchemy, templates compilados, mapas de gêneros e traduções), para que
+  os workers não as montem de novo, cada um com sua cópia;
+- o pool de conexões do engine nunca atravessa o fork: o master descarta as
+  conexões que abriu ao aquecer e cada worker, logo após o fork, descarta o
+  pool herdado sem fechar os sockets do pai (`after_fork`).
+"""
+import logging
+
+from sqlalchemy.orm import configure_mappers
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+
+def dispose_engines(app, close=True):
+    """
+    Descarta os pools de conexão de todos os engines da app.
+
+    Com close=False (no filho, após o fork) as conexões herdadas são apenas
+    esquecidas, sem enviar o encerramento no socket que o pai ainda usa.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=close)
+
+
+def warm_app(app):
+    """Carrega no processo atual o que os workers compartilham somente-leitura."""
+    from app.models import modelsdb  # noqa: F401
+    from app.models.code_book import GENRE_CODES  # noqa: F401
+    from app.services.openlibrary_service import load_genre_translations
+
+    configure_mappers()
+    load_genre_translations()
+
+    # Compila todos os templates para o cache do ambiente Jinja
+    templates = 0
+    for name in app.jinja_env.list_templates(extensions=['html']):
+        try:
+            app.jinja_env.get_template(name)
+            templates += 1
+        except Exception as e:
+            logger.warning("Template %s não compilou no aquecimento: %s", name, e)
+
+    # Nenhuma conexão aberta aqui pode ser herdada pelos workers
+    dispose_engines(app, close=True)
+    logger.info("App aquecida: %d templates compilados", templates)
+
+
+def after_fork(app):
+    """Chamado no worker recém-criado (hook post_fork do gunicorn)."""
+    dispose_engines(app, close=False)
@@ -0,0 +1,85 @@
+# app/utils/cache_keys.py
+"""
+Esquema de chaves de cache com namespace e versão por usuário.
+
+Cada usuário tem um contador de geração em `user_version:<id>`. As views
+cacheadas por usuário (coleção, gêneros) incluem essa versão na chave, então
+uma escrita só precisa incrementar o contador daquele usuário — as entradas
+antigas deixam de ser lidas e expiram sozinhas. Resultados da OpenLibrary e
+páginas de outros usuários continuam quentes, ao contrário de `cache.clear()`.
+
+Formato: <namespace>:u<user_id>:v<versão>[:<partes>...]
+
+Um segundo contador, `user_identity_version:<id>`, muda só quando o registro
+do usuário muda (nome, username...); valida os snapshots de
+app.services.session_users sem ser invalidado a cada livro adicionado.
+"""
+import time
+
+from app import cache
+
+VERSION_KEY = 'user_version:{user_id}'
+IDENTITY_VERSION_KEY = 'user_identity_version:{user_id}'
+
+
+def _fresh_version():
+    # Milissegundos desde a época: se o contador for despejado do cache, a
+    # nova versão nunca colide com uma versão antiga ainda em cache
+    return int(time.time() * 1000)
+
+
+def _get_version(key):
+    try:
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, _fresh_version(), timeout=0)
+            version = cache.get(key)
+        # Backends que não armazenam nada (NullCache) ficam sempre na versão 0
+        return version or 0
+    except Exception:
+        return 0
+
+
+def _bump_version(key):
+    try:
+        if cache.get(key) is None:
+            version = _fresh_version()
+            cache.set(key, version, timeout=0)
+            return version
+        # inc é atômico em Redis/Memcached; fica no backend, não no wrapper
+        return cache.cache.inc(key)
+    except Exception:
+        return None
+
+
+def get_user_cache_version(user_id):
+    """Retorna a versão atual do cache do usuário, criando-a se necessário."""
+    return _get_version(VERSION_KEY.format(user_id=user_id))
+
+
+def bump_user_cache_version(user_id):
+    """
+    Invalida todas as entradas cacheadas de um usuário.
+
+    Returns:
+        int: A nova versão (ou None se o backend de cache falhar)
+    """
+    return _bump_version(VERSION_KEY.format(user_id=user_id))
+
+
+def get_user_identity_version(user_id):
+    """Versão do registro do usuário (ver IDENTITY_VERSION_KEY)."""
+    return _get_version(IDENTITY_VERSION_KEY.format(user_id=user_id))
+
+
+def bump_user_identity_version(user_id):
+    """Marca o registro do usuário como alterado; retorna a nova versão (ou None)."""
+    return _bump_version(IDENTITY_VERSION_KEY.format(user_id=user_id))
+
+
+def user_cache_key(namespace, user_id, *parts, version=None):
+    """Monta uma chave versionada para dados de um usuário."""
+    if version is None:
+        version = get_user_cache_version(user_id)
+    suffix = ''.join(f':{part}' for part in parts)
+    return f'{namespace}:u{user_id}:v{version}{suffix}'
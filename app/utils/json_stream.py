@@ -0,0 +1,102 @@
+# app/utils/json_stream.py
+"""
+Leitura incremental de um array dentro de uma resposta JSON.
+
+`response.json()` só começa a trabalhar depois de baixar o corpo inteiro e
+monta todos os objetos de uma vez. `iter_json_array` consome os chunks da
+resposta à medida que chegam e devolve os itens do array um a um com
+`json.JSONDecoder.raw_decode`, parando depois de `limit` itens — sem
+dependência externa (ijson).
+"""
+import codecs
+import json
+import re
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r'[\s,]*')
+
+
+def iter_json_array(chunks, key, limit=None):
+    """
+    Itera os itens do array `key` de um objeto JSON recebido em chunks.
+
+    Args:
+        chunks: Iterável de bytes (ex.: `response.iter_content(...)`)
+        key: Nome da chave do array no objeto de topo (ex.: 'docs')
+        limit: Para depois de tantos itens (None = todos)
+
+    Yields:
+        Cada item já decodificado
+
+    Raises:
+        ValueError: Se o corpo terminar antes do array ou com um item inválido
+
+    A chave é procurada pelo texto `"<key>": [`, então deve vir antes de
+    qualquer valor de texto que contenha esse trecho (como em search.json da
+    OpenLibrary, em que só números e booleanos a precedem).
+    """
+    if limit is not None and limit <= 0:
+        return
+
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    start = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+    buffer = ''
+    pos = 0
+    in_array = False
+    count = 0
+    # Depois de um item incompleto, só tenta de novo quando o buffer dobrar:
+    # com chunks pequenos, tentar a cada chunk seria quadrático
+    retry_at = 0
+    finished = False
+
+    chunks = iter(chunks)
+    while True:
+        chunk = next(chunks, None)
+        if chunk is None:
+            finished = True
+            buffer += decoder.decode(b'', final=True)
+        else:
+            buffer += decoder.decode(chunk)
+
+        if not finished and len(buffer) < retry_at:
+            continue
+
+        if not in_array:
+            match = start.search(buffer)
+            if not match:
+                if finished:
+                    raise ValueError(f'JSON array "{key}" not found')
+                # Guarda só o final, caso a chave esteja dividida entre chunks
+                buffer = buffer[-(len(key) + 64):]
+                continue
+            in_array = True
+            pos = match.end()
+
+        while True:
+            pos = _WHITESPACE.match(buffer, pos).end()
+            if pos >= len(buffer):
+                break
+            if buffer[pos] == ']':
+                return
+            try:
+                item, end = _DECODER.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if finished:
+                    raise ValueError(f'Truncated or invalid item in JSON array "{key}"')
+                retry_at = pos + 2 * (len(buffer) - pos)
+                break  # Item incompleto: espera mais chunks
+            if end >= len(buffer) and not finished:
+                retry_at = len(buffer) + 1
+                break  # Um número no fim do buffer pode continuar no próximo chunk
+            pos = end
+            yield item
+            count += 1
+            if limit is not None and count >= limit:
+                return
+
+        # Descarta o que já foi decodificado
+        buffer = buffer[pos:]
+        retry_at -= pos
+        pos = 0
+        if finished:
+            raise ValueError(f'JSON array "{key}" is not terminated')
@@ -0,0 +1,86 @@
+# app/utils/response_cache.py
+"""
+Cache de respostas por usuário para views autenticadas.
+
+`@cache.cached` monta a chave só com path e query string, sem o usuário, o
+que faria um usuário receber a página cacheada de outro. `user_cached`
+guarda o HTML renderizado sob uma chave versionada do usuário
+(app.utils.cache_keys) e responde com ETag derivado da versão da coleção:
+visitas repetidas com `If-None-Match` recebem 304 sem consulta nem render.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+
+from app import cache
+from app.utils.cache_keys import get_user_cache_version, user_cache_key
+
+
+def _session_fingerprint():
+    """
+    Identifica a sessão e a janela de validade do token CSRF.
+
+    Páginas cacheadas embutem `csrf_token()`, que depende da sessão e expira
+    após WTF_CSRF_TIME_LIMIT; a chave muda com ambos para nunca servir um
+    formulário com token inválido.
+    """
+    raw_token = session.get('csrf_token', '')
+    window = (current_app.config.get('WTF_CSRF_TIME_LIMIT') or 3600) // 2
+    return '{}.{}'.format(
+        hashlib.sha1(raw_token.encode()).hexdigest()[:12],
+        int(time.time() // max(window, 1))
+    )
+
+
+def user_cached(namespace, timeout=300, vary_on=()):
+    """
+    Cacheia o HTML de uma view autenticada por usuário, com ETag/304.
+
+    Args:
+        namespace: Prefixo da chave (ex.: 'collection')
+        timeout: Tempo de vida da entrada em segundos
+        vary_on: Nomes de parâmetros da query string que mudam a página
+
+    Respostas que não são HTML renderizado (redirects, tuplas com status)
+    não são cacheadas, nem páginas renderizadas com mensagens flash
+    pendentes, que são de uso único.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not current_user.is_authenticated or '_flashes' in session:
+                return f(*args, **kwargs)
+
+            version = get_user_cache_version(current_user.id)
+            if not version:
+                # Backend de cache sem armazenamento: sem versão, sem ETag seguro
+                return f(*args, **kwargs)
+
+            parts = [request.args.get(name, '') for name in vary_on]
+            key = user_cache_key(
+                namespace, current_user.id, *parts, _session_fingerprint(), version=version
+            )
+            etag = hashlib.sha1(key.encode()).hexdigest()
+
+            if request.if_none_match.contains_weak(etag):
+                response = make_response('', 304)
+            else:
+                body = cache.get(key)
+                if body is None:
+                    rv = f(*args, **kwargs)
+                    if not isinstance(rv, str):
+                        return rv
+                    body = rv
+                    cache.set(key, body, timeout=timeout)
+                response = make_response(body)
+
+            response.set_etag(etag, weak=True)
+            # Sempre revalidar: o navegador guarda a página, mas pergunta antes
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+
+        return decorated_function
+    return decorator
@@ -1,3 +1,6 @@
+import unicodedata
+
+
 def sanitize_string(value, case=None):
     """
     Limpa e padroniza uma string.
@@ -14,3 +17,15 @@ def sanitize_string(value, case=None):
         return value.lower()
     return value
 
+
+def normalize_search_text(value):
+    """
+    Normaliza texto para comparações de busca.
+
+    Remove acentos, converte para minúsculas e colapsa espaços, de modo que
+    "  Machado de  Assís" e "machado de assis" sejam equivalentes.
+    """
+    value = (value or '').strip().lower()
+    value = unicodedata.normalize('NFKD', value)
+    value = ''.join(ch for ch in value if not unicodedata.combining(ch))
+    return ' '.join(value.split())
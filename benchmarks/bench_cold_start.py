@@ -0,0 +1,133 @@
+"""
+Cold-start benchmark: how long a fresh process takes to serve its first request.
+
+Each run starts a new interpreter (as a gunicorn worker, script or test
+session would) and measures, in that process:
+- import: `import app` (the package, without building an app)
+- create_app: building the Flask app
+- first_health: first request to /health (no templates, no DB)
+- first_page: first request to /login (first template render)
+- process: the whole subprocess, interpreter startup included
+
+Medians and maxima over `--runs` are printed and optionally written as JSON.
+A throwaway SQLite file (schema created once, up front) is used unless
+`--database-url` is given.
+
+Run with:
+    python benchmarks/bench_cold_start.py
+    python benchmarks/bench_cold_start.py --runs 20 --output /tmp/cold.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+PHASES = ['import', 'create_app', 'first_health', 'first_page', 'process']
+
+# Runs in each fresh interpreter; prints one JSON line of timings (ms)
+PROBE = '''
+import json, sys, time
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+timings = {{}}
+import app as package
+timings['import'] = time.perf_counter() - started
+mark = time.perf_counter()
+flask_app = package.create_app()
+flask_app.config.update(TESTING=True)
+timings['create_app'] = time.perf_counter() - mark
+client = flask_app.test_client()
+mark = time.perf_counter()
+assert client.get('/health').status_code == 200
+timings['first_health'] = time.perf_counter() - mark
+mark = time.perf_counter()
+assert client.get('/login').status_code == 200
+timings['first_page'] = time.perf_counter() - mark
+print(json.dumps({{name: value * 1000 for name, value in timings.items()}}))
+'''
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=10, help='Fresh processes to start (default: 10)')
+    parser.add_argument('--database-url', help='Database to use (schema is created if missing)')
+    parser.add_argument('--output', help='Write results JSON here')
+    return parser.parse_args()
+
+
+def create_schema(env):
+    code = (
+        f'import sys; sys.path.insert(0, {PROJECT_ROOT!r})\n'
+        'from app import create_app, db\n'
+        'app = create_app()\n'
+        'with app.app_context(): db.create_all()\n'
+    )
+    subprocess.run([sys.executable, '-c', code], env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def run_probe(env):
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, '-c', PROBE.format(root=PROJECT_ROOT)],
+        env=env, check=True, capture_output=True, text=True,
+    )
+    timings = json.loads(completed.stdout.strip().splitlines()[-1])
+    timings['process'] = (time.perf_counter() - started) * 1000
+    return timings
+
+
+def summarize(samples):
+    return {
+        phase: {
+            'median_ms': round(statistics.median(run[phase] for run in samples), 1),
+            'max_ms': round(max(run[phase] for run in samples), 1),
+        }
+        for phase in PHASES
+    }
+
+
+def main():
+    args = parse_args()
+    output = os.path.abspath(args.output) if args.output else None
+    workdir = tempfile.mkdtemp(prefix='biblioteca-cold-')
+    env = dict(
+        os.environ,
+        DATABASE_URL=args.database_url or f"sqlite:///{os.path.join(workdir, 'cold.db')}",
+        SECRET_KEY='benchmark',
+    )
+    env.pop('PROMETHEUS_MULTIPROC_DIR', None)
+    os.chdir(workdir)  # app.log goes to the scratch directory
+
+    create_schema(env)
+    samples = [run_probe(env) for _ in range(args.runs)]
+    results = {
+        'meta': {
+            'date': datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'database': env['DATABASE_URL'].split(':', 1)[0],
+            'runs': args.runs,
+        },
+        'results': summarize(samples),
+    }
+
+    print(f'{"phase":<14} {"median":>10} {"max":>10}')
+    for phase, stats in results['results'].items():
+        print(f'{phase:<14} {stats["median_ms"]:>8.1f}ms {stats["max_ms"]:>8.1f}ms')
+    if output:
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
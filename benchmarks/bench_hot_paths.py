@@ -0,0 +1,328 @@
+"""
+Offline benchmark suite for the collection and autocomplete hot paths.
+
+Drives /autocomplete, /check_duplicates, /your_collection,
+/your_collection/export and /your_collection/import through the Flask test
+client against a seeded database of 1k/10k/100k books, with OpenLibrary
+replaced by a local stub serving search.json (benchmarks/openlibrary_stub.py).
+
+For every endpoint and collection size it reports p50/p95/p99 latency and
+the number of SQL statements per request, writes the results as JSON and can
+compare them with a committed baseline to detect regressions.
+
+Run with:
+    python benchmarks/bench_hot_paths.py
+    python benchmarks/bench_hot_paths.py --sizes 1000,10000 --output /tmp/run.json
+    python benchmarks/bench_hot_paths.py --compare benchmarks/baseline.json
+
+By default a throwaway SQLite file is used. `--database-url` points the suite
+at another database (e.g. Postgres in a container); its tables are DROPPED
+and recreated.
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+WORDS = [
+    'amor', 'sombra', 'cidade', 'mar', 'noite', 'tempo', 'casa', 'rio', 'vento', 'sol',
+    'memórias', 'história', 'segredo', 'jardim', 'viagem', 'guerra', 'silêncio', 'ilha',
+    'machado', 'dom', 'estrela', 'caminho', 'livro', 'ponte', 'lua', 'fogo', 'sertão',
+]
+AUTHORS = [
+    'Machado de Assis', 'Clarice Lispector', 'Jorge Amado', 'Cecília Meireles',
+    'Graciliano Ramos', 'Rachel de Queiroz', 'Aluísio Azevedo', 'José Saramago',
+    'Lygia Fagundes Telles', 'Érico Veríssimo', 'Conceição Evaristo', 'Hilda Hilst',
+]
+GENRES = ['Romance', 'Fiction', 'Biography', 'History', 'Brazilian Literature', 'Essay']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help='Comma-separated collection sizes (default: 1000,10000,100000)')
+    parser.add_argument('--requests', type=int, default=200,
+                        help='Measured requests per endpoint for cheap endpoints (default: 200)')
+    parser.add_argument('--budget', type=float, default=60.0,
+                        help='Stop measuring an endpoint after this many seconds, once at '
+                             'least 5 requests were made (default: 60)')
+    parser.add_argument('--database-url', help='Database to use (tables are dropped!)')
+    parser.add_argument('--cache-type', default='NullCache',
+                        help='Flask-Caching backend during the run (default: NullCache, as in config.py)')
+    parser.add_argument('--output', help='Write results JSON here')
+    parser.add_argument('--compare', nargs='?', const=BASELINE,
+                        help='Compare with a baseline JSON (default: benchmarks/baseline.json)')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='Allowed p95 slowdown vs. baseline, as a fraction (default: 0.5)')
+    parser.add_argument('--min-delta-ms', type=float, default=25.0,
+                        help='Ignore p95 slowdowns smaller than this, to absorb noise on '
+                             'fast endpoints (default: 25)')
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args()
+
+
+class QueryCounter:
+    """Counts SQL statements issued by the benchmark thread only."""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.count = 0
+        self._thread = threading.get_ident()
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, *args, **kwargs):
+        # The metrics recorder flushes from its own thread; ignore it
+        if threading.get_ident() == self._thread:
+            self.count += 1
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if len(ordered) == 1:
+        return ordered[0]
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(timings, queries):
+    return {
+        'requests': len(timings),
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'queries_per_request': round(statistics.mean(queries), 2),
+    }
+
+
+def make_title(rng, i):
+    return f'{rng.choice(WORDS).title()} {rng.choice(WORDS)} {i}'
+
+
+def seed_books(db, user_id, start, stop, rng, batch_size=5000):
+    """Insert books [start, stop) into the user's collection with core INSERTs."""
+    from sqlalchemy import insert, literal, select
+    from app.models.modelsdb import Book, UserBooks
+
+    now = datetime.utcnow()
+    for offset in range(start, stop, batch_size):
+        end = min(offset + batch_size, stop)
+        db.session.execute(insert(Book), [{
+            'code': f'S{i:08d}', 'title': make_title(rng, i),
+            'author': rng.choice(AUTHORS), 'publisher': 'Editora Benchmark',
+            'publication_year': rng.randint(1850, 2020), 'pages': rng.randint(80, 900),
+            'genre': rng.choice(GENRES), 'created_at': now,
+        } for i in range(offset, end)])
+        db.session.execute(insert(UserBooks).from_select(
+            ['user_id', 'book_id', 'status', 'read_status', 'format', 'quantity', 'acquisition_date'],
+            select(
+                literal(user_id), Book.id, literal('available'), literal('unread'),
+                literal('physical'), literal(1), literal(now)
+            ).where(Book.code.between(f'S{offset:08d}', f'S{end - 1:08d}'))
+        ))
+    db.session.commit()
+
+
+def import_csv(rng, rows, run):
+    output = io.StringIO()
+    output.write('title,author,publisher,publication_year,pages,genre\n')
+    for i in range(rows):
+        output.write(f'Importado {run}-{i} {rng.choice(WORDS)},{rng.choice(AUTHORS)},'
+                     f'Editora Benchmark,1990,200,{rng.choice(GENRES)}\n')
+    return output.getvalue().encode('utf-8')
+
+
+def build_scenarios(size, sample_books, rng, cheap_requests):
+    """(name, request count, callable(client, i)) for each endpoint."""
+    from app.services.collection_service import encode_cursor
+
+    def autocomplete(client, i):
+        title = rng.choice(sample_books)[1]
+        prefix = title[:rng.randint(2, 6)]
+        return client.get('/autocomplete', query_string={'query': prefix})
+
+    def check_duplicates(client, i):
+        _, title, author = rng.choice(sample_books)
+        return client.post('/check_duplicates', json={'title': title, 'author': author})
+
+    def your_collection(client, i):
+        # Half first pages, half deep pages reached through a cursor
+        if i % 2 == 0:
+            return client.get('/your_collection')
+        book_id, title, _ = rng.choice(sample_books)
+        cursor = encode_cursor(title, book_id, 'next', max(2, book_id // 20))
+        return client.get('/your_collection', query_string={'cursor': cursor})
+
+    def export(client, i):
+        response = client.get('/your_collection/export')
+        response.get_data()  # Drain the stream
+        return response
+
+    def do_import(client, i):
+        data = {'collection_file': (io.BytesIO(import_csv(rng, 100, f'{size}-{i}')), 'import.csv')}
+        return client.post('/your_collection/import', data=data, content_type='multipart/form-data')
+
+    heavy = max(3, min(cheap_requests, 2000000 // size // 10))
+    return [
+        ('autocomplete', cheap_requests, autocomplete),
+        ('check_duplicates', cheap_requests, check_duplicates),
+        ('your_collection', cheap_requests, your_collection),
+        ('export', heavy, export),
+        ('import', max(3, heavy // 2), do_import),
+    ]
+
+
+def run_scenario(client, counter, fn, count, budget, warmup=3, min_requests=5):
+    for i in range(warmup):
+        fn(client, i)
+    timings, queries = [], []
+    deadline = time.perf_counter() + budget
+    for i in range(count):
+        if i >= min_requests and time.perf_counter() > deadline:
+            break  # Slow endpoint at this size; keep the run bounded
+        before = counter.count
+        start = time.perf_counter()
+        response = fn(client, i)
+        timings.append((time.perf_counter() - start) * 1000)
+        queries.append(counter.count - before)
+        if response.status_code >= 400 or '/login' in response.headers.get('Location', ''):
+            raise RuntimeError(f'{response.request.path} returned {response.status_code}')
+    return summarize(timings, queries)
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """Return a list of regression messages (empty when within tolerance)."""
+    regressions = []
+    for size, endpoints in results['results'].items():
+        for name, current in endpoints.items():
+            previous = baseline.get('results', {}).get(size, {}).get(name)
+            if not previous:
+                continue
+            slower = current['p95_ms'] - previous['p95_ms']
+            if current['p95_ms'] > previous['p95_ms'] * (1 + tolerance) and slower > min_delta_ms:
+                regressions.append(
+                    f"{name}@{size}: p95 {current['p95_ms']:.1f} ms vs baseline {previous['p95_ms']:.1f} ms"
+                )
+            if current['queries_per_request'] > previous['queries_per_request'] + 0.5:
+                regressions.append(
+                    f"{name}@{size}: {current['queries_per_request']} queries/request "
+                    f"vs baseline {previous['queries_per_request']}"
+                )
+    return regressions
+
+
+def main():
+    args = parse_args()
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = os.path.abspath(args.compare) if args.compare else None
+    workdir = tempfile.mkdtemp(prefix='biblioteca-bench-')
+    os.environ['DATABASE_URL'] = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    os.chdir(workdir)  # app.log goes to the scratch directory
+
+    from app import cache, create_app, db, limiter
+    from app.models.modelsdb import Book, User
+    from app.services.openlibrary_service import get_openlibrary_service
+    from benchmarks.openlibrary_stub import start_stub
+
+    app = create_app()
+    app.config.update(
+        TESTING=True, WTF_CSRF_ENABLED=False, SESSION_COOKIE_SECURE=False,
+        REMEMBER_COOKIE_SECURE=False, SESSION_PROTECTION=None,
+    )
+    limiter.enabled = False
+    cache.init_app(app, config={'CACHE_TYPE': args.cache_type})
+
+    stub, stub_url = start_stub()
+    rng = random.Random(args.seed)
+    results = {
+        'meta': {
+            'date': datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'database': os.environ['DATABASE_URL'].split(':', 1)[0],
+            'cache_type': args.cache_type,
+            'requests': args.requests,
+            'budget_s': args.budget,
+        },
+        'results': {},
+    }
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        get_openlibrary_service().BASE_URL = f'{stub_url}/search.json'
+        counter = QueryCounter(db.engine)
+
+        user = User(username='bench', name='Benchmark', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    # Requests run outside any app context, so each one gets its own context
+    # and session, as under a real server
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+    seeded = 0
+    for size in sizes:
+        started = time.perf_counter()
+        with app.app_context():
+            seed_books(db, user_id, seeded, size, rng)
+            sample_books = db.session.query(Book.id, Book.title, Book.author).filter(
+                Book.code.like('S%')
+            ).order_by(db.func.random()).limit(500).all()
+        seeded = size
+        print(f'\n== {size} books (seeded in {time.perf_counter() - started:.1f}s) ==')
+        print(f"{'endpoint':<18}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>10}")
+
+        results['results'][str(size)] = {}
+        for name, count, fn in build_scenarios(size, sample_books, rng, args.requests):
+            summary = run_scenario(client, counter, fn, count, args.budget)
+            results['results'][str(size)][name] = summary
+            print(f"{name:<18}{summary['requests']:>6}{summary['p50_ms']:>10.2f}"
+                  f"{summary['p95_ms']:>10.2f}{summary['p99_ms']:>10.2f}"
+                  f"{summary['queries_per_request']:>10.2f}")
+
+    stub.shutdown()
+    results['meta']['openlibrary_stub_requests'] = stub.requests
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'\nResults written to {output}')
+
+    if baseline:
+        with open(baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.min_delta_ms)
+        if regressions:
+            print('\nRegressions:')
+            for message in regressions:
+                print(f'  - {message}')
+            sys.exit(1)
+        print('\nNo regressions against baseline.')
+
+
+if __name__ == '__main__':
+    main()
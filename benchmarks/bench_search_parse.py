@@ -0,0 +1,62 @@
+"""
+Measure OpenLibrary search payload size and parse time against search.json.
+
+Compares the full response with the `fields=` projection sent by
+OpenLibraryService, both built from the fixture the way the local stub
+serves them (benchmarks/openlibrary_stub.py), each parsed with `json.loads` and with the incremental
+parser (app.utils.json_stream) stopping after `limit` docs.
+
+Run with:
+    python benchmarks/bench_search_parse.py [limit]
+"""
+
+import json
+import os
+import statistics
+import sys
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app.services.openlibrary_service import OpenLibraryService
+from app.utils.json_stream import iter_json_array
+from benchmarks.openlibrary_stub import load_fixture, search_response
+
+CHUNK_SIZE = 16384
+ROUNDS = 200
+
+
+def median_ms(fn):
+    samples = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def chunked(body):
+    return [body[i:i + CHUNK_SIZE] for i in range(0, len(body), CHUNK_SIZE)]
+
+
+def run(limit):
+    payload = load_fixture()
+    docs = len(payload['docs'])
+    full = json.dumps(search_response(payload, docs)).encode('utf-8')
+    projected = json.dumps(
+        search_response(payload, docs, OpenLibraryService.SEARCH_FIELDS)
+    ).encode('utf-8')
+
+    print(f"search.json: {docs} docs, limit={limit}\n")
+    print(f"{'payload':<12}{'bytes':>10}{'json.loads ms':>16}{'stream ms':>12}")
+    for name, body in (('full', full), ('fields=', projected)):
+        chunks = chunked(body)
+        loads = median_ms(lambda: json.loads(body)['docs'][:limit])
+        stream = median_ms(lambda: list(iter_json_array(chunks, 'docs', limit=limit)))
+        print(f"{name:<12}{len(body):>10}{loads:>16.3f}{stream:>12.3f}")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
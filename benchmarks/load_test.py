@@ -0,0 +1,297 @@
+"""
+Load test of the gunicorn serving profile: throughput and memory per worker.
+
+Starts gunicorn with the repo's gunicorn.conf.py (entry point
+benchmarks/load_wsgi.py: the production app with rate limiting off) against
+a seeded throwaway SQLite database, logs in once and drives a mix of pages
+(/, /your_collection, /health) from `--concurrency` keep-alive connections
+for `--duration` seconds. For each serving mode it reports:
+- throughput (req/s), p50/p95/p99 latency and error count
+- per-worker memory after the load, from /proc/<pid>/smaps_rollup:
+  RSS, PSS (shared pages split between the processes sharing them) and
+  USS (pages private to the worker)
+
+With `--preload both` (the default) it runs with preload off and on, so the
+copy-on-write sharing shows up as lower PSS/USS per worker. Linux only.
+
+Run with:
+    python benchmarks/load_test.py
+    python benchmarks/load_test.py --workers 4 --threads 4 --duration 20 --output /tmp/load.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import re
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlencode
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+PATHS = ['/', '/your_collection', '/health']
+USERNAME = 'carga'
+PASSWORD = 'Carga-Benchmark-1'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--preload', choices=['on', 'off', 'both'], default='both')
+    parser.add_argument('--workers', type=int, default=4, help='Gunicorn workers (default: 4)')
+    parser.add_argument('--threads', type=int, default=4, help='Threads per worker (default: 4)')
+    parser.add_argument('--worker-class', default='gthread')
+    parser.add_argument('--concurrency', type=int, default=16, help='Client connections (default: 16)')
+    parser.add_argument('--duration', type=float, default=15.0, help='Seconds of load per mode (default: 15)')
+    parser.add_argument('--books', type=int, default=2000, help='Books in the test collection (default: 2000)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Write results JSON here')
+    return parser.parse_args()
+
+
+def seed_database(books, seed):
+    """Create the schema, the login user and its collection."""
+    from app import create_app, db
+    from app.models.modelsdb import User
+    from benchmarks.bench_hot_paths import seed_books
+
+    app = create_app()
+    app.config.update(PASSWORD_HASH_WORKERS=0)
+    with app.app_context():
+        db.create_all()
+        user = User(username=USERNAME, name='Carga')
+        user.set_password(PASSWORD)
+        db.session.add(user)
+        db.session.commit()
+        seed_books(db, user.id, 0, books, random.Random(seed))
+        db.engine.dispose()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def worker_pids(master_pid):
+    """Direct children of the gunicorn master."""
+    pids = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # The command name may contain spaces; ppid follows its closing paren
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == master_pid:
+            pids.append(int(entry))
+    return sorted(pids)
+
+
+def memory_kb(pid):
+    """RSS, PSS and USS (private clean + dirty) of a process, in kB."""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            name, _, rest = line.partition(':')
+            if rest.strip().endswith('kB'):
+                values[name] = int(rest.split()[0])
+    return {
+        'rss': values['Rss'],
+        'pss': values['Pss'],
+        'uss': values['Private_Clean'] + values['Private_Dirty'],
+    }
+
+
+def request(conn, method, path, cookie=None, body=None):
+    headers = {'Cookie': cookie} if cookie else {}
+    if body is not None:
+        headers['Content-Type'] = 'application/x-www-form-urlencoded'
+    conn.request(method, path, body=body, headers=headers)
+    response = conn.getresponse()
+    return response, response.read()
+
+
+def cookies(response):
+    """Non-empty cookies set by a response, as a Cookie header value."""
+    pairs = [header.split(';', 1)[0] for header in response.msg.get_all('Set-Cookie') or []]
+    return '; '.join(pair for pair in pairs if not pair.endswith('='))
+
+
+def wait_until_ready(port, master_pid, workers, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            response, _ = request(conn, 'GET', '/health')
+            conn.close()
+            if response.status == 200 and len(worker_pids(master_pid)) >= workers:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError('gunicorn did not become ready')
+
+
+def login(port):
+    """Log in through the real form (CSRF included); returns the session cookie."""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    response, body = request(conn, 'GET', '/login')
+    cookie = cookies(response)
+    token = re.search(rb'name="csrf_token"[^>]*value="([^"]+)"', body).group(1).decode()
+    form = urlencode({'csrf_token': token, 'username': USERNAME, 'password': PASSWORD})
+    response, _ = request(conn, 'POST', '/login', cookie=cookie, body=form)
+    conn.close()
+    if response.status != 302 or '/login' in (response.getheader('Location') or ''):
+        raise RuntimeError(f'login failed ({response.status})')
+    return cookies(response)
+
+
+def drive(port, cookie, concurrency, duration):
+    """Hit PATHS round-robin from `concurrency` connections; returns (latencies, errors, elapsed)."""
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client(offset):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        own, failed, i = [], 0, offset
+        while time.monotonic() < stop_at:
+            path = PATHS[i % len(PATHS)]
+            i += 1
+            started = time.perf_counter()
+            try:
+                response, _ = request(conn, 'GET', path, cookie=cookie)
+                if response.status != 200:
+                    failed += 1
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                continue
+            own.append((time.perf_counter() - started) * 1000)
+        conn.close()
+        with lock:
+            latencies.extend(own)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0], time.monotonic() - started
+
+
+def run_mode(preload, args, env, workdir):
+    port = free_port()
+    env = dict(
+        env,
+        GUNICORN_PRELOAD='true' if preload else 'false',
+        GUNICORN_WORKERS=str(args.workers),
+        GUNICORN_THREADS=str(args.threads),
+        GUNICORN_WORKER_CLASS=args.worker_class,
+        PROMETHEUS_MULTIPROC_DIR=os.path.join(workdir, f'prometheus-{"on" if preload else "off"}'),
+    )
+    command = [
+        sys.executable, '-m', 'gunicorn',
+        '-c', os.path.join(PROJECT_ROOT, 'gunicorn.conf.py'),
+        '-b', f'127.0.0.1:{port}',
+        '--pythonpath', f'{PROJECT_ROOT},{os.path.dirname(os.path.abspath(__file__))}',
+        'load_wsgi:app',
+    ]
+    with open(os.path.join(workdir, 'gunicorn.log'), 'ab') as log:
+        server = subprocess.Popen(command, cwd=workdir, env=env, stdout=log, stderr=log)
+    try:
+        wait_until_ready(port, server.pid, args.workers)
+        cookie = login(port)
+        # Every worker serves every page once before measuring
+        drive(port, cookie, args.concurrency, min(2.0, args.duration))
+        latencies, errors, elapsed = drive(port, cookie, args.concurrency, args.duration)
+
+        workers = [memory_kb(pid) for pid in worker_pids(server.pid)]
+        master = memory_kb(server.pid)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'req_per_s': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(statistics.median(latencies), 2),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1], 2),
+        'p99_ms': round(latencies[int(len(latencies) * 0.99) - 1], 2),
+        'master_kb': master,
+        'worker_kb': {
+            key: round(statistics.mean(worker[key] for worker in workers))
+            for key in ('rss', 'pss', 'uss')
+        },
+        'total_pss_kb': master['pss'] + sum(worker['pss'] for worker in workers),
+    }
+
+
+def main():
+    args = parse_args()
+    output = os.path.abspath(args.output) if args.output else None
+    workdir = tempfile.mkdtemp(prefix='biblioteca-load-')
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'load.db')}",
+        SECRET_KEY='benchmark',
+        PASSWORD_HASH_WORKERS='0',
+    )
+    os.environ.update(DATABASE_URL=env['DATABASE_URL'], SECRET_KEY='benchmark')
+    os.environ.pop('PROMETHEUS_MULTIPROC_DIR', None)
+    os.chdir(workdir)  # app.log and gunicorn.log go to the scratch directory
+
+    seed_database(args.books, args.seed)
+    modes = {'off': [False], 'on': [True], 'both': [False, True]}[args.preload]
+    results = {
+        'meta': {
+            'date': datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'workers': args.workers,
+            'worker_class': args.worker_class,
+            'threads': args.threads,
+            'concurrency': args.concurrency,
+            'duration_s': args.duration,
+            'books': args.books,
+        },
+        'results': {},
+    }
+    for preload in modes:
+        name = 'preload' if preload else 'no-preload'
+        results['results'][name] = run_mode(preload, args, env, workdir)
+
+    print(f'{"mode":<12}{"req/s":>9}{"p50 ms":>9}{"p95 ms":>9}{"errors":>8}'
+          f'{"RSS/wkr":>10}{"PSS/wkr":>10}{"USS/wkr":>10}{"PSS total":>11}')
+    for name, stats in results['results'].items():
+        worker = stats['worker_kb']
+        print(f'{name:<12}{stats["req_per_s"]:>9.1f}{stats["p50_ms"]:>9.2f}{stats["p95_ms"]:>9.2f}'
+              f'{stats["errors"]:>8}{worker["rss"] / 1024:>8.1f}MB{worker["pss"] / 1024:>8.1f}MB'
+              f'{worker["uss"] / 1024:>8.1f}MB{stats["total_pss_kb"] / 1024:>9.1f}MB')
+    if output:
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
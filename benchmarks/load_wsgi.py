@@ -0,0 +1,10 @@
+"""
+WSGI entry point for benchmarks/load_test.py.
+
+The production app (`run:app`, loaded with gunicorn.conf.py) with rate
+limiting switched off, so a load test from one address is not answered 429.
+"""
+from app import limiter
+from run import app  # noqa: F401
+
+limiter.enabled = False
@@ -0,0 +1,75 @@
+"""
+Local stand-in for openlibrary.org used by the benchmark suite.
+
+Serves the repository's search.json fixture for /search.json, honouring the
+`limit` and `fields` parameters the way OpenLibrary does, so the benchmark
+exercises the real request/parse path without network access.
+"""
+
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FIXTURE = os.path.join(os.path.dirname(__file__), '..', 'search.json')
+
+
+def load_fixture():
+    """The search.json payload, parsed."""
+    with open(FIXTURE, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def search_response(payload, limit=100, fields=''):
+    """What OpenLibrary returns for `payload` with the `limit` and `fields=` parameters."""
+    response = dict(payload)
+    docs = payload['docs'][:limit]
+    if fields:
+        wanted = fields.split(',')
+        docs = [{field: doc[field] for field in wanted if field in doc} for doc in docs]
+    response['docs'] = docs
+    return response
+
+
+class OpenLibraryStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the real API
+    disable_nagle_algorithm = True  # Headers and body go out in separate writes
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != '/search.json':
+            self._send(404, {'error': 'not found'})
+            return
+
+        params = parse_qs(url.query)
+        limit = int(params.get('limit', ['100'])[0])
+        fields = params.get('fields', [''])[0]
+        self.server.requests += 1
+        self._send(200, search_response(self.server.payload, limit, fields))
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub(host='127.0.0.1', port=0):
+    """
+    Start the stub in a daemon thread.
+
+    Returns:
+        (server, base_url); call server.shutdown() when done
+    """
+    server = ThreadingHTTPServer((host, port), OpenLibraryStubHandler)
+    server.payload = load_fixture()
+    server.requests = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f'http://{host}:{server.server_port}'
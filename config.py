@@ -15,6 +15,17 @@ SESSION_COOKIE_HTTPONLY = True
 PERMANENT_SESSION_LIFETIME = timedelta(hours=2)  # Tempo de sessão
 SESSION_PROTECTION = "strong"
 
+# Endpoints /metrics e /metrics/queries: exigem este token (Bearer); sem ele, só em debug
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+# Hash de senhas (app/services/password_hasher.py); calibre o custo com
+# scripts/calibrate_password_hash.py. Hashes antigos são refeitos no login.
+PASSWORD_SCRYPT_N = int(os.getenv('PASSWORD_SCRYPT_N', 2 ** 15))
+PASSWORD_SCRYPT_R = int(os.getenv('PASSWORD_SCRYPT_R', 8))
+PASSWORD_SCRYPT_P = int(os.getenv('PASSWORD_SCRYPT_P', 1))
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))  # processos; 0 = no próprio worker
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv('PASSWORD_HASH_MAX_QUEUE', 16))  # além disso: 503
+
 # Configurações de logging
 LOG_LEVEL = 'INFO'
 LOG_CONFIG = {
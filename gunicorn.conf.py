@@ -0,0 +1,68 @@
+# gunicorn.conf.py
+"""
+Gunicorn settings (loaded automatically from the working directory).
+
+Serving profile (all overridable by environment):
+- GUNICORN_PRELOAD (default on): the app is created and warmed once in the
+  master (app/serving.py) and workers share it copy-on-write; each worker
+  drops the inherited DB pool right after fork
+- WEB_CONCURRENCY / GUNICORN_WORKERS: worker processes (default 2 * CPUs + 1)
+- GUNICORN_WORKER_CLASS (default gthread) and GUNICORN_THREADS (default 4)
+- GUNICORN_TIMEOUT, GUNICORN_MAX_REQUESTS (+ jitter)
+
+benchmarks/load_test.py measures throughput and per-worker memory with
+preload on and off.
+
+Prometheus multiprocess mode (app/services/app_metrics.py): workers write
+their metrics to mmap files in PROMETHEUS_MULTIPROC_DIR, which must be set
+before the app is imported, start empty, and have dead workers' live gauges
+dropped.
+"""
+import gc
+import multiprocessing
+import os
+import shutil
+
+prometheus_multiproc_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', '/tmp/biblioteca-prometheus'
+)
+# Imported up front: child_exit runs from the SIGCHLD handler, which may
+# interrupt another import
+from prometheus_client import multiprocess  # noqa: E402
+
+wsgi_app = 'run:app'
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() in ('1', 'true', 'yes')
+workers = int(os.environ.get('GUNICORN_WORKERS')
+              or os.environ.get('WEB_CONCURRENCY')
+              or multiprocessing.cpu_count() * 2 + 1)
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+# A recycled worker is forked again from the warm master (0 = never)
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+
+def on_starting(server):
+    # Files left by a previous run would be merged into this one's totals
+    shutil.rmtree(prometheus_multiproc_dir, ignore_errors=True)
+    os.makedirs(prometheus_multiproc_dir, exist_ok=True)
+
+
+def when_ready(server):
+    if not server.cfg.preload_app:
+        return
+    from app.serving import warm_app
+    warm_app(server.app.wsgi())
+    # Keeps the cyclic GC from touching (and un-sharing) the master's objects
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        from app.serving import after_fork
+        after_fork(server.app.wsgi())
+
+
+def child_exit(server, worker):
+    multiprocess.mark_process_dead(worker.pid)
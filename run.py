@@ -1,6 +1,9 @@
-from app import app
 import os
 
+from app import create_app
+
+# Entry point: `flask run` (FLASK_APP=run.py) e gunicorn `run:app`
+app = create_app()
+
 if __name__ == '__main__':
     app.run(debug=True, host="0.0.0.0", port=int(os.environ.get("PORT", 8080)))
-
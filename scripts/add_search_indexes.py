@@ -5,6 +5,7 @@ Database migration script to add search indexes safely.
 Adds:
 - idx_book_search on Book(title, author) for autocomplete performance
 - idx_metrics_endpoint_time on APIMetrics(endpoint, timestamp) for analytics
+- idx_user_books_user on UserBooks(user_id, book_id) for collection listing
 
 Run this script to apply indexes to existing database without breaking data.
 """
@@ -75,6 +76,21 @@ def add_indexes():
                 db.session.commit()
                 print("✅ Index 'idx_metrics_endpoint_time' created successfully")
             
+            # Check if idx_user_books_user exists
+            result = db.session.execute(text(
+                "SELECT indexname FROM pg_indexes WHERE indexname = 'idx_user_books_user'"
+            )).fetchone()
+            
+            if result:
+                print("ℹ️  Index 'idx_user_books_user' already exists, skipping")
+            else:
+                print("🔨 Creating index 'idx_user_books_user' on user_books(user_id, book_id)...")
+                db.session.execute(text(
+                    "CREATE INDEX CONCURRENTLY idx_user_books_user ON user_books(user_id, book_id)"
+                ))
+                db.session.commit()
+                print("✅ Index 'idx_user_books_user' created successfully")
+            
             print("\n🎉 Migration completed successfully!")
             return True
             
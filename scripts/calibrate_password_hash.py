@@ -0,0 +1,72 @@
+"""
+Measure scrypt cost parameters on this host and suggest PASSWORD_SCRYPT_*.
+
+For each candidate N (with the given r and p) hashes a password a few times
+and reports the median time and the memory each hash needs (128 * N * r
+bytes). The suggestion is the largest N whose median stays under the target:
+slow enough to resist guessing, fast enough that a login holds a pool
+process for only that long.
+
+Run with:
+    python scripts/calibrate_password_hash.py [--target-ms 50] [--r 8] [--p 1]
+
+Raising N later is safe: existing hashes keep verifying and are rehashed
+with the new parameters on each user's next login.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from werkzeug.security import generate_password_hash
+
+
+def measure(n, r, p, rounds):
+    method = f'scrypt:{n}:{r}:{p}'
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        generate_password_hash('Calibrate-Password-1', method, 16)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def run_calibration():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--target-ms', type=float, default=50.0, help='Hash time budget per login')
+    parser.add_argument('--r', type=int, default=8)
+    parser.add_argument('--p', type=int, default=1)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--max-log2n', type=int, default=18)
+    args = parser.parse_args()
+
+    print(f'{"N":>8} {"memory":>9} {"median":>10}')
+    best = None
+    for log2n in range(12, args.max_log2n + 1):
+        n = 2 ** log2n
+        median_ms = measure(n, args.r, args.p, args.rounds)
+        memory_mb = 128 * n * args.r / 2 ** 20
+        print(f'{n:>8} {memory_mb:>7.0f}MB {median_ms:>8.1f}ms')
+        if median_ms <= args.target_ms:
+            best = n
+        else:
+            break
+
+    if best is None:
+        print(f'\nEven N=4096 exceeds {args.target_ms:.0f}ms; raise the target or lower r.')
+        return
+    print(f'\nSuggested environment (target {args.target_ms:.0f}ms, read by config.py):')
+    print(f'PASSWORD_SCRYPT_N={best}')
+    print(f'PASSWORD_SCRYPT_R={args.r}')
+    print(f'PASSWORD_SCRYPT_P={args.p}')
+    print(f'PASSWORD_HASH_WORKERS={max(1, (os.cpu_count() or 2) // 2)}  # pool processes')
+
+
+if __name__ == '__main__':
+    run_calibration()
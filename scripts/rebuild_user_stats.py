@@ -0,0 +1,43 @@
+"""
+Create the user stats tables and (re)build every user's statistics.
+
+Stats are kept up to date incrementally and users without a row are seeded
+on first access; running this once after deploy avoids those one-off
+aggregations, and running it again repairs any drift (e.g. rows changed by
+hand in the database).
+
+Run with:
+    python scripts/rebuild_user_stats.py
+"""
+
+import os
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app import create_app, db
+from app.models.modelsdb import User, UserBooks, UserGenreCount, UserStats
+from app.services.user_stats import seed_user_stats
+
+
+def run_migration():
+    app = create_app()
+    with app.app_context():
+        UserStats.__table__.create(db.engine, checkfirst=True)
+        UserGenreCount.__table__.create(db.engine, checkfirst=True)
+        for index in UserBooks.__table__.indexes:
+            if index.name == 'idx_user_books_acquired':
+                index.create(db.engine, checkfirst=True)
+
+        user_ids = db.session.execute(db.select(User.id).order_by(User.id)).scalars().all()
+        for user_id in user_ids:
+            # One transaction per user keeps the row locks short
+            seed_user_stats(db.session.connection(), user_id, replace=True)
+            db.session.commit()
+        print(f'Rebuild completed. {len(user_ids)} user(s) processed.')
+
+
+if __name__ == '__main__':
+    run_migration()
@@ -0,0 +1,38 @@
+"""
+Roll up APIMetrics into per-minute/per-hour rows and prune expired data.
+
+Incremental and safe to re-run; schedule it every few minutes (cron,
+Cloud Scheduler, ...). The first run creates the api_metrics_rollups table
+and works through the whole existing backlog.
+
+Run with:
+    python scripts/rollup_metrics.py
+"""
+
+import os
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app import create_app, db
+from app.models.modelsdb import APIMetricsRollup
+from app.services.metrics_rollup import get_metrics_rollup
+
+
+def run_rollup():
+    app = create_app()
+    with app.app_context():
+        APIMetricsRollup.__table__.create(db.engine, checkfirst=True)
+        result = get_metrics_rollup().run()
+        print(
+            f"Rollup completed. {result['minute_rollups']} minute and "
+            f"{result['hour_rollups']} hour bucket(s) written; deleted "
+            f"{result['raw_deleted']} raw row(s), {result['minute_deleted']} minute and "
+            f"{result['hour_deleted']} hour rollup(s)."
+        )
+
+
+if __name__ == '__main__':
+    run_rollup()
@@ -0,0 +1,55 @@
+"""
+Create the book_code_counters table and seed one counter per shelf-code prefix.
+
+Counters are also seeded lazily on the first registration of each prefix;
+running this once after deploy avoids that one-off scan of the books table.
+
+Run with:
+    python scripts/seed_code_counters.py
+"""
+
+import os
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app import create_app, db
+from app.models.code_book import split_book_code
+from app.models.modelsdb import Book, BookCodeCounter
+
+
+def run_migration():
+    app = create_app()
+    with app.app_context():
+        BookCodeCounter.__table__.create(db.engine, checkfirst=True)
+
+        last_suffix = {}
+        codes = db.session.execute(
+            db.select(Book.code).execution_options(yield_per=5000)
+        ).scalars()
+        for code in codes:
+            base_code, suffix = split_book_code(code)
+            last_suffix[base_code] = max(last_suffix.get(base_code, -1), suffix)
+
+        counters = {
+            counter.prefix: counter
+            for counter in db.session.query(BookCodeCounter).all()
+        }
+        created = updated = 0
+        for base_code, suffix in last_suffix.items():
+            counter = counters.get(base_code)
+            if counter is None:
+                db.session.add(BookCodeCounter(prefix=base_code, last_suffix=suffix))
+                created += 1
+            elif counter.last_suffix < suffix:
+                counter.last_suffix = suffix
+                updated += 1
+
+        db.session.commit()
+        print(f'Seeding completed. {created} counter(s) created, {updated} raised.')
+
+
+if __name__ == '__main__':
+    run_migration()
@@ -1,5 +1,9 @@
 import pytest
+from sqlalchemy import event
+
 from app import create_app, db
+from app.models.modelsdb import User
+
 
 @pytest.fixture(scope='module')
 def test_client():
@@ -7,6 +11,7 @@ def test_client():
     flask_app.config['TESTING'] = True
     flask_app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
     flask_app.config['WTF_CSRF_ENABLED'] = False
+    flask_app.config['STRICT_LOADING'] = True
 
     with flask_app.test_client() as testing_client:
         with flask_app.app_context():
@@ -15,3 +20,50 @@ def test_client():
             db.session.remove()
             db.drop_all()
 
+
+@pytest.fixture
+def app():
+    """A fresh app and schema per test, with no app context pushed.
+
+    Requests made through its test client each get their own context (and
+    flask-login user), as under a real server.
+    """
+    flask_app = create_app()
+    flask_app.config.update(TESTING=True)
+    with flask_app.app_context():
+        db.create_all()
+    yield flask_app
+    with flask_app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def app_context(app):
+    """`app` with its app context pushed for the whole test."""
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture
+def user_id(app_context):
+    """Id of a saved user, 'leitora'."""
+    user = User(username='leitora', name='Leitora', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+@pytest.fixture
+def statements(app):
+    """SQL statements the app's engine executes during the test, in order."""
+    with app.app_context():
+        engine = db.engine
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    yield executed
+    event.remove(engine, 'before_cursor_execute', record)
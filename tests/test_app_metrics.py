@@ -0,0 +1,26 @@
+from app.services.app_metrics import LATENCY_BUCKETS, log_linear_buckets, record_cache
+
+
+def test_log_linear_buckets_have_constant_relative_width():
+    buckets = log_linear_buckets(0.001, 1, per_decade=10)
+
+    assert buckets[0] == 0.001 and buckets[-1] == 1.0
+    assert len(buckets) == 31
+    assert all(1.2 < b / a < 1.32 for a, b in zip(buckets, buckets[1:]))
+    assert LATENCY_BUCKETS[-1] <= 30
+
+
+def test_metrics_endpoint_exports_request_histograms_and_cache_counters(test_client):
+    test_client.application.config['METRICS_TOKEN'] = 's3cret'
+    test_client.get('/login')
+    record_cache('openlibrary_search', 'hit')
+
+    assert test_client.get('/metrics').status_code == 401
+    response = test_client.get('/metrics', headers={'Authorization': 'Bearer s3cret'})
+
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain')
+    body = response.get_data(as_text=True)
+    assert 'http_request_duration_seconds_bucket{endpoint="auth.login",le="0.001",method="GET",status="2xx"}' in body
+    assert 'cache_requests_total{cache="openlibrary_search",result="hit"}' in body
+    assert 'http_request_db_statements_count{endpoint="auth.login"}' in body
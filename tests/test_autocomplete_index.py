@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+
+from app.services.autocomplete_index import AutocompleteIndex, UserCollectionIndex
+
+
+def _row(book_id, title, author, isbn=None):
+    return SimpleNamespace(
+        id=book_id, title=title, author=author, cover_url=None, genre='General',
+        publication_year=2000, publisher='Pub', pages=100, isbn=isbn,
+        country_of_origin=None, original_language=None
+    )
+
+
+def _index(*rows):
+    index = UserCollectionIndex()
+    for row in rows:
+        index.add(row.id, AutocompleteIndex.entry_from_book(row))
+    return index
+
+
+def test_prefix_search_is_accent_and_case_insensitive():
+    index = _index(
+        _row(1, 'Dom Casmurro', 'Machado de Assis'),
+        _row(2, 'Memórias Póstumas de Brás Cubas', 'Machado de Assis'),
+        _row(3, 'O Cortiço', 'Aluísio Azevedo'),
+    )
+
+    assert [e['title'] for e in index.search('MEMO')] == ['Memórias Póstumas de Brás Cubas']
+    assert len(index.search('machado')) == 2
+    assert [e['title'] for e in index.search('aluisio')] == ['O Cortiço']
+    # Prefix only: "casmurro" is inside the title, not at its start
+    assert index.search('casmurro') == []
+
+
+def test_isbn_substring_and_incremental_updates():
+    index = _index(_row(1, 'Dom Casmurro', 'Machado de Assis', isbn='9788535910667'))
+    assert [e['title'] for e in index.search('978-85359')] == ['Dom Casmurro']
+
+    index.add(2, AutocompleteIndex.entry_from_book(_row(2, 'Dona Flor', 'Jorge Amado')))
+    assert [e['title'] for e in index.search('do')] == ['Dom Casmurro', 'Dona Flor']
+
+    index.remove(1)
+    assert [e['title'] for e in index.search('do')] == ['Dona Flor']
+
+
+def test_registry_evicts_least_recently_used_users_over_cap():
+    collections = {
+        1: [_row(1, 'Alpha', 'Ann'), _row(2, 'Beta', 'Bob')],
+        2: [_row(3, 'Gamma', 'Gil'), _row(4, 'Delta', 'Dan')],
+    }
+    registry = AutocompleteIndex(max_entries=3)
+    registry._load_rows = lambda user_id: collections[user_id]
+
+    assert registry.search(1, 'al')[0]['title'] == 'Alpha'
+    assert registry.search(2, 'ga')[0]['title'] == 'Gamma'
+
+    stats = registry.stats()
+    assert stats['users'] == 1
+    assert stats['entries'] <= 3
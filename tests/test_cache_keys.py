@@ -0,0 +1,75 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app import cache, create_app
+from app.services.autocomplete_index import AutocompleteIndex
+from app.utils.cache_keys import bump_user_cache_version, get_user_cache_version, user_cache_key
+
+
+def _row(book_id, title):
+    return SimpleNamespace(
+        id=book_id, title=title, author='Machado de Assis', cover_url=None, genre='General',
+        publication_year=1900, publisher='Pub', pages=100, isbn=None,
+        country_of_origin=None, original_language=None
+    )
+
+
+@pytest.fixture
+def app_context():
+    app = create_app()
+    # Under the default NullCache every version is 0
+    cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache'})
+    with app.app_context():
+        yield
+
+
+@pytest.fixture
+def registry():
+    collections = {1: [_row(1, 'Dom Casmurro')], 2: [_row(2, 'Helena')]}
+    registry = AutocompleteIndex()
+    registry.builds = []
+
+    def load_rows(user_id):
+        registry.builds.append(user_id)
+        return list(collections[user_id])
+
+    registry._load_rows = load_rows
+    registry.collections = collections
+    return registry
+
+
+def test_bump_invalidates_only_that_users_keys_and_index(app_context, registry):
+    key_a, key_b = user_cache_key('collection', 1, 'p1'), user_cache_key('collection', 2, 'p1')
+    registry.search(1, 'dom')
+    registry.search(2, 'hel')
+
+    new_version = bump_user_cache_version(1)
+
+    assert new_version == get_user_cache_version(1)
+    assert user_cache_key('collection', 1, 'p1') == f'collection:u1:v{new_version}:p1'
+    assert user_cache_key('collection', 1, 'p1') != key_a
+    assert user_cache_key('collection', 2, 'p1') == key_b
+
+    registry.search(1, 'dom')
+    registry.search(2, 'hel')
+    assert registry.builds == [1, 2, 1]  # user 2's index is still valid
+
+
+def test_index_adopts_only_the_next_version(app_context, registry):
+    registry.search(1, 'dom')
+
+    # This worker's write: the bump it made is exactly one ahead, so the
+    # incrementally updated index stays valid
+    registry.collections[1].append(_row(3, 'Dom Pedro'))
+    registry.add_book(1, _row(3, 'Dom Pedro'), version=bump_user_cache_version(1))
+    assert [e['title'] for e in registry.search(1, 'dom')] == ['Dom Casmurro', 'Dom Pedro']
+    assert registry.builds == [1]
+
+    # Another worker wrote in between (skipped version): the index may be
+    # missing that write, so the next query rebuilds it
+    bump_user_cache_version(1)
+    registry.collections[1].append(_row(4, 'Dom Quixote'))
+    registry.add_book(1, _row(4, 'Dom Quixote'), version=bump_user_cache_version(1))
+    assert len(registry.search(1, 'dom')) == 3
+    assert registry.builds == [1, 1]
@@ -0,0 +1,35 @@
+import pytest
+
+from app import create_app, db
+
+
+@pytest.fixture
+def app():
+    app = create_app()
+    app.config.update(TESTING=True)
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+def test_schema_check_and_create(app):
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(args=['schema', 'check'])
+    assert result.exit_code == 1
+    assert 'Tabelas ausentes:' in result.output
+    assert 'users' in result.output and 'user_books' in result.output
+
+    result = runner.invoke(args=['schema', 'create', '--wait', '--retries', '1'])
+    assert result.exit_code == 0, result.output
+    assert 'tabela(s) criada(s): ' in result.output
+
+    result = runner.invoke(args=['schema', 'check'])
+    assert result.exit_code == 0
+    assert result.output.strip() == 'Schema ok.'
+
+    # Idempotent: a second run creates nothing
+    result = runner.invoke(args=['schema', 'create'])
+    assert result.exit_code == 0
+    assert 'Schema ok; 0 tabela(s) criada(s).' in result.output
@@ -0,0 +1,38 @@
+from app import db
+from app.models.code_book import (
+    allocate_book_codes, book_code_prefix, generate_book_code, reserve_book_codes
+)
+from app.models.modelsdb import Book, BookCodeCounter
+
+
+def _book(code):
+    return Book(code=code, title='Dom Casmurro', author='Machado de Assis',
+                publisher='Garnier', publication_year=1900, pages=100, genre='Romance')
+
+
+def test_counters_are_seeded_from_existing_codes(test_client):
+    db.session.add_all([_book('A005d'), _book('A005d.004')])
+    db.session.commit()
+
+    assert generate_book_code('romance', 'Machado de Assis', 'Dom') == 'A005d.005'
+    assert reserve_book_codes('A005d', 2) == ['A005d.006', 'A005d.007']
+    assert db.session.get(BookCodeCounter, 'A005d').last_suffix == 7
+    db.session.rollback()
+
+
+def test_bulk_allocation_keeps_input_order(test_client):
+    base_codes = ['B140q', 'C140q', 'B140q', 'B140q']
+
+    assert allocate_book_codes(base_codes) == ['B140q', 'C140q', 'B140q.001', 'B140q.002']
+    assert allocate_book_codes(['C140q']) == ['C140q.001']
+    db.session.rollback()
+
+
+def test_unknown_genres_use_fallback_prefix(test_client):
+    assert generate_book_code('Not A Genre', 'Jane Doe', 'Book') is None
+    assert book_code_prefix('Not A Genre', 'Jane Doe', 'Book') == 'D000b'
+
+
+def test_blank_genre_uses_fallback_prefix(test_client):
+    assert generate_book_code('', 'Autora', 'Livro') is None
+    assert book_code_prefix('', 'Autora', 'Livro') == 'A000l'
@@ -0,0 +1,42 @@
+import csv
+import gzip
+import io
+import json
+
+from app.services.collection_export import EXPORT_COLUMNS, gzip_stream, iter_csv, iter_ndjson
+from app.services.collection_import import ImportResult, parse_collection_csv
+
+
+def _records(count):
+    for i in range(count):
+        record = dict.fromkeys(EXPORT_COLUMNS, None)
+        record.update(
+            title=f'Livro {i:04d}', author='Machado de Assis', publisher='Garnier',
+            publication_year=1900, pages=100, genre='Romance', status='available',
+            read_status='unread', format='physical', openlibrary_key=''
+        )
+        yield record
+
+
+def test_csv_stream_is_chunked_and_round_trips_through_import():
+    chunks = list(iter_csv(_records(450), rows_per_chunk=200))
+
+    assert len(chunks) == 3
+    result = ImportResult()
+    parsed = parse_collection_csv(''.join(chunks), result)
+    assert result.errors == []
+    assert len(parsed) == 450
+    assert parsed[0][1]['title'] == 'Livro 0000'
+
+
+def test_gzipped_ndjson_stream_decompresses_to_one_object_per_line():
+    body = b''.join(gzip_stream(iter_ndjson(_records(5), rows_per_chunk=2)))
+
+    lines = gzip.decompress(body).decode('utf-8').splitlines()
+    assert [json.loads(line)['title'] for line in lines] == [f'Livro {i:04d}' for i in range(5)]
+    assert list(json.loads(lines[0])) == EXPORT_COLUMNS
+
+
+def test_csv_stream_header_matches_export_columns():
+    header = next(csv.reader(io.StringIO(next(iter_csv(iter(()))))))
+    assert header == EXPORT_COLUMNS
@@ -0,0 +1,67 @@
+import pytest
+
+from app import db
+from app.models.code_book import book_code_prefix, split_book_code
+from app.models.modelsdb import Book, UserBooks
+from app.services import collection_import
+from app.services.collection_import import import_collection_csv
+from app.services.user_stats import get_user_stats
+
+HEADER = 'title,author,publisher,publication_year,pages,genre\n'
+
+
+def _csv(titles):
+    return HEADER + ''.join(f'{title},Machado de Assis,Garnier,1899,200,Romance\n' for title in titles)
+
+
+def test_bad_row_is_reported_and_the_rest_of_its_batch_imported(user_id, monkeypatch):
+    db.session.add(Book(code='TAKEN', title='Outro', author='Autora', publisher='Editora',
+                        publication_year=1990, pages=10, genre='Romance'))
+    db.session.commit()
+    allocate = collection_import.allocate_book_codes
+
+    def allocate_with_collision(base_codes):
+        codes = allocate(base_codes)
+        codes[1] = 'TAKEN'  # second valid row clashes with an existing shelf code
+        return codes
+
+    monkeypatch.setattr(collection_import, 'allocate_book_codes', allocate_with_collision)
+    # Line 4 fails validation; line 3 fails at the database inside the first batch
+    content = _csv(['Dom Casmurro', 'Helena', '']) + _csv(['Iaiá Garcia', 'Esaú e Jacó'])[len(HEADER):]
+
+    result = import_collection_csv(user_id, content, batch_size=2)
+    db.session.commit()
+
+    assert result.imported == 3
+    errors = dict(result.errors)
+    assert sorted(errors) == [3, 4]
+    assert 'UNIQUE' in errors[3].upper()
+    assert errors[4] == 'title and author are required'
+    assert sorted(book.title for book in result.books) == ['Dom Casmurro', 'Esaú e Jacó', 'Iaiá Garcia']
+    assert UserBooks.query.filter_by(user_id=user_id).count() == 3
+    # The failed batch's stats delta was rolled back with its savepoint
+    assert get_user_stats(user_id).book_count == 3
+
+
+def test_duplicate_prefixes_get_consecutive_suffixes(user_id):
+    prefix = book_code_prefix('Romance', 'Machado de Assis', 'Dom Casmurro')
+
+    first = import_collection_csv(user_id, _csv(['Dom Casmurro', 'Diva', 'Dom Quixote']), batch_size=2)
+    second = import_collection_csv(user_id, _csv(['Dona Flor']))
+    db.session.commit()
+
+    codes = [split_book_code(book.code) for book in first.books + second.books]
+    assert {base for base, _ in codes} == {prefix}
+    suffixes = [suffix for _, suffix in codes]
+    assert suffixes == list(range(suffixes[0], suffixes[0] + 4))
+
+
+@pytest.mark.parametrize('rows, batches', [(2, 1), (3, 1), (4, 2), (7, 3)])
+def test_rows_are_inserted_in_batch_size_chunks(user_id, statements, rows, batches):
+    result = import_collection_csv(user_id, _csv([f'Livro {i}' for i in range(rows)]), batch_size=3)
+    db.session.commit()
+
+    assert result.imported == rows
+    book_inserts = [sql for sql in statements if sql.startswith('INSERT INTO books')]
+    assert len(book_inserts) == batches
+    assert Book.query.count() == rows
@@ -0,0 +1,81 @@
+import base64
+
+import pytest
+
+from app import db
+from app.models.modelsdb import Book, UserBooks
+from app.services.collection_service import decode_cursor, encode_cursor, paginate_collection
+
+# Duplicate titles: the (title, id) tie-break must keep every Beta exactly once
+TITLES = ['Beta', 'Alfa', 'Beta', 'Gama', 'Beta', 'Delta', 'Zeta']
+
+
+def _book(i, title):
+    return Book(code=f'S{i}', title=title, author='Autora', publisher='Editora',
+                publication_year=1990, pages=100, genre='Romance')
+
+
+@pytest.fixture(autouse=True)
+def collection(user_id):
+    db.session.add_all(
+        UserBooks(user_id=user_id, book=_book(i, title)) for i, title in enumerate(TITLES)
+    )
+    db.session.commit()
+
+
+def _titles_and_ids(page):
+    return [(book.title, book.id) for _, book in page.items]
+
+
+def _expected_pages():
+    ordered = sorted((title, book_id) for book_id, title in enumerate(TITLES, start=1))
+    return [ordered[i:i + 2] for i in range(0, len(ordered), 2)]
+
+
+def test_next_and_prev_walk_the_title_order_across_duplicates(user_id):
+    expected = _expected_pages()
+
+    pages = [paginate_collection(user_id, per_page=2)]
+    while pages[-1].has_next:
+        pages.append(paginate_collection(user_id, cursor=pages[-1].next_cursor, per_page=2))
+
+    assert [_titles_and_ids(page) for page in pages] == expected
+    assert [page.page for page in pages] == [1, 2, 3, 4]
+    assert not pages[0].has_prev
+    assert not pages[-1].has_next
+    assert pages[-1].pages == 4
+
+    back = [pages[-1]]
+    while back[-1].has_prev:
+        back.append(paginate_collection(user_id, cursor=back[-1].prev_cursor, per_page=2))
+
+    assert [_titles_and_ids(page) for page in back] == expected[::-1]
+    assert [page.page for page in back] == [4, 3, 2, 1]
+    # Back on page 1: same links as a fresh first page
+    assert back[-1].has_next and not back[-1].has_prev
+
+
+def test_last_page_has_no_next_when_it_is_exactly_full(user_id):
+    first = paginate_collection(user_id, per_page=4)
+    last = paginate_collection(user_id, cursor=first.next_cursor, per_page=4)
+
+    assert len(last.items) == 3
+    assert not last.has_next
+    assert paginate_collection(user_id, per_page=7).has_next is False
+
+
+@pytest.mark.parametrize('cursor', [
+    'garbage!',
+    encode_cursor('Beta', 3, 'next', 2)[:-4],  # truncated
+    encode_cursor('Beta', 3, 'sideways', 2),
+    base64.urlsafe_b64encode(b'{"title": "Beta"}').decode(),
+    base64.urlsafe_b64encode(b'["Beta", "not-an-id", "next", 2]').decode(),
+])
+def test_invalid_cursors_fall_back_to_page_one(user_id, cursor):
+    assert decode_cursor(cursor) is None
+
+    page = paginate_collection(user_id, cursor=cursor, per_page=2)
+
+    assert page.page == 1
+    assert _titles_and_ids(page) == _expected_pages()[0]
+    assert not page.has_prev
@@ -0,0 +1,99 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from app.services.http_client import HTTPClient
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """Answers `script` statuses in order (then 200); /slow sleeps before answering."""
+    protocol_version = 'HTTP/1.1'  # Keep-alive, so pooled connections are reused
+
+    def do_GET(self):
+        self.server.requests += 1
+        if self.path.startswith('/slow'):
+            time.sleep(0.5)
+        status, retry_after = self.server.script.pop(0) if self.server.script else (200, None)
+        self.send_response(status)
+        if retry_after is not None:
+            self.send_header('Retry-After', str(retry_after))
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def upstream():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FlakyHandler)
+    server.requests = 0
+    server.script = []
+    server.url = f'http://127.0.0.1:{server.server_port}'
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client():
+    client = HTTPClient(backoff_factor=0, max_retry_after=0.1,
+                        timeouts={'default': (1, 0.2), 'openlibrary_search': (1, 0.2)})
+    yield client
+    client.close()
+
+
+def test_pool_counts_hits_and_misses(client, upstream):
+    for _ in range(3):
+        assert client.get(f'{upstream.url}/ok').status_code == 200
+
+    assert client.stats() == {'pool_hits': 2, 'pool_misses': 1, 'requests': 3}
+
+
+def test_default_policy_retries_listed_statuses_and_caps_retry_after(client, upstream):
+    upstream.script = [(503, None), (429, 30)]
+
+    start = time.monotonic()
+    response = client.get(f'{upstream.url}/isbn', endpoint='openlibrary_isbn')
+
+    assert response.status_code == 200
+    assert upstream.requests == 3
+    assert time.monotonic() - start < 1.0  # Retry-After: 30 capped to 0.1s
+
+    upstream.script = [(404, None)]
+    assert client.get(f'{upstream.url}/isbn').status_code == 404
+    assert upstream.requests == 4  # not in RETRY_STATUSES
+
+
+def test_interactive_policy_never_retries_reads_or_statuses(client, upstream):
+    upstream.script = [(503, None)]
+    assert client.get(f'{upstream.url}/search', endpoint='openlibrary_search').status_code == 503
+    assert upstream.requests == 1
+
+    with pytest.raises(requests.ConnectionError):
+        client.get(f'{upstream.url}/slow', endpoint='openlibrary_search')
+    assert upstream.requests == 2
+
+    # The default policy retries the same read timeout twice
+    with pytest.raises(requests.ConnectionError):
+        client.get(f'{upstream.url}/slow')
+    assert upstream.requests == 5
+
+
+def test_timeouts_and_bounds_are_selected_per_endpoint():
+    client = HTTPClient(timeouts={'amazon': (1, 2)})
+
+    assert client.timeout_for('openlibrary_search') == (3.05, 5)
+    assert client.timeout_for('amazon') == (1, 2)
+    assert client.timeout_for('unknown') == (3.05, 10)
+    assert client.retry_for('openlibrary_author').read == 0
+    # Interactive: one full attempt plus one connect retry
+    assert client.max_duration('openlibrary_search') == pytest.approx(3.05 + 5 + 3.05)
+    # Default: three full attempts plus the capped Retry-After sleeps
+    assert client.max_duration('openlibrary_isbn') == pytest.approx(3 * 13.05 + 2 * 2.0)
@@ -0,0 +1,40 @@
+import json
+import os
+
+import pytest
+
+from app.utils.json_stream import iter_json_array
+
+FIXTURE = os.path.join(os.path.dirname(__file__), '..', 'search.json')
+
+
+def _chunks(body, size):
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 4096, 1 << 20])
+def test_matches_json_loads_for_any_chunking(chunk_size):
+    with open(FIXTURE, 'rb') as f:
+        body = f.read()
+    expected = json.loads(body)['docs']
+
+    assert list(iter_json_array(_chunks(body, chunk_size), 'docs')) == expected
+    assert list(iter_json_array(_chunks(body, chunk_size), 'docs', limit=3)) == expected[:3]
+
+
+def test_stops_reading_after_limit():
+    consumed = []
+
+    def chunks():
+        for chunk in (b'{"docs": [{"a": 1}, ', b'{"a": 2}, ', b'{"a": 3}]}'):
+            consumed.append(chunk)
+            yield chunk
+
+    assert list(iter_json_array(chunks(), 'docs', limit=1)) == [{'a': 1}]
+    assert len(consumed) == 1
+
+
+def test_numbers_split_across_chunks_and_truncated_bodies():
+    assert list(iter_json_array([b'{"docs":[1,2', b'3,4]}'], 'docs')) == [1, 23, 4]
+    with pytest.raises(ValueError):
+        list(iter_json_array([b'{"docs": [{"a": 1}, {"b"'], 'docs'))
@@ -0,0 +1,61 @@
+import re
+
+import pytest
+
+from app import db
+from app.models.loading import LazyLoadError
+from app.models.modelsdb import Book, User, UserBooks
+
+
+@pytest.fixture
+def strict_app(app):
+    # `app` pushes no app context, so each request gets a fresh session and
+    # current_user, as under a real server
+    app.config.update(STRICT_LOADING=True, QUERY_STATS_HEADER=True, SESSION_PROTECTION=None)
+    return app
+
+
+def _add_books(app, user_id, start, count):
+    with app.app_context():
+        for i in range(start, start + count):
+            book = Book(code=f'L{i:05d}', title=f'Livro {i:05d}', author='Autora',
+                        publisher='Editora', publication_year=1990, pages=100, genre='Romance')
+            db.session.add(UserBooks(user_id=user_id, book=book))
+        db.session.commit()
+
+
+def _query_count(client, path):
+    response = client.get(path)
+    assert response.status_code == 200, path
+    return int(re.search(r'desc="(\d+) queries"', response.headers['Server-Timing']).group(1))
+
+
+def test_page_query_counts_do_not_grow_with_the_collection(strict_app):
+    with strict_app.app_context():
+        user = User(username='leitora', name='Leitora', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+    _add_books(strict_app, user_id, 0, 3)
+
+    client = strict_app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+    pages = ['/', '/your_collection', '/view_book/1']
+    client.get('/')  # Caches the session user snapshot
+    before = {path: _query_count(client, path) for path in pages}
+    _add_books(strict_app, user_id, 3, 25)
+    after = {path: _query_count(client, path) for path in pages}
+
+    assert before == after
+
+
+def test_strict_loading_rejects_lazy_loads_in_requests(strict_app):
+    _add_books(strict_app, 1, 0, 1)
+
+    with strict_app.test_request_context('/'):
+        user_book = UserBooks.query.first()
+        with pytest.raises(LazyLoadError, match='UserBooks.book'):
+            user_book.book
@@ -0,0 +1,125 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.services.metadata_service import MetadataService
+
+
+class FakeOpenLibraryHandler(BaseHTTPRequestHandler):
+    """Local stand-in for openlibrary.org; `delay` simulates a slow upstream."""
+    delay = 0.0
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        if self.path.startswith('/isbn/'):
+            payload = {'title': 'Dom Casmurro', 'works': [{'key': '/works/OL1W'}]}
+        elif self.path.startswith('/works/'):
+            payload = {'authors': [
+                {'author': {'key': f'/authors/OL{i % 5}A'}} for i in range(7)
+            ]}
+        elif self.path.startswith('/authors/'):
+            time.sleep(0.3)
+            self.server.author_requests += 1
+            payload = {'name': f"Author {self.path.split('/')[2].removesuffix('.json')}"}
+        else:
+            payload = {'docs': [
+                {'key': '/works/OL1W', 'title': 'Dom Casmurro',
+                 'author_name': ['Machado de Assis'], 'isbn': ['9788535910667']},
+                {'key': '/works/OL2W', 'title': 'Quincas Borba',
+                 'author_name': ['Machado de Assis'], 'isbn': ['9788535910668']},
+            ]}
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_openlibrary():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeOpenLibraryHandler)
+    server.author_requests = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    FakeOpenLibraryHandler.delay = 0.0
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def service(fake_openlibrary):
+    service = MetadataService()
+    service.OPENLIBRARY_BASE_URL = f'http://127.0.0.1:{fake_openlibrary.server_port}'
+    service.SOURCE_DEADLINES = {'openlibrary': 1.0, 'google_books': 1.0,
+                                'worldcat': 1.0, 'isbndb': 1.0}
+    yield service
+    service._executor.shutdown(wait=True)
+    service._author_executor.shutdown(wait=True)
+
+
+def test_sources_run_concurrently(service):
+    FakeOpenLibraryHandler.delay = 0.4
+
+    def slow_source(query, limit):
+        time.sleep(0.4)
+        return []
+
+    service.search_google_books = slow_source
+    service.search_worldcat = slow_source
+
+    start = time.monotonic()
+    results = service.search_all_sources('machado')
+    elapsed = time.monotonic() - start
+
+    assert len(results['openlibrary']) == 2
+    assert elapsed < 1.0  # ~0.4s in parallel, 1.2s if run one after another
+
+
+def test_slow_source_returns_partial_results(service):
+    FakeOpenLibraryHandler.delay = 1.0
+    service.SOURCE_DEADLINES = dict(service.SOURCE_DEADLINES, openlibrary=0.3)
+    service.search_google_books = lambda query, limit: [
+        {'title': 'Dom Casmurro', 'isbn': '9788535910667', 'source': 'google_books'}
+    ]
+
+    start = time.monotonic()
+    results = service.search_all_sources('machado')
+
+    assert time.monotonic() - start < 0.8
+    assert results['openlibrary'] == []
+    assert results['google_books'][0]['source'] == 'google_books'
+
+
+def test_merged_results_are_deduplicated_by_isbn(service):
+    service.search_google_books = lambda query, limit: [
+        {'title': 'Dom Casmurro', 'isbn': '978-85-359-1066-7',
+         'description': 'Bentinho e Capitu', 'source': 'google_books'},
+        {'title': 'Helena', 'isbn': None, 'source': 'google_books'},
+    ]
+
+    merged = service.search_merged('machado')
+
+    assert [book['title'] for book in merged] == ['Dom Casmurro', 'Quincas Borba', 'Helena']
+    assert merged[0]['source'] == 'openlibrary'
+    assert merged[0]['description'] == 'Bentinho e Capitu'
+
+
+def test_author_names_are_deduplicated_fetched_concurrently_and_cached(service, fake_openlibrary):
+    start = time.monotonic()
+    book = service.get_book_by_isbn('9788535910667')
+
+    # Seven author entries, five distinct keys, fetched in one parallel wave
+    assert book['author'] == ', '.join(f'Author OL{i}A' for i in range(5))
+    assert fake_openlibrary.author_requests == 5
+    assert time.monotonic() - start < 0.55  # one 0.3s author round trip, not two
+
+    service.get_book_by_isbn('9788535910667')
+    assert fake_openlibrary.author_requests == 5
@@ -0,0 +1,82 @@
+import time
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.pool import StaticPool
+
+from app.models.modelsdb import APIMetrics
+from app.services.metrics_recorder import MetricsRecorder
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine('sqlite://', poolclass=StaticPool,
+                           connect_args={'check_same_thread': False})
+    APIMetrics.__table__.create(engine)
+    yield engine
+    engine.dispose()
+
+
+def make_recorder(engine, **kwargs):
+    recorder = MetricsRecorder(**kwargs)
+    recorder._engine = engine  # normally bound from db.engine on first record()
+    return recorder
+
+
+def stored(engine):
+    with engine.connect() as connection:
+        return connection.execute(select(func.count()).select_from(APIMetrics.__table__)).scalar()
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and not condition():
+        time.sleep(0.02)
+    return condition()
+
+
+def test_full_batch_is_flushed_without_waiting_for_the_interval(engine):
+    recorder = make_recorder(engine, flush_size=3, flush_interval=60)
+    try:
+        for i in range(2):
+            recorder.record('search', 10.0, query=f'q{i}')
+        time.sleep(0.1)
+        assert stored(engine) == 0
+
+        recorder.record('search', 10.0, query='q2')
+        assert wait_for(lambda: stored(engine) == 3)
+    finally:
+        recorder.stop()
+
+
+def test_partial_batch_is_flushed_after_the_interval(engine):
+    recorder = make_recorder(engine, flush_size=100, flush_interval=0.2)
+    try:
+        recorder.record('isbn', 5.0, cache_hit=True)
+        assert wait_for(lambda: stored(engine) == 1)
+        assert recorder.stats()['flushed'] == 1
+    finally:
+        recorder.stop()
+
+
+def test_samples_beyond_the_buffer_are_dropped_and_counted(engine):
+    recorder = make_recorder(engine, flush_size=100, flush_interval=60, max_buffer=2)
+    try:
+        for i in range(5):
+            recorder.record('search', 1.0, query=f'q{i}')
+
+        assert recorder.stats() == {'pending': 2, 'flushed': 0, 'dropped': 3, 'failed_flushes': 0}
+    finally:
+        recorder.stop()
+    assert stored(engine) == 2
+
+
+def test_stop_flushes_the_remainder(engine):
+    recorder = make_recorder(engine, flush_size=100, flush_interval=60)
+    for i in range(4):
+        recorder.record('search', 1.0, query=f'q{i}', error_occurred=i == 3)
+
+    recorder.stop()
+
+    assert stored(engine) == 4
+    assert recorder.stats()['pending'] == 0
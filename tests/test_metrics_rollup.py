@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.models.modelsdb import APIMetrics, APIMetricsRollup
+from app.services.metrics_rollup import HOUR, MINUTE, MetricsRollup
+
+
+def test_rollup_aggregates_prunes_and_is_incremental(test_client):
+    start = datetime(2026, 1, 10, 9, 0)
+    samples = []
+    for minute in range(120):
+        for i in range(10):
+            samples.append(APIMetrics(
+                endpoint='openlibrary_search',
+                response_time_ms=100.0 if i < 9 else 2000.0,
+                cache_hit=i < 5, error_occurred=i == 9,
+                timestamp=start + timedelta(minutes=minute, seconds=i),
+            ))
+    db.session.add_all(samples)
+    db.session.commit()
+
+    rollup = MetricsRollup(raw_retention_days=0, settle_seconds=120)
+    now = start + timedelta(hours=2, minutes=1)  # 10:59 not settled yet
+    result = rollup.run(now)
+
+    assert result['minute_rollups'] == 119
+    assert result['hour_rollups'] == 1
+    assert result['raw_deleted'] == 119 * 10
+    assert db.session.query(APIMetrics).count() == 10
+
+    hour = APIMetricsRollup.query.filter_by(resolution=HOUR).one()
+    assert (hour.count, hour.error_count, hour.cache_hit_count) == (600, 60, 300)
+    assert 90 <= hour.p50_ms <= 110
+    assert hour.max_ms == 2000.0
+
+    # Nothing new to do until time moves on; then only the remaining minutes
+    assert rollup.run(now)['minute_rollups'] == 0
+    result = rollup.run(now + timedelta(minutes=5))
+    assert result['minute_rollups'] == 1
+    assert result['hour_rollups'] == 1
+    assert APIMetricsRollup.query.filter_by(resolution=MINUTE).count() == 120
+
+    summary = rollup.summarize(start, HOUR)['openlibrary_search']['summary']
+    assert summary['count'] == 1200
+    assert summary['error_rate'] == 0.1
+    assert summary['cache_hit_ratio'] == 0.5
+    assert 1500 <= summary['p95_ms'] <= 2000
@@ -0,0 +1,202 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from cachelib import SimpleCache
+
+from app.services import openlibrary_service, single_flight
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.openlibrary_service import OpenLibraryService
+
+TITLES = [f'Machado {i:02d}' for i in range(30)] + [f'Macbeth {i:02d}' for i in range(30)]
+
+
+class FakeSearchHandler(BaseHTTPRequestHandler):
+    """
+    Local stand-in for openlibrary.org/search.json.
+
+    `status` simulates outages, `delay` a slow upstream and `trickle` a body
+    sent in small pieces that each arrive well within the read timeout.
+    """
+    status = 200
+    delay = 0.0
+    trickle = 0.0
+
+    def do_GET(self):
+        self.server.search_requests += 1
+        self.server.last_params = parse_qs(urlparse(self.path).query)
+        time.sleep(self.delay)
+        if self.status != 200:
+            self.send_response(self.status)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        params = parse_qs(urlparse(self.path).query)
+        query = params['q'][0].lower()
+        limit = int(params['limit'][0])
+        docs = [
+            {'key': f'/works/OL{i}W', 'title': title, 'author_name': ['Machado de Assis']}
+            for i, title in enumerate(TITLES) if query in title.lower()
+        ]
+        body = json.dumps({'numFound': len(docs), 'docs': docs[:limit]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        if self.trickle:
+            body = body[:-1] + b',"padding":"' + b' ' * 65536 + b'"}'
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if not self.trickle:
+            self.wfile.write(body)
+            return
+        try:
+            for start in range(0, len(body), 2048):
+                self.wfile.write(body[start:start + 2048])
+                self.wfile.flush()
+                time.sleep(self.trickle)
+        except OSError:
+            pass  # The client gave up
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_search():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeSearchHandler)
+    server.search_requests = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    FakeSearchHandler.status = 200
+    FakeSearchHandler.delay = 0.0
+    FakeSearchHandler.trickle = 0.0
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def service(test_client, fake_search, monkeypatch):
+    backend = SimpleCache()
+    monkeypatch.setattr(openlibrary_service, 'cache', backend)
+    monkeypatch.setattr(single_flight, 'cache', backend)
+    service = OpenLibraryService()
+    monkeypatch.setattr(service, '_save_metrics', lambda **kwargs: None)
+    service.BASE_URL = f'http://127.0.0.1:{fake_search.server_port}/search.json'
+    yield service
+    service._refresh_executor.shutdown(wait=True)
+    service._fetch_executor.shutdown(wait=False, cancel_futures=True)
+
+
+def test_longer_query_is_answered_from_prefix_superset(service, fake_search):
+    first = service.search_books('mac', limit=5, prefix_match=True)
+    assert len(first) == 5
+    assert fake_search.search_requests == 1
+
+    narrowed = service.search_books('macha', limit=5, prefix_match=True)
+    assert [item['title'] for item in narrowed] == [f'Machado {i:02d}' for i in range(5)]
+    assert fake_search.search_requests == 1
+
+
+def test_goes_upstream_when_narrowed_superset_is_too_small(service, fake_search):
+    service.search_books('mac', limit=5, prefix_match=True)
+
+    # The 40-doc superset holds only 10 "macbeth" titles
+    results = service.search_books('macbeth', limit=15, prefix_match=True)
+    assert len(results) == 15
+    assert fake_search.search_requests == 2
+
+
+def test_failed_prefix_write_keeps_the_upstream_results(service, fake_search, monkeypatch):
+    service.breaker = CircuitBreaker('openlibrary_search', failure_threshold=1, reset_timeout=60)
+    backend = openlibrary_service.cache
+    set_entry = backend.set
+
+    def failing_set(key, value, timeout=None):
+        if key.startswith('openlibrary_prefix:'):
+            raise ConnectionError('cache down')
+        return set_entry(key, value, timeout=timeout)
+
+    monkeypatch.setattr(backend, 'set', failing_set)
+
+    results = service.search_books('mac', limit=5, prefix_match=True)
+    assert len(results) == 5
+    assert service.breaker.state == CircuitBreaker.CLOSED
+    assert service._cached_results('openlibrary_search:mac:5') == results
+
+
+def test_requests_only_the_fields_it_reads(service, fake_search):
+    service.search_books('machado', limit=3)
+
+    assert fake_search.last_params['fields'] == [OpenLibraryService.SEARCH_FIELDS]
+
+
+def test_prefix_reuse_is_opt_in(service, fake_search):
+    service.search_books('mac', limit=5, prefix_match=True)
+    service.search_books('macha', limit=5)
+    assert fake_search.search_requests == 2
+
+
+def test_stale_entry_is_served_and_refreshed_in_background(service, fake_search):
+    cache_key = 'openlibrary_search:machado:3'
+    service._write_entry(cache_key, [{'title': 'Old'}], ttl=0, stale_ttl=60)
+
+    assert service.search_books('machado', limit=3) == [{'title': 'Old'}]
+
+    deadline = time.monotonic() + 5
+    while service._cached_results(cache_key)[0]['title'] == 'Old' and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert [item['title'] for item in service._cached_results(cache_key)] == [
+        'Machado 00', 'Machado 01', 'Machado 02'
+    ]
+    assert fake_search.search_requests == 1
+
+
+def test_failures_are_negative_cached_and_open_the_circuit(service, fake_search):
+    FakeSearchHandler.status = 503
+    service.breaker = CircuitBreaker('openlibrary_search', failure_threshold=2, reset_timeout=60)
+
+    assert service.search_books('machado', limit=3) == []
+    assert service.search_books('machado', limit=3) == []  # Error cached briefly
+    requests_after_first = fake_search.search_requests
+
+    assert service.search_books('macbeth', limit=3) == []
+    assert service.breaker.state == CircuitBreaker.OPEN
+
+    assert service.search_books('dom casmurro', limit=3) == []
+    assert fake_search.search_requests == requests_after_first * 2
+
+
+def _timed_search(service, query):
+    start = time.monotonic()
+    results = service.search_books(query, limit=3)
+    return results, time.monotonic() - start
+
+
+def test_slow_upstream_is_cut_at_the_deadline_then_skipped(service, fake_search):
+    FakeSearchHandler.delay = 1.0
+    service.SEARCH_DEADLINE = 0.2
+    service.breaker = CircuitBreaker('openlibrary_search', failure_threshold=2, reset_timeout=60)
+
+    timings = []
+    for query in ['machado', 'macbeth', 'dom casmurro', 'helena']:
+        results, elapsed = _timed_search(service, query)
+        assert results == []
+        timings.append(elapsed)
+
+    assert max(timings[:2]) < 0.5  # bounded by the deadline, not the 5s read timeout
+    assert service.breaker.state == CircuitBreaker.OPEN
+    assert max(timings[2:]) < 0.05  # circuit open: no upstream call at all
+    assert fake_search.search_requests == 2
+
+
+def test_trickling_body_is_cut_at_the_deadline(service, fake_search):
+    FakeSearchHandler.trickle = 0.05  # ~1.6s for the whole body, each piece on time
+    service.SEARCH_DEADLINE = 0.3
+
+    results, elapsed = _timed_search(service, 'machado')
+
+    assert results == []
+    assert elapsed < 0.6
@@ -0,0 +1,39 @@
+import pytest
+from werkzeug.security import generate_password_hash
+
+from app import create_app
+from app.models.modelsdb import User
+from app.services.password_hasher import PasswordHasher, PasswordHasherBusy
+
+
+def test_pool_hashes_and_verifies_in_another_process():
+    hasher = PasswordHasher(n=2 ** 12, workers=1, max_queue=0)
+    try:
+        password_hash = hasher.hash('Segredo-123')
+        assert password_hash.startswith('scrypt:4096:8:1$')
+        assert hasher.verify(password_hash, 'Segredo-123')
+        assert not hasher.verify(password_hash, 'errada')
+    finally:
+        hasher.shutdown()
+
+
+def test_full_queue_fails_fast():
+    hasher = PasswordHasher(n=2 ** 12, workers=1, max_queue=0)
+    hasher._slots.acquire()  # the only slot is taken by another login
+
+    with pytest.raises(PasswordHasherBusy):
+        hasher.verify(hasher.dummy_hash, 'Segredo-123')
+
+
+def test_login_rehashes_outdated_hashes():
+    app = create_app()
+    app.config.update(PASSWORD_HASH_WORKERS=0, PASSWORD_SCRYPT_N=2 ** 12)
+    with app.app_context():
+        user = User(username='leitora', name='Leitora',
+                    password_hash=generate_password_hash('Segredo-123', 'pbkdf2'))
+
+        assert not user.check_password('errada')
+        assert user.password_hash.startswith('pbkdf2:')
+        assert user.check_password('Segredo-123')
+        assert user.password_hash.startswith('scrypt:4096:8:1$')
+        assert user.check_password('Segredo-123')
@@ -0,0 +1,62 @@
+import os
+
+from app.models.modelsdb import User
+from app.services.query_stats import QueryStats, RequestQueryStats, get_query_stats, normalize_sql
+
+
+def test_normalize_sql_groups_statements_by_shape():
+    first = normalize_sql(
+        "SELECT books.id FROM books\n  WHERE books.id IN (%(id_1)s, %(id_2)s) AND title = 'Dom'"
+    )
+    second = normalize_sql("SELECT books.id FROM books WHERE books.id IN (?, ?, ?) AND title = 'x'")
+
+    assert first == second == 'SELECT books.id FROM books WHERE books.id IN (?) AND title = ?'
+    assert normalize_sql('INSERT INTO t (a, b) VALUES (?, ?), (?, ?)') == 'INSERT INTO t (a, b) VALUES (?)'
+    assert normalize_sql('SELECT x::text FROM t LIMIT 10') == 'SELECT x::text FROM t LIMIT ?'
+
+
+def test_slow_statements_are_aggregated_per_shape():
+    stats = QueryStats(slow_query_ms=10, max_slow_statements=1)
+    for sql in ('SELECT 1', 'SELECT 1', 'SELECT * FROM books'):
+        request_stats = RequestQueryStats()
+        request_stats.count = 2
+        request_stats.total_ms = 30.0
+        request_stats.slow.append({'sql': sql, 'ms': 15.0})
+        stats.record_request('books.your_collection', request_stats)
+
+    snapshot = stats.snapshot()
+    assert snapshot['endpoints']['books.your_collection'] == {
+        'requests': 3, 'queries_per_request': 2.0, 'db_ms_per_request': 30.0, 'max_queries': 2,
+    }
+    assert [(s['sql'], s['count']) for s in snapshot['slow_statements']] == [('SELECT 1', 2)]
+    assert snapshot['dropped_slow_statements'] == 1
+
+
+def test_server_timing_header_and_metrics_endpoint(test_client):
+    app = test_client.application
+    app.config.update(QUERY_STATS_HEADER=True, METRICS_TOKEN='s3cret')
+    User.query.count()  # Outside a request: not counted
+    get_query_stats().reset()
+
+    response = test_client.get('/login')
+    assert 'db;dur=' in response.headers['Server-Timing']
+
+    assert test_client.get('/metrics/queries').status_code == 401
+    response = test_client.get('/metrics/queries', headers={'Authorization': 'Bearer s3cret'})
+    assert response.status_code == 200
+    assert 'auth.login' in response.get_json()['endpoints']
+    assert response.get_json()['pid'] == os.getpid()
+
+
+def test_slow_statements_are_exported_to_prometheus(test_client):
+    app = test_client.application
+    app.config['METRICS_TOKEN'] = 's3cret'
+    stats = get_query_stats()
+    threshold, stats.slow_query_ms = stats.slow_query_ms, 0
+    try:
+        test_client.post('/login', data={'username': 'ninguem', 'password': 'x'})
+    finally:
+        stats.slow_query_ms = threshold
+
+    body = test_client.get('/metrics', headers={'Authorization': 'Bearer s3cret'}).get_data(as_text=True)
+    assert 'db_slow_statements_total{endpoint="auth.login"}' in body
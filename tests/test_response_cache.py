@@ -0,0 +1,77 @@
+import pytest
+from flask_login import current_user, login_required
+
+from app import cache, db
+from app.models.modelsdb import User
+from app.utils.cache_keys import bump_user_cache_version
+from app.utils.response_cache import user_cached
+
+
+@pytest.fixture(autouse=True)
+def cached_page(app):
+    app.config.update(SESSION_COOKIE_SECURE=False, SESSION_PROTECTION=None)
+    # Under the default NullCache user_cached never caches
+    cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache'})
+    app.renders = []
+
+    @app.route('/_cached_page')
+    @login_required
+    @user_cached('test_page', vary_on=('cursor',))
+    def cached_page():
+        app.renders.append(current_user.id)
+        return f'page of {current_user.username} #{len(app.renders)}'
+
+    with app.app_context():
+        users = [User(username=username, name=username.title(), password_hash='x')
+                 for username in ('anaclara', 'beatriz')]
+        db.session.add_all(users)
+        db.session.commit()
+        app.user_ids = {user.username: user.id for user in users}
+
+
+def client_for(app, username):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(app.user_ids[username])
+        session['_fresh'] = True
+    return client
+
+
+def test_users_never_get_each_others_cached_page(app):
+    ana, bia = client_for(app, 'anaclara'), client_for(app, 'beatriz')
+
+    assert ana.get('/_cached_page').text == 'page of anaclara #1'
+    assert bia.get('/_cached_page').text == 'page of beatriz #2'
+    assert ana.get('/_cached_page').text == 'page of anaclara #1'
+    assert bia.get('/_cached_page').text == 'page of beatriz #2'
+    assert len(app.renders) == 2
+    # vary_on parameters get their own entry
+    assert ana.get('/_cached_page?cursor=abc').text == 'page of anaclara #3'
+
+
+def test_etag_revalidates_only_for_the_same_user_and_version(app):
+    ana, bia = client_for(app, 'anaclara'), client_for(app, 'beatriz')
+    etag = ana.get('/_cached_page').headers['ETag']
+
+    assert ana.get('/_cached_page', headers={'If-None-Match': etag}).status_code == 304
+    other = bia.get('/_cached_page', headers={'If-None-Match': etag})
+    assert other.status_code == 200
+    assert other.text == 'page of beatriz #2'
+
+    with app.app_context():
+        bump_user_cache_version(app.user_ids['anaclara'])
+    stale = ana.get('/_cached_page', headers={'If-None-Match': etag})
+    assert stale.status_code == 200
+    assert stale.text == 'page of anaclara #3'  # re-rendered at the new version
+    assert stale.headers['ETag'] != etag
+
+
+def test_pages_with_pending_flashes_are_not_cached(app):
+    ana = client_for(app, 'anaclara')
+    with ana.session_transaction() as session:
+        session['_flashes'] = [('success', 'Livro adicionado')]
+
+    first, second = ana.get('/_cached_page'), ana.get('/_cached_page')
+
+    assert (first.text, second.text) == ('page of anaclara #1', 'page of anaclara #2')
+    assert 'ETag' not in first.headers
@@ -0,0 +1,14 @@
+from app import create_app
+from app.serving import after_fork, warm_app
+from app.services.openlibrary_service import load_genre_translations
+
+
+def test_warm_app_compiles_templates_and_loads_translations():
+    app = create_app()
+    warm_app(app)
+
+    assert len(app.jinja_env.cache) == len(app.jinja_env.list_templates(extensions=['html']))
+    assert load_genre_translations.cache_info().currsize == 1
+    # The warm app still serves after a (simulated) fork
+    after_fork(app)
+    assert app.test_client().get('/login').status_code == 200
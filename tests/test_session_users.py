@@ -0,0 +1,44 @@
+from app import db
+from app.models.modelsdb import User
+from app.services.session_users import SessionUser, get_session_user_cache
+
+
+def test_snapshot_is_served_from_cache_until_the_user_changes(user_id, statements):
+    user = db.session.get(User, user_id)
+    cache = get_session_user_cache()
+
+    first = cache.load(user.id)
+    loaded = len(statements)
+    second = cache.load(user.id)
+
+    assert isinstance(second, SessionUser)
+    assert second.username == 'leitora'
+    assert len(statements) == loaded  # no round trip on a hit
+    assert second is not first  # per-request object, shared snapshot
+
+    user.name = 'Outra Leitora'
+    db.session.commit()
+    assert cache.load(user.id).name == 'Outra Leitora'
+
+
+def test_other_attributes_load_the_full_user_once(user_id, statements):
+    user = db.session.get(User, user_id)
+    session_user = get_session_user_cache().load(user.id)
+    db.session.expunge_all()
+    before = len(statements)
+
+    assert session_user.created_at is not None
+    assert session_user.last_login is None
+    assert len(statements) == before + 1
+    assert session_user == session_user.model
+
+
+def test_deleted_user_is_not_loaded(user_id):
+    user = db.session.get(User, user_id)
+    cache = get_session_user_cache()
+    cache.load(user.id)
+
+    db.session.delete(user)
+    db.session.commit()
+
+    assert cache.load(user.id) is None
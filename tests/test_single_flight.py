@@ -0,0 +1,118 @@
+import threading
+import time
+
+import pytest
+from cachelib import SimpleCache
+
+from app.services import single_flight
+from app.services.single_flight import LOCK_KEY, SingleFlight
+
+
+@pytest.fixture
+def shared_cache(monkeypatch):
+    backend = SimpleCache()
+    monkeypatch.setattr(single_flight, 'cache', backend)
+    return backend
+
+
+def test_concurrent_callers_share_one_call(shared_cache):
+    flight = SingleFlight(wait_timeout=2)
+    calls = []
+    start = threading.Barrier(8)
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        shared_cache.set('results', ['book'])
+        return ['book']
+
+    results = []
+
+    def worker():
+        start.wait()
+        results.append(flight.do('results', fetch, lookup=lambda: shared_cache.get('results')))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [['book']] * 8
+    assert shared_cache.get(LOCK_KEY.format(key='results')) is None
+
+
+def test_waits_for_result_from_worker_holding_shared_lock(shared_cache):
+    flight = SingleFlight(wait_timeout=2, poll_interval=0.01)
+    shared_cache.add(LOCK_KEY.format(key='results'), 'other-worker')
+    threading.Timer(0.1, shared_cache.set, args=('results', ['from other worker'])).start()
+
+    def fetch():
+        raise AssertionError('should not call upstream while another worker does')
+
+    assert flight.do('results', fetch, lookup=lambda: shared_cache.get('results')) == ['from other worker']
+    assert flight.stats()['remote_waits'] == 1
+
+
+def test_falls_back_to_own_call_when_lock_holder_gives_up(shared_cache):
+    flight = SingleFlight(wait_timeout=2, poll_interval=0.01)
+    lock_key = LOCK_KEY.format(key='results')
+    shared_cache.add(lock_key, 'other-worker')
+    threading.Timer(0.05, shared_cache.delete, args=(lock_key,)).start()
+
+    assert flight.do('results', lambda: ['mine'], lookup=lambda: shared_cache.get('results')) == ['mine']
+
+
+def test_followers_outwait_a_leader_slower_than_the_default_wait(shared_cache):
+    flight = SingleFlight(wait_timeout=0.1, poll_interval=0.01)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.4)
+        shared_cache.set('results', ['book'])
+        return ['book']
+
+    def call():
+        return flight.do('results', fetch, lookup=lambda: shared_cache.get('results'),
+                         timeout=1.0, fallback=list)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    time.sleep(0.05)
+
+    assert call() == ['book']
+    leader.join()
+    assert len(calls) == 1
+    assert flight.stats()['timeouts'] == 0
+
+
+def test_follower_timeout_answers_with_fallback_not_a_second_call(shared_cache):
+    flight = SingleFlight(poll_interval=0.01)
+    calls = []
+    release = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        release.wait(2)
+        return ['book']
+
+    leader = threading.Thread(target=flight.do, args=('results', fetch),
+                              kwargs={'lookup': lambda: shared_cache.get('results')})
+    leader.start()
+    time.sleep(0.05)
+
+    # The leader outlives this follower's wait: no upstream call of its own
+    assert flight.do('results', fetch, lookup=lambda: shared_cache.get('results'),
+                     timeout=0.1, fallback=list) == []
+    release.set()
+    leader.join()
+    assert len(calls) == 1
+    assert flight.stats()['timeouts'] == 1
+
+    # Another worker holds the shared lock past the wait: same answer
+    shared_cache.add(LOCK_KEY.format(key='other'), 'other-worker')
+    assert flight.do('other', fetch, lookup=lambda: shared_cache.get('other'),
+                     timeout=0.1, fallback=list) == []
+    assert len(calls) == 1
@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.models.modelsdb import Book, User, UserBooks, UserGenreCount, UserStats
+from app.services.collection_export import EXPORT_COLUMNS, iter_csv
+from app.services.collection_import import import_collection_csv
+from app.services.user_stats import get_user_stats, seed_user_stats
+
+
+def _book(code, genre, pages):
+    return Book(code=code, title=f'Livro {code}', author='Autora', publisher='Editora',
+                publication_year=1990, pages=pages, genre=genre)
+
+
+def _rebuilt(user_id):
+    """Stats recomputed from scratch, to compare with the incremental ones."""
+    seed_user_stats(db.session.connection(), user_id, replace=True)
+    return vars(get_user_stats(user_id))
+
+
+def test_stats_follow_inserts_updates_and_deletes(app_context):
+    user = User(username='leitora', name='Leitora', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+    assert vars(get_user_stats(user.id)) == {
+        'book_count': 0, 'total_pages': 0, 'favorite_genre': None, 'last_book_added': None,
+    }
+
+    start = datetime(2024, 1, 1)
+    links = [
+        UserBooks(user=user, book=_book(f'S{i}', genre, 100 + i),
+                  acquisition_date=start + timedelta(days=i))
+        for i, genre in enumerate(['Romance', 'Mystery', 'Romance', 'History'])
+    ]
+    db.session.add_all(links)
+    db.session.commit()
+
+    assert user.book_count == 4
+    assert user.total_pages == 406
+    assert user.favorite_genre == ('Romance', 2)
+    assert user.last_book_added.id == links[3].id
+
+    links[1].book.genre = 'Romance'
+    links[1].book.pages = 300
+    db.session.delete(links[3])
+    db.session.commit()
+
+    stats = vars(get_user_stats(user.id))
+    assert stats['book_count'] == 3
+    assert stats['favorite_genre'] == ('Romance', 3)
+    assert stats['last_book_added'].id == links[2].id
+    assert db.session.query(UserGenreCount).filter_by(genre='History').count() == 0
+    assert stats == _rebuilt(user.id)
+
+
+def test_bulk_import_updates_stats(app_context):
+    user = User(username='importadora', name='Importadora', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+
+    records = []
+    for i in range(30):
+        record = dict.fromkeys(EXPORT_COLUMNS, None)
+        record.update(title=f'Livro {i:02d}', author='Autora', publisher='Editora',
+                      publication_year=1990, pages=10, genre='Mystery' if i % 3 else 'Romance',
+                      status='available', read_status='unread', format='physical',
+                      openlibrary_key='')
+        records.append(record)
+    import_collection_csv(user.id, ''.join(iter_csv(records)), batch_size=7)
+    db.session.commit()
+
+    stats = vars(get_user_stats(user.id))
+    assert stats['book_count'] == 30
+    assert stats['total_pages'] == 300
+    assert stats['favorite_genre'] == ('Mystery', 20)
+    assert stats == _rebuilt(user.id)
+
+
+def test_missing_row_is_computed_on_read_and_seeded_on_write(app_context):
+    user = User(username='antiga', name='Antiga', password_hash='x')
+    db.session.add(UserBooks(user=user, book=_book('OLD1', 'Essay', 50)))
+    db.session.commit()
+    db.session.query(UserGenreCount).delete()
+    db.session.query(UserStats).delete()
+    db.session.commit()
+
+    stats = get_user_stats(user.id)
+    assert (stats.book_count, stats.total_pages, stats.favorite_genre) == (1, 50, ('Essay', 1))
+    assert stats.last_book_added.id == UserBooks.query.filter_by(user_id=user.id).one().id
+    assert db.session.get(UserStats, user.id) is None
+
+    db.session.add(UserBooks(user_id=user.id, book=_book('OLD2', 'Essay', 30)))
+    db.session.commit()
+    assert db.session.get(UserStats, user.id).book_count == 2
+    assert vars(get_user_stats(user.id)) == _rebuilt(user.id)